@@ -0,0 +1,275 @@
+"""Run query backfills in-process with BigQuery query jobs.
+
+The query is rendered once and submitted as a query job for each partition,
+with the backfilled date as query parameter. Jobs are polled from a single
+process and at most `max_in_flight` partitions run at the same time, or one at
+a time and in order if the query depends on past partitions.
+
+Completed partitions are recorded in a checkpoint in the local cache directory,
+so that a backfill that was interrupted can resume with the remaining partitions
+when it is run again with resume set. The checkpoint is removed once all
+partitions succeeded.
+"""
+
+import json
+import time
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+import attr
+import click
+from google.api_core.exceptions import GoogleAPICallError
+from google.cloud import bigquery
+
+from bigquery_etl.backfill.utils import QUALIFIED_TABLE_NAME_RE
+from bigquery_etl.metadata.parse_metadata import PartitionType
+from bigquery_etl.util import extract_from_query_path
+from bigquery_etl.util.cache import atomic_write, cache_dir, content_hash
+from bigquery_etl.util.common import render as render_template
+
+CHECKPOINT_DIR = "backfill_checkpoints"
+POLL_INTERVAL_SECONDS = 5
+
+
+def partition_id(partitioning_type: PartitionType, backfill_date: date) -> str:
+    """Return the ID of the partition that is backfilled for backfill_date."""
+    match partitioning_type:
+        case PartitionType.DAY:
+            return backfill_date.strftime("%Y%m%d")
+        case PartitionType.MONTH:
+            return backfill_date.strftime("%Y%m")
+        case _:
+            raise ValueError(f"Unsupported partitioning type: {partitioning_type}")
+
+
+@attr.s(auto_attribs=True)
+class _PartitionRun:
+    """Jobs of a partition that is being backfilled."""
+
+    backfill_date: date
+    jobs: List[bigquery.QueryJob]
+    running_checks: bool = False
+
+
+@attr.s(auto_attribs=True)
+class BackfillExecutor:
+    """Backfill the partitions of a query's destination table.
+
+    checks returns the rendered checks to run after a partition was
+    backfilled, for the partition's date. With resume, partitions that were
+    completed by a previous run of the same backfill are skipped.
+    """
+
+    client: bigquery.Client
+    query_file: Path = attr.ib(converter=Path)
+    project_id: str
+    date_partition_parameter: str = "submission_date"
+    destination_table: Optional[str] = None
+    partitioning_type: PartitionType = PartitionType.DAY
+    no_partition: bool = False
+    depends_on_past: bool = False
+    max_in_flight: int = 8
+    dry_run: bool = False
+    checks: Optional[Callable[[date], List[str]]] = None
+    resume: bool = False
+    poll_interval: float = POLL_INTERVAL_SECONDS
+    query: str = attr.ib(init=False)
+
+    def __attrs_post_init__(self):
+        """Render the query and determine the destination table."""
+        project, dataset, table = extract_from_query_path(self.query_file)
+        if self.destination_table is None:
+            self.destination_table = f"{project}.{dataset}.{table}"
+        if not QUALIFIED_TABLE_NAME_RE.match(self.destination_table):
+            raise ValueError(
+                "Destination table must be named like: <project>.<dataset>.<table>"
+            )
+        self._dataset = dataset
+        self.query = render_template(
+            self.query_file.name,
+            template_folder=str(self.query_file.parent),
+            templates_dir="",
+            format=False,
+        )
+
+    @property
+    def checkpoint_file(self) -> Path:
+        """Return the file that completed partitions are recorded in."""
+        key = content_hash(
+            str(self.destination_table),
+            self.date_partition_parameter,
+            str(self.no_partition),
+            self.query,
+        )
+        return cache_dir(CHECKPOINT_DIR) / f"{key}.json"
+
+    def _completed(self) -> Set[str]:
+        if not self.resume or self.dry_run:
+            return set()
+        try:
+            checkpoint = json.loads(self.checkpoint_file.read_text())
+        except (OSError, ValueError):
+            return set()
+        return set(checkpoint.get("completed", []))
+
+    def _record(self, completed: Set[str]):
+        if self.dry_run:
+            return
+        checkpoint = {
+            "destination_table": self.destination_table,
+            "completed": sorted(completed),
+        }
+        atomic_write(self.checkpoint_file, json.dumps(checkpoint).encode("utf-8"))
+
+    def _query_parameters(self, backfill_date: date):
+        return [
+            bigquery.ScalarQueryParameter(
+                self.date_partition_parameter, "DATE", backfill_date
+            )
+        ]
+
+    def _submit_query(self, backfill_date: date) -> bigquery.QueryJob:
+        destination = str(self.destination_table)
+        if not self.no_partition:
+            destination += "$" + partition_id(self.partitioning_type, backfill_date)
+        click.echo(
+            f"Run backfill for {destination} "
+            f"with @{self.date_partition_parameter}={backfill_date:%Y-%m-%d}"
+        )
+        job_config = bigquery.QueryJobConfig(
+            destination=destination,
+            default_dataset=f"{self.project_id}.{self._dataset}",
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+            use_legacy_sql=False,
+            query_parameters=self._query_parameters(backfill_date),
+            dry_run=self.dry_run,
+        )
+        return self.client.query(
+            self.query, job_config=job_config, project=self.project_id
+        )
+
+    def _submit_checks(self, backfill_date: date) -> List[bigquery.QueryJob]:
+        assert self.checks is not None
+        job_config = bigquery.QueryJobConfig(
+            use_legacy_sql=False,
+            query_parameters=self._query_parameters(backfill_date),
+            dry_run=self.dry_run,
+        )
+        return [
+            self.client.query(check, job_config=job_config, project=self.project_id)
+            for check in self.checks(backfill_date)
+            if check.strip()
+        ]
+
+    def _report_failure(self, run: _PartitionRun, message):
+        prefix = "Check failed" if run.running_checks else "Backfill failed"
+        click.echo(
+            f"{prefix} for @{self.date_partition_parameter}="
+            f"{run.backfill_date:%Y-%m-%d}: {message}",
+            err=True,
+        )
+
+    def _submit(self, run: _PartitionRun) -> bool:
+        """Submit the query or checks of a partition and return if they were submitted.
+
+        Jobs may fail on submission, e.g. dry runs of invalid queries.
+        """
+        try:
+            if run.running_checks:
+                run.jobs = self._submit_checks(run.backfill_date)
+            else:
+                run.jobs = [self._submit_query(run.backfill_date)]
+        except GoogleAPICallError as e:
+            self._report_failure(run, e.message)
+            return False
+        return True
+
+    def _report(self, run: _PartitionRun) -> bool:
+        """Print the outcome of the jobs of a partition and return if they succeeded."""
+        succeeded = True
+        for job in run.jobs:
+            if job.error_result:
+                succeeded = False
+                self._report_failure(
+                    run, job.error_result.get("message", job.error_result)
+                )
+            elif self.dry_run and not run.running_checks:
+                click.echo(
+                    f"@{self.date_partition_parameter}={run.backfill_date:%Y-%m-%d} "
+                    f"would process {job.total_bytes_processed} bytes"
+                )
+        return succeeded
+
+    def run(self, dates: List[date], exclude: List[str] = []) -> bool:
+        """Backfill the partitions of dates and return whether all succeeded."""
+        completed = self._completed()
+        pending = []
+        resumed = 0
+        for backfill_date in dates:
+            day = backfill_date.strftime("%Y-%m-%d")
+            if day in exclude:
+                click.echo(
+                    f"Skip {self.query_file} with "
+                    f"@{self.date_partition_parameter}={day}"
+                )
+            elif day in completed:
+                click.echo(
+                    f"Skip {self.query_file} with "
+                    f"@{self.date_partition_parameter}={day}, completed previously"
+                )
+                resumed += 1
+            else:
+                pending.append(backfill_date)
+        pending.reverse()
+        if resumed:
+            click.echo(
+                f"Resume backfill of {self.destination_table}: skip {resumed} "
+                "partitions completed by a previous run, use --no-resume to "
+                "backfill them again"
+            )
+
+        max_in_flight = 1 if self.depends_on_past else max(self.max_in_flight, 1)
+        in_flight: Dict[date, _PartitionRun] = {}
+        failed = False
+        while pending or in_flight:
+            # partitions that depend on past partitions are not started after a
+            # failure, because they would be based on incomplete data
+            while (
+                pending
+                and len(in_flight) < max_in_flight
+                and not (failed and self.depends_on_past)
+            ):
+                run = _PartitionRun(pending.pop(), [])
+                if self._submit(run):
+                    in_flight[run.backfill_date] = run
+                else:
+                    failed = True
+            if failed and self.depends_on_past:
+                pending = []
+
+            finished = [
+                run for run in in_flight.values() if all(job.done() for job in run.jobs)
+            ]
+            if not finished:
+                if in_flight:
+                    time.sleep(self.poll_interval)
+                continue
+
+            for run in finished:
+                succeeded = self._report(run)
+                if succeeded and self.checks is not None and not run.running_checks:
+                    run.running_checks = True
+                    succeeded = self._submit(run)
+                    if succeeded and run.jobs:
+                        continue
+                del in_flight[run.backfill_date]
+                if succeeded:
+                    completed.add(run.backfill_date.strftime("%Y-%m-%d"))
+                    self._record(completed)
+                else:
+                    failed = True
+
+        if not failed and not self.dry_run:
+            self.checkpoint_file.unlink(missing_ok=True)
+        return not failed
@@ -2,11 +2,20 @@
 import json
 import sys
 import tempfile
+import time
 from datetime import date, datetime, timedelta
+from multiprocessing.pool import ThreadPool
 from pathlib import Path
+from typing import List
 
 import click
 import yaml
+from google.api_core.exceptions import (
+    GoogleAPICallError,
+    InternalServerError,
+    ServiceUnavailable,
+    TooManyRequests,
+)
 from google.cloud import bigquery
 from google.cloud.exceptions import Conflict, NotFound
 
@@ -35,8 +44,20 @@ from ..backfill.validate import (
 )
 from ..cli.query import backfill as query_backfill
 from ..cli.query import deploy
-from ..cli.utils import is_authenticated, project_id_option, sql_dir_option
+from ..cli.utils import (
+    is_authenticated,
+    parallelism_option,
+    project_id_option,
+    sql_dir_option,
+)
 from ..config import ConfigLoader
+from ..util.cache import atomic_write, cache_dir, content_hash
+
+COMPLETE_CHECKPOINT_DIR = "backfill_complete"
+COPY_RETRIES = 3
+COPY_RETRY_DELAY_SECONDS = 5
+# errors of copy jobs that may succeed when they are retried
+TRANSIENT_COPY_ERRORS = (InternalServerError, ServiceUnavailable, TooManyRequests)
 
 
 @click.group(help="Commands for managing backfills.")
@@ -393,6 +414,10 @@ def process(ctx, qualified_table_name, sql_dir, project_id, dry_run):
 @backfill.command(
     help="""Complete entry in backfill.yaml with Validated status.
 
+    Backfilled partitions are copied to the production table in parallel.
+    If the command is interrupted, running it again copies the remaining
+    partitions.
+
     Examples:
 
     \b
@@ -407,8 +432,9 @@ def process(ctx, qualified_table_name, sql_dir, project_id, dry_run):
 @click.argument("qualified_table_name")
 @sql_dir_option
 @project_id_option("moz-fx-data-shared-prod")
+@parallelism_option
 @click.pass_context
-def complete(ctx, qualified_table_name, sql_dir, project_id):
+def complete(ctx, qualified_table_name, sql_dir, project_id, parallelism):
     """Complete backfill entry in backfill.yaml file(s)."""
     if not is_authenticated():
         click.echo(
@@ -454,29 +480,48 @@ def complete(ctx, qualified_table_name, sql_dir, project_id):
 
     project, dataset, table = qualified_table_name_matching(qualified_table_name)
 
+    # progress of an interrupted run of this command
+    checkpoint_file = cache_dir(COMPLETE_CHECKPOINT_DIR) / (
+        content_hash(qualified_table_name, str(entry_to_complete.entry_date)) + ".json"
+    )
+    try:
+        checkpoint = json.loads(checkpoint_file.read_text())
+        click.echo(f"Resuming interrupted completion of {qualified_table_name}")
+    except (OSError, ValueError):
+        checkpoint = None
+
     # clone production table
     cloned_table_id = f"{table}_backup_{entry_to_complete.entry_date}".replace("-", "_")
     cloned_table_full_name = f"{BACKFILL_DESTINATION_PROJECT}.{BACKFILL_DESTINATION_DATASET}.{cloned_table_id}"
-    _copy_table(qualified_table_name, cloned_table_full_name, client, clone=True)
+    if checkpoint is None:
+        _copy_table(qualified_table_name, cloned_table_full_name, client, clone=True)
+        checkpoint = {"backup": cloned_table_full_name, "swapped": []}
+        atomic_write(checkpoint_file, json.dumps(checkpoint).encode("utf-8"))
 
     # copy backfill data to production data
     start_date = entry_to_complete.start_date
     end_date = entry_to_complete.end_date
     dates = [start_date + timedelta(i) for i in range((end_date - start_date).days + 1)]
 
-    # replace partitions in production table that have been backfilled
+    excluded_dates = set(entry_to_complete.excluded_dates)
     for backfill_date in dates:
-        if backfill_date in entry_to_complete.excluded_dates:
+        if backfill_date in excluded_dates:
             click.echo(f"Skipping excluded date: {backfill_date}")
-            continue
 
-        partition = backfill_date.strftime("%Y%m%d")
-        production_table = f"{qualified_table_name}${partition}"
-        backfill_table = f"{backfill_staging_qualified_table_name}${partition}"
-        _copy_table(backfill_table, production_table, client)
+    # replace partitions in production table that have been backfilled
+    _swap_partitions(
+        client,
+        backfill_staging_qualified_table_name,
+        qualified_table_name,
+        [d for d in dates if d not in excluded_dates],
+        parallelism,
+        checkpoint_file,
+        checkpoint,
+    )
 
     # delete backfill staging table
     client.delete_table(backfill_staging_qualified_table_name)
+    checkpoint_file.unlink(missing_ok=True)
     click.echo(
         f"Backfill staging table deleted: {backfill_staging_qualified_table_name}"
     )
@@ -486,6 +531,86 @@ def complete(ctx, qualified_table_name, sql_dir, project_id):
     )
 
 
+def _copy_partition(
+    client, source_table: str, destination_table: str, retries: int = COPY_RETRIES
+):
+    """Copy and overwrite a partition, retrying copy jobs with transient errors.
+
+    Return the error if the copy failed, or the error of the last attempt if all
+    attempts failed.
+    """
+    copy_config = bigquery.CopyJobConfig(
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+        operation_type=bigquery.job.copy_.OperationType.COPY,
+    )
+    for attempt in range(retries + 1):
+        try:
+            client.copy_table(
+                source_table, destination_table, job_config=copy_config
+            ).result()
+            return None
+        except TRANSIENT_COPY_ERRORS as e:
+            if attempt == retries:
+                return e
+            time.sleep(COPY_RETRY_DELAY_SECONDS * 2**attempt)
+        except GoogleAPICallError as e:
+            return e
+    return None
+
+
+def _swap_partitions(
+    client,
+    staging_table: str,
+    production_table: str,
+    dates: List[date],
+    parallelism: int,
+    checkpoint_file: Path,
+    checkpoint: dict,
+) -> None:
+    """
+    Copy the partitions of dates from the staging table to the production table.
+
+    BigQuery copy jobs write a single partition, so each date is copied by its
+    own job. Jobs run concurrently so that the production table is only partly
+    backfilled for as short as possible. Swapped partitions are recorded in the
+    checkpoint and skipped when the command is run again after an interruption.
+    """
+    swapped = set(checkpoint["swapped"])
+    remaining = [d for d in dates if d.isoformat() not in swapped]
+    if len(remaining) < len(dates):
+        click.echo(f"Skipping {len(dates) - len(remaining)} swapped partitions")
+
+    def _copy(backfill_date):
+        partition = backfill_date.strftime("%Y%m%d")
+        return backfill_date, _copy_partition(
+            client,
+            f"{staging_table}${partition}",
+            f"{production_table}${partition}",
+        )
+
+    failed = []
+    with ThreadPool(max(parallelism, 1)) as pool:
+        for backfill_date, error in pool.imap_unordered(_copy, remaining):
+            if error is not None:
+                click.echo(f"Failed to copy partition {backfill_date}: {error}")
+                failed.append(backfill_date)
+                continue
+            swapped.add(backfill_date.isoformat())
+            checkpoint["swapped"] = sorted(swapped)
+            atomic_write(checkpoint_file, json.dumps(checkpoint).encode("utf-8"))
+            click.echo(
+                f"[{len(swapped)}/{len(dates)}] Partition {backfill_date} "
+                f"successfully copied to {production_table}"
+            )
+
+    if failed:
+        click.echo(
+            f"Failed to copy {len(failed)} partitions to {production_table}. "
+            "Run the command again to copy the remaining partitions."
+        )
+        sys.exit(1)
+
+
 def _copy_table(
     source_table: str, destination_table: str, client, clone: bool = False
 ) -> None:
@@ -5,7 +5,7 @@ import sys
 import tempfile
 from pathlib import Path
 from subprocess import CalledProcessError
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 import click
 import sqlparse
@@ -227,6 +227,34 @@ def run(ctx, dataset, project_id, sql_dir, marker, dry_run):
         )
 
 
+def _render_checks(
+    checks_file: Path,
+    dataset_id: str,
+    table: str,
+    query_arguments: List[str],
+    marker: str = DEFAULT_MARKER,
+) -> List[str]:
+    """Render the checks with the set marker as separate SQL statements."""
+    # Convert all the Airflow params to jinja usable dict.
+    parameters = _build_jinja_parameters(query_arguments)
+
+    jinja_params: Dict[str, Any] = {
+        **{"dataset_id": dataset_id, "table_name": table},
+        **parameters,
+    }
+    if "format" not in jinja_params:
+        jinja_params["format"] = False
+
+    rendered_result = render_template(
+        checks_file.name,
+        template_folder=str(checks_file.parent),
+        templates_dir="",
+        **jinja_params,
+    )
+    result_split_by_marker = _render_result_split_by_marker(marker, rendered_result)
+    return sqlparse.split(result_split_by_marker)
+
+
 def _run_check(
     checks_file,
     project_id,
@@ -249,24 +277,7 @@ def _run_check(
     if dry_run is True:
         query_arguments.append("--dry_run")
 
-    # Convert all the Airflow params to jinja usable dict.
-    parameters = _build_jinja_parameters(query_arguments)
-
-    jinja_params = {
-        **{"dataset_id": dataset_id, "table_name": table},
-        **parameters,
-    }
-    if "format" not in jinja_params:
-        jinja_params["format"] = False
-
-    rendered_result = render_template(
-        checks_file.name,
-        template_folder=str(checks_file.parent),
-        templates_dir="",
-        **jinja_params,
-    )
-    result_split_by_marker = _render_result_split_by_marker(marker, rendered_result)
-    checks = sqlparse.split(result_split_by_marker)
+    checks = _render_checks(checks_file, dataset_id, table, query_arguments, marker)
     seek_location = 0
     check_failed = False
 
@@ -7,8 +7,8 @@ from pathlib import Path
 import click
 import yaml
 
-from ..cli.utils import is_valid_dir, is_valid_file, sql_dir_option
-from ..metadata.parse_metadata import METADATA_FILE, Metadata
+from ..cli.utils import is_valid_dir, is_valid_file, parallelism_option, sql_dir_option
+from ..metadata.parse_metadata import MetadataCatalog
 from ..query_scheduling.dag import Dag
 from ..query_scheduling.dag_collection import DagCollection
 from ..query_scheduling.generate_airflow_dags import get_dags
@@ -225,15 +225,25 @@ def create(
 
     # Generate a specific DAG
     ./bqetl dag generate bqetl_ssl_ratios
+
+    # Only re-generate DAGs whose configuration, tasks or dependencies changed
+    ./bqetl dag generate --incremental
     """
 )
 @click.argument("name", required=False)
 @dags_config_option
 @sql_dir_option
 @output_dir_option
-def generate(name, dags_config, sql_dir, output_dir):
+@click.option(
+    "--incremental",
+    help="Only re-generate DAGs whose inputs changed since they were last generated",
+    is_flag=True,
+    default=False,
+)
+@parallelism_option
+def generate(name, dags_config, sql_dir, output_dir, incremental, parallelism):
     """CLI command for generating Airflow DAGs."""
-    dags = get_dags(None, dags_config, sql_dir)
+    dags = get_dags(None, dags_config, sql_dir, parallelism=parallelism)
     if name:
         # only generate specific DAG
         dag = dags.dag_by_name(name)
@@ -242,11 +252,18 @@ def generate(name, dags_config, sql_dir, output_dir):
             click.echo(f"DAG {name} does not exist.", err=True)
             sys.exit(1)
 
-        dags.to_airflow_dags(output_dir, dag_to_generate=dag)
-        click.echo(f"Generated {output_dir}{dag.name}.py")
+        generated = dags.to_airflow_dags(
+            output_dir, dag_to_generate=dag, incremental=incremental
+        )
+        if incremental and not generated:
+            click.echo(f"{output_dir}{dag.name}.py is up to date.")
+        else:
+            click.echo(f"Generated {output_dir}{dag.name}.py")
     else:
         # re-generate all DAGs
-        dags.to_airflow_dags(output_dir)
+        generated = dags.to_airflow_dags(output_dir, incremental=incremental)
+        if incremental:
+            click.echo(f"Re-generated {len(generated)} of {len(dags.dags)} DAGs.")
         click.echo("DAG generation complete.")
 
 
@@ -271,20 +288,16 @@ def remove(name, dags_config, sql_dir, output_dir):
 
     Also removes scheduling information from queries that were referring to the DAG.
     """
-    # remove from task schedulings
-    dags = get_dags(None, dags_config, sql_dir=sql_dir)
-    dag_tbr = dags.dag_by_name(name)
-
-    if not dag_tbr:
+    if not DagCollection.from_file(dags_config).dag_by_name(name):
         click.echo(f"No existing DAG definition for {name}")
         sys.exit(1)
 
-    for task in dag_tbr.tasks:
-        metadata = Metadata.of_query_file(task.query_file)
-        sql_path = Path(os.path.dirname(task.query_file))
+    # remove from task schedulings
+    catalog = MetadataCatalog(sql_dir)
+    for table_id in catalog.scheduled_in(name):
+        metadata = catalog.table(table_id)
         metadata.scheduling = {}
-        metadata_file = sql_path / METADATA_FILE
-        metadata.write(metadata_file)
+        metadata.write(catalog.metadata_file(table_id))
 
     # remove from dags.yaml
     with open(dags_config) as dags_file:
@@ -15,6 +15,7 @@ from google.cloud import bigquery
 from ..cli.utils import is_authenticated
 from ..config import ConfigLoader
 from ..dryrun import DryRun
+from ..dryrun_client import DEFAULT_CONCURRENCY
 
 
 @click.command(
@@ -64,12 +65,19 @@ from ..dryrun import DryRun
     help="GCP project to perform dry run in when --use_cloud_function=False",
     default=ConfigLoader.get("default", "project", fallback="moz-fx-data-shared-prod"),
 )
+@click.option(
+    "--concurrency",
+    help="Maximum number of concurrent requests to the dry run Cloud Function",
+    type=int,
+    default=DEFAULT_CONCURRENCY,
+)
 def dryrun(
     paths: List[str],
     use_cloud_function: bool,
     validate_schemas: bool,
     respect_skip: bool,
     project: str,
+    concurrency: int,
 ):
     """Perform a dry run."""
     file_names = ("query.sql", "view.sql", "part*.sql", "init.sql")
@@ -100,12 +108,21 @@ def dryrun(
         click.echo("Not authenticated to GCP. Run `gcloud auth login` to login.")
         sys.exit(1)
 
-    sql_file_valid = partial(
-        _sql_file_valid, use_cloud_function, project, respect_skip, validate_schemas
-    )
+    if use_cloud_function and not validate_schemas:
+        # dry runs are bound by network round trips, so send them concurrently
+        # over pooled connections instead of one connection per query
+        dry_runs = [
+            DryRun(sqlfile, respect_skip=respect_skip) for sqlfile in sorted(sql_files)
+        ]
+        DryRun.prefetch(dry_runs, concurrency=concurrency)
+        result = [dry_run.is_valid() for dry_run in dry_runs]
+    else:
+        sql_file_valid = partial(
+            _sql_file_valid, use_cloud_function, project, respect_skip, validate_schemas
+        )
 
-    with Pool(8) as p:
-        result = p.map(sql_file_valid, sql_files, chunksize=1)
+        with Pool(8) as p:
+            result = p.map(sql_file_valid, sql_files, chunksize=1)
     if not all(result):
         sys.exit(1)
 
@@ -16,6 +16,10 @@ from bigquery_etl.format_sql.format import format as format_sql
     # Format all SQL files in `sql/`
     ./bqetl format sql
 
+    # Check formatting of all SQL files in `sql/` using 8 processes,
+    # skipping files that were already formatted in a previous run
+    ./bqetl format --check --parallelism=8 --use-cache sql
+
     # Format standard in (will write to standard out)
     echo 'SELECT 1,2,3' | ./bqetl format
     """,
@@ -33,6 +37,21 @@ from bigquery_etl.format_sql.format import format as format_sql
     " return code 0 indicates nothing would change;"
     " return code 1 indicates some files would be reformatted",
 )
-def format(paths, check):
+@click.option(
+    "--parallelism",
+    "-p",
+    default=1,
+    type=int,
+    help="Number of processes used to format files in parallel",
+)
+@click.option(
+    "--use-cache",
+    "--use_cache",
+    default=False,
+    is_flag=True,
+    help="Skip files whose content is already known to be formatted by the current"
+    " formatter version; known content hashes are stored in the bqetl cache directory",
+)
+def format(paths, check, parallelism, use_cache):
     """Apply formatting to SQL files."""
-    format_sql(paths, check=check)
+    format_sql(paths, check=check, parallelism=parallelism, use_cache=use_cache)
@@ -3,13 +3,13 @@
 import copy
 import datetime
 import logging
-import multiprocessing
 import os
 import re
 import string
 import subprocess
 import sys
 import tempfile
+import threading
 import typing
 from datetime import date, timedelta
 from functools import partial
@@ -24,6 +24,7 @@ from dateutil.rrule import MONTHLY, rrule
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
 
+from ..backfill.executor import BackfillExecutor, partition_id
 from ..backfill.utils import QUALIFIED_TABLE_NAME_RE, qualified_table_name_matching
 from ..cli import check
 from ..cli.format import format
@@ -518,14 +519,7 @@ def _backfill_query(
 ):
     """Run a query backfill for a specific date."""
     project, dataset, table = extract_from_query_path(query_file_path)
-
-    match partitioning_type:
-        case PartitionType.DAY:
-            partition = backfill_date.strftime("%Y%m%d")
-        case PartitionType.MONTH:
-            partition = backfill_date.strftime("%Y%m")
-        case _:
-            raise ValueError(f"Unsupported partitioning type: {partitioning_type}")
+    partition = partition_id(partitioning_type, backfill_date)
 
     backfill_date = backfill_date.strftime("%Y-%m-%d")
     if backfill_date not in exclude:
@@ -592,8 +586,30 @@ def _backfill_query(
     return True
 
 
+def _render_backfill_checks(
+    checks_file, project_id, dataset, table, date_partition_parameter, backfill_date
+):
+    """Render the checks of a query for a backfilled date."""
+    return check._render_checks(
+        checks_file,
+        dataset,
+        table,
+        [
+            f"--parameter={date_partition_parameter}:DATE:{backfill_date:%Y-%m-%d}",
+            "--use_legacy_sql=false",
+            f"--project_id={project_id}",
+        ],
+    )
+
+
 @query.command(
-    help="""Run a backfill for a query. Additional parameters will get passed to bq.
+    help="""Run a backfill for a query.
+
+    Query jobs for the backfilled dates are submitted from a single process.
+    With --resume, dates that were completed by an interrupted backfill of the
+    same query are skipped.
+    Additional parameters will get passed to bq, which then runs the query
+    for each date instead.
 
     Examples:
 
@@ -679,6 +695,11 @@ def _backfill_query(
 @click.option(
     "--checks/--no-checks", help="Whether to run checks during backfill", default=False
 )
+@click.option(
+    "--resume/--no-resume",
+    help="Whether to skip dates completed by an interrupted run of the backfill",
+    default=False,
+)
 @click.pass_context
 def backfill(
     ctx,
@@ -694,6 +715,7 @@ def backfill(
     no_partition,
     destination_table,
     checks,
+    resume,
 ):
     """Run a backfill."""
     if not is_authenticated():
@@ -720,6 +742,8 @@ def backfill(
 
         depends_on_past = False
         date_partition_parameter = "submission_date"
+        partitioning_type = PartitionType.DAY
+        metadata = None
 
         try:
             metadata = Metadata.of_query_file(str(query_file_path))
@@ -780,6 +804,54 @@ def backfill(
         except NotFound:
             ctx.invoke(initialize, name=query_file, dry_run=dry_run)
 
+        if not ctx.args:
+            query_destination_table = destination_table
+            if metadata and metadata.is_public_bigquery():
+                if not validate_metadata.validate_public_data(
+                    metadata, query_file_path
+                ):
+                    sys.exit(1)
+                # like query run, write results to the public dataset
+                if query_destination_table is None:
+                    public_project_id = ConfigLoader.get(
+                        "default", "public_project", fallback="mozilla-public-data"
+                    )
+                    query_destination_table = f"{public_project_id}.{dataset}.{table}"
+
+            checks_file = query_file_path.parent / "checks.sql"
+            try:
+                executor = BackfillExecutor(
+                    client,
+                    query_file_path,
+                    project_id,
+                    date_partition_parameter=date_partition_parameter,
+                    destination_table=query_destination_table,
+                    partitioning_type=partitioning_type,
+                    no_partition=no_partition,
+                    depends_on_past=depends_on_past,
+                    max_in_flight=parallelism,
+                    dry_run=dry_run,
+                    checks=(
+                        partial(
+                            _render_backfill_checks,
+                            checks_file,
+                            project_id,
+                            dataset,
+                            table,
+                            date_partition_parameter,
+                        )
+                        if checks and checks_file.exists()
+                        else None
+                    ),
+                    resume=resume,
+                )
+            except ValueError as e:
+                click.echo(e, err=True)
+                sys.exit(1)
+            if not executor.run(dates, exclude=exclude):
+                sys.exit(1)
+            continue
+
         backfill_query = partial(
             _backfill_query,
             query_file_path,
@@ -1529,8 +1601,10 @@ def update(
         name, sql_dir, project_id, files=["query.sql"]
     )
     dependency_graph = get_dependency_graph([sql_dir], without_views=True)
-    manager = multiprocessing.Manager()
-    tmp_tables = manager.dict({})
+    # callbacks run concurrently on threads, so access to the temporary tables
+    # they share is guarded by a lock
+    tmp_tables: typing.Dict[str, str] = {}
+    tmp_tables_lock = threading.Lock()
 
     # order query files to make sure derived_from dependencies are resolved
     query_file_graph = {}
@@ -1567,6 +1641,7 @@ def update(
             use_cloud_function,
             respect_dryrun_skip,
             update_downstream,
+            tmp_tables_lock,
         )
     )
 
@@ -1586,9 +1661,12 @@ def _update_query_schema_with_downstream(
     use_cloud_function=True,
     respect_dryrun_skip=True,
     update_downstream=False,
+    tmp_tables_lock=None,
     query_file=None,
     follow_up_queue=None,
 ):
+    if tmp_tables_lock is None:
+        tmp_tables_lock = threading.Lock()
     try:
         changed = _update_query_schema(
             query_file,
@@ -1598,6 +1676,7 @@ def _update_query_schema_with_downstream(
             tmp_tables,
             use_cloud_function,
             respect_dryrun_skip,
+            tmp_tables_lock,
         )
 
         if update_downstream:
@@ -1616,10 +1695,13 @@ def _update_query_schema_with_downstream(
                 tmp_identifier = f"{project}.{tmp_dataset}.{table}_{random_str(12)}"
 
                 # create temporary table with updated schema
-                if identifier not in tmp_tables:
-                    schema = Schema.from_schema_file(query_file.parent / SCHEMA_FILE)
-                    schema.deploy(tmp_identifier)
-                    tmp_tables[identifier] = tmp_identifier
+                with tmp_tables_lock:
+                    if identifier not in tmp_tables:
+                        schema = Schema.from_schema_file(
+                            query_file.parent / SCHEMA_FILE
+                        )
+                        schema.deploy(tmp_identifier)
+                        tmp_tables[identifier] = tmp_identifier
 
                 # get downstream dependencies that will be updated in the next iteration
                 dependencies = [
@@ -1647,6 +1729,7 @@ def _update_query_schema(
     tmp_tables={},
     use_cloud_function=True,
     respect_dryrun_skip=True,
+    tmp_tables_lock=None,
 ):
     """
     Update the schema of a specific query file.
@@ -1657,7 +1740,11 @@ def _update_query_schema(
         click.echo(f"{query_file} dry runs are skipped. Cannot update schemas.")
         return
 
-    tmp_tables = copy.deepcopy(tmp_tables)
+    if tmp_tables_lock is None:
+        tmp_tables_lock = threading.Lock()
+    # temporary tables deployed for this query only replace references in it
+    with tmp_tables_lock:
+        tmp_tables = copy.deepcopy(tmp_tables)
     query_file_path = Path(query_file)
     existing_schema_path = query_file_path.parent / SCHEMA_FILE
     project_name, dataset_name, table_name = extract_from_query_path(query_file_path)
@@ -4,7 +4,6 @@ import re
 import string
 import sys
 from fnmatch import fnmatchcase
-from graphlib import TopologicalSorter
 from multiprocessing.pool import Pool, ThreadPool
 from traceback import print_exc
 
@@ -24,7 +23,9 @@ from ..dryrun import DryRun
 from ..metadata.parse_metadata import METADATA_FILE, Metadata
 from ..util.bigquery_id import sql_table_id
 from ..util.client_queue import ClientQueue
+from ..util.parallel_topological_sorter import ParallelTopologicalSorter
 from ..view import View, broken_views
+from ..view.diff import ViewDiff
 from .dryrun import dryrun
 
 VIEW_NAME_RE = re.compile(r"(?P<dataset>[a-zA-z0-9_]+)\.(?P<name>[a-zA-z0-9_]+)")
@@ -237,8 +238,7 @@ def publish(
             view.labels["managed"] = ""
     if not force:
         # only views with changes
-        with ThreadPool(parallelism) as p:
-            changes = p.map(lambda v: v.has_changes(target_project), views, chunksize=1)
+        changes = ViewDiff().changes(views, target_project, parallelism)
         views = [v for v, has_changes in zip(views, changes) if has_changes]
     views_by_id = {v.view_identifier: v for v in views}
 
@@ -249,18 +249,20 @@ def publish(
         for view in views
     }
 
-    view_id_order = TopologicalSorter(view_id_graph).static_order()
+    result = {}
 
-    result = []
-    for view_id in view_id_order:
+    def _publish(view_id, _follow_up_queue):
         try:
-            result.append(views_by_id[view_id].publish(target_project, dry_run))
+            result[view_id] = views_by_id[view_id].publish(target_project, dry_run)
         except Exception:
             print(f"Failed to publish view: {view_id}")
             print_exc()
-            result.append(False)
+            result[view_id] = False
 
-    if not all(result):
+    # publish views concurrently, each view once all views it references are published
+    ParallelTopologicalSorter(view_id_graph, parallelism=parallelism).map(_publish)
+
+    if not all(result.values()):
         sys.exit(1)
 
     click.echo("All have been published.")
@@ -1,11 +1,13 @@
 """Build and use query dependency graphs."""
 
+import json
 import re
 import sys
+from functools import lru_cache
 from itertools import groupby
 from pathlib import Path
 from subprocess import CalledProcessError
-from typing import Dict, Iterator, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import click
 import sqlglot
@@ -13,6 +15,7 @@ import yaml
 
 from bigquery_etl.config import ConfigLoader
 from bigquery_etl.schema.stable_table_schema import get_stable_table_schemas
+from bigquery_etl.util.cache import atomic_write, cache_dir, content_hash
 from bigquery_etl.util.common import render
 
 stable_views = None
@@ -28,11 +31,50 @@ def _raw_table_name(table: sqlglot.exp.Table) -> str:
     )
 
 
+@lru_cache
+def _parser_version() -> str:
+    """Return a hash of sqlglot's version and of the reference extraction source."""
+    return content_hash(sqlglot.__version__, Path(__file__).read_bytes())
+
+
+def _reference_cache_path(sql: str) -> Optional[Path]:
+    """Return the path of the on-disk cache entry for sql, if the cache is usable."""
+    key = content_hash(_parser_version(), sql)
+    try:
+        return cache_dir("table_references", key[:2]) / f"{key}.json"
+    except OSError:
+        return None
+
+
 def extract_table_references(sql: str) -> List[str]:
-    """Return a list of tables referenced in the given SQL."""
+    """Return a list of tables referenced in the given SQL.
+
+    Results are cached on disk, keyed by the SQL and the sqlglot version, because
+    parsing is expensive and most queries do not change between runs.
+    """
     # sqlglot cannot handle scripts with variables and control statements
     if re.search(r"^\s*DECLARE\b", sql, flags=re.MULTILINE):
         return []
+
+    cache_path = _reference_cache_path(sql)
+    if cache_path is not None:
+        try:
+            return json.loads(cache_path.read_text())
+        except (OSError, ValueError):
+            pass
+
+    tables = _parse_table_references(sql)
+
+    if cache_path is not None:
+        try:
+            atomic_write(cache_path, json.dumps(tables).encode("utf-8"))
+        except OSError:
+            pass
+    return tables
+
+
+def _parse_table_references(sql: str) -> List[str]:
+    """Parse sql with sqlglot and return a list of referenced tables."""
     # sqlglot parses UDFs with keyword names incorrectly:
     # https://github.com/tobymao/sqlglot/issues/1535
     sql = re.sub(
@@ -76,7 +118,20 @@ def extract_table_references(sql: str) -> List[str]:
 
 
 def extract_table_references_without_views(path: Path) -> Iterator[str]:
-    """Recursively search for non-view tables referenced in the given SQL file."""
+    """Recursively search for non-view tables referenced in the given SQL file.
+
+    References are memoized per file for the lifetime of the process, so that views
+    referenced by many queries are only rendered and parsed once.
+    """
+    yield from _table_references_without_views(Path(path))
+
+
+@lru_cache(maxsize=None)
+def _table_references_without_views(path: Path) -> Tuple[str, ...]:
+    return tuple(_resolve_table_references_without_views(path))
+
+
+def _resolve_table_references_without_views(path: Path) -> Iterator[str]:
     global stable_views
 
     sql = render(path.name, template_folder=path.parent)
@@ -102,7 +157,7 @@ def extract_table_references_without_views(path: Path) -> Iterator[str]:
             if view_path == path:
                 continue  # skip self references
             if view_path.is_file():
-                yield from extract_table_references_without_views(view_path)
+                yield from _table_references_without_views(view_path)
                 break
         else:
             # use directory structure to fully qualify table names
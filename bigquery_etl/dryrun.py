@@ -14,7 +14,9 @@ proxy the queries through the dry run service endpoint.
 import glob
 import json
 import re
+from collections import defaultdict
 from enum import Enum
+from functools import lru_cache
 from os.path import basename, dirname, exists
 from pathlib import Path
 from typing import Set
@@ -24,6 +26,8 @@ import click
 from google.cloud import bigquery
 
 from .config import ConfigLoader
+from .dryrun_cache import DryRunCache, default_cache
+from .dryrun_client import DEFAULT_CONCURRENCY, dry_run_batch
 from .metadata.parse_metadata import Metadata
 from .util.common import render
 
@@ -54,6 +58,7 @@ class DryRun:
         client=None,
         respect_skip=True,
         sql_dir=ConfigLoader.get("default", "sql_dir"),
+        use_cache=True,
     ):
         """Instantiate DryRun class."""
         self.sqlfile = sqlfile
@@ -64,6 +69,7 @@ class DryRun:
         self.respect_skip = respect_skip
         self.dry_run_url = ConfigLoader.get("dry_run", "function")
         self.sql_dir = sql_dir
+        self.use_cache = use_cache
         try:
             self.metadata = Metadata.of_query_file(self.sqlfile)
         except FileNotFoundError:
@@ -128,9 +134,8 @@ class DryRun:
 
         return sql
 
-    @cached_property
-    def dry_run_result(self):
-        """Dry run the provided SQL file."""
+    def dry_run_request(self):
+        """Return the default dataset and the SQL to send for the dry run."""
         if self.content:
             sql = self.content
         else:
@@ -158,6 +163,38 @@ class DryRun:
                 )
                 sql = pattern.sub("@submission_date", sql)
         dataset = basename(dirname(dirname(self.sqlfile)))
+        return dataset, sql
+
+    def _cache_key(self, dataset, sql):
+        """Return the key for caching the dry run result, or None to not cache it.
+
+        Only Cloud Function dry runs are cached, keyed on the schemas deploy that
+        they ran against.
+        """
+        if not (self.use_cache and self.use_cloud_function and default_cache()):
+            return None
+        schemas_build_id = _schemas_build_id(self.dry_run_url)
+        if schemas_build_id is None:
+            return None
+        return DryRunCache.key(self.dry_run_url, dataset, sql, schemas_build_id)
+
+    @cached_property
+    def dry_run_result(self):
+        """Dry run the provided SQL file."""
+        dataset, sql = self.dry_run_request()
+        cache = default_cache()
+        cache_key = self._cache_key(dataset, sql)
+        if cache is not None and cache_key is not None:
+            result = cache.get(cache_key)
+            if result is not None:
+                return result
+        result = self._dry_run(dataset, sql)
+        if cache is not None and cache_key is not None and cache.cacheable(result):
+            cache.put(cache_key, result)
+        return result
+
+    def _dry_run(self, dataset, sql):
+        """Send the dry run request for sql with the given default dataset."""
         try:
             if self.use_cloud_function:
                 r = urlopen(
@@ -216,6 +253,45 @@ class DryRun:
             print(f"{self.sqlfile!s:59} ERROR\n", e)
             return None
 
+    @staticmethod
+    def prefetch(dry_runs, concurrency=DEFAULT_CONCURRENCY):
+        """Dry run many files concurrently through the dry run service.
+
+        Results are stored on each DryRun, so that subsequent calls such as
+        `is_valid` or `get_schema` do not send further requests. DryRuns that do
+        not use the Cloud Function, or that already have a result, are ignored.
+        """
+        cache = default_cache()
+        pending_by_url = defaultdict(list)
+        for dry_run in dry_runs:
+            if dry_run.use_cloud_function and "dry_run_result" not in vars(dry_run):
+                dataset, sql = dry_run.dry_run_request()
+                cache_key = dry_run._cache_key(dataset, sql)
+                if cache is not None and cache_key is not None:
+                    result = cache.get(cache_key)
+                    if result is not None:
+                        # populate the cached property
+                        vars(dry_run)["dry_run_result"] = result
+                        continue
+                pending_by_url[dry_run.dry_run_url].append(
+                    (dry_run, dataset, sql, cache_key)
+                )
+
+        for url, pending in pending_by_url.items():
+            results = dry_run_batch(
+                [(dataset, sql) for _, dataset, sql, _ in pending],
+                url=url,
+                concurrency=concurrency,
+            )
+            for (dry_run, _, _, cache_key), result in zip(pending, results):
+                if isinstance(result, Exception):
+                    print(f"{dry_run.sqlfile!s:59} ERROR\n", result)
+                    result = None
+                elif cache is not None and cache_key is not None:
+                    if cache.cacheable(result):
+                        cache.put(cache_key, result)
+                vars(dry_run)["dry_run_result"] = result
+
     def get_referenced_tables(self):
         """Return referenced tables by dry running the SQL file."""
         if not self.skip() and not self.is_valid():
@@ -448,6 +524,23 @@ class DryRun:
         return True
 
 
+@lru_cache
+def _schemas_build_id(dry_run_url):
+    """Return the schemas_build_id label of the most recent production schemas deploy.
+
+    Like `schema.stable_table_schema.prod_schemas_uri`, this reads the dataset
+    labels of a fake query sent to the dry run service.
+    """
+    probe = DryRun(
+        "telemetry_derived/foo/query.sql", content="SELECT 1", use_cache=False
+    )
+    probe.dry_run_url = dry_run_url
+    labels = (probe.dry_run_result or {}).get("datasetLabels")
+    if isinstance(labels, dict):
+        return labels.get("schemas_build_id")
+    return None
+
+
 def sql_file_valid(sqlfile):
     """Dry run SQL files."""
     return DryRun(sqlfile).is_valid()
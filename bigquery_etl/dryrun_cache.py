@@ -0,0 +1,139 @@
+"""
+Persistent content-addressed cache for dry run results.
+
+Results are keyed on the rendered SQL, the default dataset and the
+`schemas_build_id` label of the most recent production schemas deploy, so that
+unchanged queries are not sent to the dry run service again until the stable
+table schemas change. Entries expire after a TTL, and the least recently used
+entries are evicted when the cache exceeds its maximum size.
+
+The cache directory may be shared between processes and machines.
+"""
+
+import json
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from .config import ConfigLoader
+from .util.cache import atomic_write, cache_dir, content_hash
+
+# overrides dry_run.cache.enabled in bqetl_project.yaml, e.g. to enable it in CI
+CACHE_ENABLED_ENV = "BQETL_DRY_RUN_CACHE"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_SIZE_MB = 512
+# number of writes between checks of the total cache size
+EVICTION_INTERVAL = 100
+
+
+class DryRunCache:
+    """On-disk cache of dry run results."""
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_MB * 1024 * 1024,
+    ):
+        """Initialize."""
+        self.directory = Path(directory) if directory else cache_dir("dryrun")
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self._writes = 0
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Return the cache key for the given parts."""
+        return content_hash(*parts)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached result for key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        if time.time() - entry["created"] > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            # modification time tracks last use for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["result"]
+
+    def put(self, key: str, result: dict):
+        """Store the result for key."""
+        entry = {"created": time.time(), "result": result}
+        atomic_write(self._path(key), json.dumps(entry).encode("utf-8"))
+        if self._writes % EVICTION_INTERVAL == 0:
+            self.evict()
+        self._writes += 1
+
+    def evict(self):
+        """Remove expired entries, then least recently used entries over max size."""
+        now = time.time()
+        entries = []
+        total_size = 0
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # removed by another process
+            if now - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+    @staticmethod
+    def cacheable(result: Optional[dict]) -> bool:
+        """Return whether a dry run result may be cached.
+
+        Only valid results, and results that are only invalid because the dry run
+        service is not allowed to create tables or views, are cached. Other errors
+        may be resolved without changes to the query or the stable table schemas,
+        for example by deploying a referenced table.
+        """
+        if not result:
+            return False
+        if result.get("valid"):
+            return True
+        errors = result.get("errors") or []
+        return len(errors) == 1 and any(
+            message in errors[0].get("message", "")
+            for message in (
+                "does not have bigquery.tables.create permission for dataset",
+                "Permission bigquery.tables.create denied",
+            )
+        )
+
+
+@lru_cache
+def default_cache() -> Optional[DryRunCache]:
+    """Return the configured dry run cache, or None if caching is disabled."""
+    config = ConfigLoader.get("dry_run", "cache", fallback={}) or {}
+    enabled = os.environ.get(CACHE_ENABLED_ENV)
+    if enabled is None:
+        is_enabled = bool(config.get("enabled", False))
+    else:
+        is_enabled = enabled.lower() in ("1", "true", "yes")
+    if not is_enabled:
+        return None
+    directory = config.get("dir")
+    return DryRunCache(
+        directory=Path(ConfigLoader.project_dir) / directory if directory else None,
+        ttl_seconds=config.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+        max_size_bytes=config.get("max_size_mb", DEFAULT_MAX_SIZE_MB) * 1024 * 1024,
+    )
@@ -0,0 +1,127 @@
+"""
+Asynchronous, batched client for the dry run service.
+
+Sends many dry run requests to the dry run Cloud Function over a pool of
+keep-alive HTTP connections, instead of opening a new connection per query.
+Requests that fail with a connection error, a timeout or a retryable status
+code are retried with exponential backoff.
+"""
+
+import asyncio
+import json
+from typing import Iterable, List, Optional, Tuple, Union
+
+import aiohttp
+
+from .config import ConfigLoader
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 300
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class DryRunServiceError(Exception):
+    """Dry run service responded with an unexpected status code."""
+
+    def __init__(self, status: int, message: str):
+        """Initialize."""
+        super().__init__(f"Dry run service responded with {status}: {message}")
+        self.status = status
+
+
+class DryRunClient:
+    """Asynchronous client for the dry run service.
+
+    Must be used as an async context manager, which owns the pooled HTTP session:
+
+        async with DryRunClient() as client:
+            results = await client.dry_run_batch([(dataset, sql), ...])
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        """Initialize."""
+        self.url = url or ConfigLoader.get("dry_run", "function")
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        """Open a session with at most concurrency keep-alive connections."""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"Content-Type": "application/json"},
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Close the session and its connections."""
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+
+    async def dry_run(self, dataset: str, sql: str) -> dict:
+        """Dry run sql with dataset as the default dataset and return the response.
+
+        Raises the last error if the request still fails after all retries.
+        """
+        if self._session is None or self._semaphore is None:
+            raise RuntimeError("DryRunClient must be used as an async context manager")
+        payload = json.dumps({"dataset": dataset, "query": sql}).encode("utf8")
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    async with self._session.post(self.url, data=payload) as response:
+                        body = await response.text()
+                        if response.status != 200:
+                            raise DryRunServiceError(response.status, body)
+                        return json.loads(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError, DryRunServiceError) as e:
+                retryable = (
+                    not isinstance(e, DryRunServiceError)
+                    or e.status in RETRYABLE_STATUS_CODES
+                )
+                if not retryable or attempt >= self.retries:
+                    raise
+            await asyncio.sleep(self.backoff * 2**attempt)
+            attempt += 1
+
+    async def dry_run_batch(
+        self, requests: Iterable[Tuple[str, str]]
+    ) -> List[Union[dict, Exception]]:
+        """Dry run many (dataset, sql) pairs concurrently.
+
+        Results are returned in the order of requests. Requests that failed are
+        represented by the exception that was raised, so that one failure does not
+        prevent the other results from being returned.
+        """
+        return await asyncio.gather(
+            *(self.dry_run(dataset, sql) for dataset, sql in requests),
+            return_exceptions=True,
+        )
+
+
+def dry_run_batch(
+    requests: Iterable[Tuple[str, str]], **kwargs
+) -> List[Union[dict, Exception]]:
+    """Dry run many (dataset, sql) pairs concurrently, see DryRunClient."""
+
+    async def _dry_run_batch():
+        async with DryRunClient(**kwargs) as client:
+            return await client.dry_run_batch(requests)
+
+    return asyncio.run(_dry_run_batch())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""Benchmark tokenize against the sequential reference tokenizer."""
+
+import os
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+
+from bigquery_etl.format_sql.tokenizer import tokenize, tokenize_sequential
+
+parser = ArgumentParser(description=__doc__)
+parser.add_argument(
+    "paths",
+    nargs="*",
+    default=["sql"],
+    help="SQL files or directories to tokenize; Defaults to sql",
+)
+
+
+def _sql_files(paths):
+    """Yield all .sql files in paths, sorted for stable output."""
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(
+                os.path.join(dirpath, filename)
+                for dirpath, _, filenames in os.walk(path)
+                for filename in filenames
+                if filename.endswith(".sql")
+            )
+        else:
+            yield path
+
+
+def _timed_tokens(tokenizer, query):
+    """Return (type name, value) tuples for query and the time taken to tokenize."""
+    start = perf_counter()
+    try:
+        tokens = [(type(token).__name__, token.value) for token in tokenizer(query)]
+    except ValueError as e:
+        tokens = [("ValueError", str(e))]
+    return tokens, perf_counter() - start
+
+
+def main():
+    """Tokenize every file with both tokenizers and compare output."""
+    args = parser.parse_args()
+    files = mismatches = 0
+    sequential_seconds = tokenize_seconds = 0.0
+    for path in _sql_files(args.paths):
+        with open(path) as fp:
+            query = fp.read()
+        expected, seconds = _timed_tokens(tokenize_sequential, query)
+        sequential_seconds += seconds
+        actual, seconds = _timed_tokens(tokenize, query)
+        tokenize_seconds += seconds
+        files += 1
+        if actual != expected:
+            mismatches += 1
+            index = next(
+                (i for i, (a, e) in enumerate(zip(actual, expected)) if a != e),
+                min(len(actual), len(expected)),
+            )
+            print(f"Mismatch in {path} at token {index}", file=sys.stderr)
+    print(
+        f"Tokenized {files} files: sequential {sequential_seconds:.2f}s, "
+        f"tokenize {tokenize_seconds:.2f}s"
+        + (
+            f" ({sequential_seconds / tokenize_seconds:.1f}x faster)"
+            if tokenize_seconds
+            else ""
+        )
+    )
+    if mismatches:
+        print(f"{mismatches} files produced different tokens", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
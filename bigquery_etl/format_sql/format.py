@@ -1,12 +1,19 @@
 """Format SQL."""
 
 import glob
+import json
 import os
 import os.path
 import sys
+from functools import partial
+from multiprocessing.pool import Pool
+from pathlib import Path
 
 from bigquery_etl.config import ConfigLoader
 from bigquery_etl.format_sql.formatter import reformat  # noqa E402
+from bigquery_etl.util.cache import atomic_write, cache_dir, content_hash
+
+FORMATTER_SOURCES = ("formatter.py", "tokenizer.py")
 
 
 def skip_format():
@@ -18,8 +25,70 @@ def skip_format():
     ]
 
 
-def format(paths, check=False):
-    """Format SQL files."""
+def formatter_version():
+    """Return a hash of the formatter source, which changes when formatting may."""
+    source_dir = Path(__file__).parent
+    return content_hash(
+        *(source_dir.joinpath(source).read_bytes() for source in FORMATTER_SOURCES)
+    )
+
+
+class FormatCache:
+    """Content hashes of files known to be formatted by the current formatter.
+
+    Hashes are stored in one file per formatter version, so that changes to the
+    formatter invalidate the cache. Files for other versions are removed on save.
+    """
+
+    def __init__(self, directory=None):
+        """Load hashes for the current formatter version."""
+        self.directory = Path(directory) if directory else cache_dir("format")
+        self.path = self.directory / f"{formatter_version()}.json"
+        try:
+            self.hashes = set(json.loads(self.path.read_text()))
+        except (FileNotFoundError, ValueError):
+            self.hashes = set()
+        self._changed = False
+
+    def __contains__(self, query_hash):
+        """Return whether the query with the given hash is known to be formatted."""
+        return query_hash in self.hashes
+
+    def add(self, query_hash):
+        """Record that the query with the given hash is formatted."""
+        if query_hash not in self.hashes:
+            self.hashes.add(query_hash)
+            self._changed = True
+
+    def save(self):
+        """Write hashes to disk and remove caches for other formatter versions."""
+        if not self._changed:
+            return
+        atomic_write(self.path, json.dumps(sorted(self.hashes)).encode("utf-8"))
+        for path in self.directory.glob("*.json"):
+            if path != self.path:
+                path.unlink(missing_ok=True)
+        self._changed = False
+
+
+def _format_file(path, check=False):
+    """Format a single file and return whether it was reformatted, and its hash."""
+    with open(path) as fp:
+        query = fp.read()
+    formatted = reformat(query, trailing_newline=True)
+    if query != formatted and not check:
+        with open(path, "w") as fp:
+            fp.write(formatted)
+    return query != formatted, content_hash(query)
+
+
+def format(paths, check=False, parallelism=1, use_cache=False):
+    """Format SQL files.
+
+    With parallelism greater than 1, files are formatted in a process pool. With
+    use_cache, files whose content is already known to be formatted by the current
+    formatter version are skipped without being parsed.
+    """
     if not paths:
         query = sys.stdin.read()
         formatted = reformat(query, trailing_newline=True)
@@ -29,6 +98,7 @@ def format(paths, check=False):
             sys.exit(1)
     else:
         sql_files = []
+        skip = set(skip_format())
 
         for path in paths:
             if os.path.isdir(path):
@@ -40,7 +110,7 @@ def format(paths, check=False):
                     # skip tests/**/input.sql
                     and not (path.startswith("tests") and filename == "input.sql")
                     for filepath in [os.path.join(dirpath, filename)]
-                    if filepath not in skip_format()
+                    if filepath not in skip
                 )
             elif path:
                 sql_files.append(path)
@@ -48,21 +118,30 @@ def format(paths, check=False):
             print("Error: no files were found to format")
             sys.exit(255)
         sql_files.sort()
-        reformatted = unchanged = 0
-        for path in sql_files:
-            with open(path) as fp:
-                query = fp.read()
-            formatted = reformat(query, trailing_newline=True)
-            if query != formatted:
-                if check:
-                    print(f"Needs reformatting: bqetl format {path}")
-                else:
-                    with open(path, "w") as fp:
-                        fp.write(formatted)
-                    print(f"Reformatted: {path}")
-                reformatted += 1
-            else:
-                unchanged += 1
+
+        cache = FormatCache() if use_cache else None
+        unchanged = 0
+        if cache is not None:
+            pending = []
+            for path in sql_files:
+                with open(path) as fp:
+                    if content_hash(fp.read()) in cache:
+                        unchanged += 1
+                    else:
+                        pending.append(path)
+            sql_files = pending
+
+        format_file = partial(_format_file, check=check)
+        if parallelism > 1 and len(sql_files) > 1:
+            with Pool(parallelism) as pool:
+                results = pool.imap(format_file, sql_files, chunksize=8)
+                reformatted = _report(sql_files, results, check, cache)
+        else:
+            reformatted = _report(sql_files, map(format_file, sql_files), check, cache)
+        unchanged += len(sql_files) - reformatted
+
+        if cache is not None:
+            cache.save()
         print(
             ", ".join(
                 f"{number} file{'s' if number > 1 else ''}"
@@ -77,3 +156,18 @@ def format(paths, check=False):
         )
         if check and reformatted:
             sys.exit(1)
+
+
+def _report(sql_files, results, check, cache):
+    """Print the result for each file in order, and return the number reformatted."""
+    reformatted = 0
+    for path, (changed, query_hash) in zip(sql_files, results):
+        if changed:
+            if check:
+                print(f"Needs reformatting: bqetl format {path}")
+            else:
+                print(f"Reformatted: {path}")
+            reformatted += 1
+        elif cache is not None:
+            cache.add(query_hash)
+    return reformatted
@@ -3,6 +3,7 @@
 import re
 import sys
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Iterator
 
 # These words get their own line followed by increased indent
@@ -904,8 +905,134 @@ BIGQUERY_TOKEN_PRIORITY = [
 ]
 
 
+# flags that can be applied to a subpattern as inline (?flags:...) modifiers
+_INLINE_FLAGS = {
+    re.IGNORECASE: "i",
+    re.MULTILINE: "m",
+    re.DOTALL: "s",
+    re.VERBOSE: "x",
+}
+# numbered backreference that is not itself escaped
+_BACKREFERENCE = re.compile(r"(?<!\\)((?:\\\\)*)\\(\d+)")
+
+
+@lru_cache
+def _compile_token_pattern(token_priority: tuple[type[Token], ...]) -> re.Pattern:
+    """
+    Compile a single regex that matches the first token type in priority order.
+
+    Each token type pattern becomes a named group ``t<index>`` of one alternation,
+    so ``match.lastgroup`` identifies the token type. Pattern flags are applied as
+    inline modifiers, and numbered backreferences are shifted to account for the
+    groups of preceding token types.
+    """
+    alternatives = []
+    groups = 0
+    for index, token_type in enumerate(token_priority):
+        pattern = token_type.pattern
+        offset = groups + 1  # account for the named group wrapping this pattern
+        source = _BACKREFERENCE.sub(
+            lambda m: f"{m.group(1)}\\{int(m.group(2)) + offset}", pattern.pattern
+        )
+        flags = "".join(
+            flag for mask, flag in _INLINE_FLAGS.items() if pattern.flags & mask
+        )
+        if flags:
+            source = f"(?{flags}:{source})"
+        alternatives.append(f"(?P<t{index}>{source})")
+        groups = offset + pattern.groups
+    return re.compile("|".join(alternatives))
+
+
 def tokenize(query, token_priority=BIGQUERY_TOKEN_PRIORITY) -> Iterator[Token]:
-    """Split query into a series of tokens."""
+    """Split query into a series of tokens.
+
+    Token types are matched with a single precompiled alternation in priority order,
+    advancing a position index instead of slicing the query, so tokenizing is linear
+    in the length of the query. Output is identical to `tokenize_sequential`.
+    """
+    token_priority = tuple(token_priority)
+    token_pattern = _compile_token_pattern(token_priority)
+    open_blocks: list[BlockStartKeyword] = []
+    open_angle_brackets = 0
+    angle_bracket_is_operator = True
+    reserved_keyword_is_identifier = False
+
+    def resolve(token_type, value):
+        """Build a token for a match, or return None if the match is not allowed."""
+        nonlocal open_angle_brackets
+        token = token_type(value)
+        # handle stateful matches
+        if isinstance(token, MaybeCaseSubclause):
+            if open_blocks and open_blocks[-1].value.upper() == "CASE":
+                token = CaseSubclause(token.value)
+            else:
+                token = BlockMiddleKeyword(token.value)
+        elif isinstance(token, MaybeOpeningAngleBracket):
+            if angle_bracket_is_operator:
+                return None  # prevent matching operator as opening bracket
+            token = OpeningBracket(token.value)
+            open_angle_brackets += 1
+        elif isinstance(token, MaybeClosingAngleBracket):
+            if angle_bracket_is_operator:
+                return None  # prevent matching operator as closing bracket
+            token = ClosingBracket(token.value)
+            open_angle_brackets -= 1
+        elif (
+            reserved_keyword_is_identifier
+            and isinstance(token, ReservedKeyword)
+            and Identifier.pattern.match(token.value) is not None
+        ):
+            return None  # prevent matching identifier as keyword
+        return token
+
+    pos, end = 0, len(query)
+    while pos < end:
+        token = None
+        match = token_pattern.match(query, pos)
+        if match is not None:
+            group = match.lastgroup  # every alternative is a named group
+            index = int(group[1:])  # type: ignore
+            token = resolve(token_priority[index], match.group(group))  # type: ignore
+            # the first match was rejected by state, so fall back to trying the
+            # remaining token types in priority order
+            for token_type in token_priority[index + 1 :]:
+                if token is not None:
+                    break
+                type_match = token_type.pattern.match(query, pos)
+                if type_match is not None:
+                    token = resolve(token_type, type_match.group())
+        if token is None:
+            raise ValueError(f"Could not determine next token in {query[pos:]!r}")
+        yield token
+        pos += len(token.value)
+        # update stateful conditions for next token
+        if isinstance(token, BlockEndKeyword) and open_blocks:
+            open_blocks.pop()
+        if isinstance(token, BlockStartKeyword):
+            open_blocks.append(token)
+        if not isinstance(token, (Comment, Whitespace)):
+            # angle brackets are operators unless already in angle bracket
+            # block or preceded by an AngleBracketKeyword
+            angle_bracket_is_operator = not (
+                open_angle_brackets > 0 or isinstance(token, AngleBracketKeyword)
+            )
+            # field access operator may be followed by an identifier that
+            # would otherwise be a reserved keyword.
+            reserved_keyword_is_identifier = isinstance(
+                token, (FieldAccessOperator, AliasSeparator)
+            )
+
+
+def tokenize_sequential(
+    query, token_priority=BIGQUERY_TOKEN_PRIORITY
+) -> Iterator[Token]:
+    """Split query into a series of tokens by trying each token type in turn.
+
+    This is the original tokenizer, which slices the remaining query after every
+    token and is therefore quadratic in the length of the query. It is kept as a
+    reference implementation for verifying `tokenize`.
+    """
     open_blocks: list[BlockStartKeyword] = []
     open_angle_brackets = 0
     angle_bracket_is_operator = True
@@ -1,17 +1,26 @@
 """Parsing of metadata yaml files."""
 
+import copy
 import enum
 import os
 import re
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import attr
 import cattrs
 import yaml
 from google.cloud import bigquery
 
+from bigquery_etl.config import ConfigLoader
 from bigquery_etl.query_scheduling.utils import is_email, is_email_or_github_identity
 
+try:
+    # libyaml based loader, which is much faster than the pure Python loader
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader  # type: ignore
+
 METADATA_FILE = "metadata.yaml"
 DATASET_METADATA_FILE = "dataset_metadata.yaml"
 DEFAULT_WORKGROUP_ACCESS = [
@@ -19,6 +28,35 @@ DEFAULT_WORKGROUP_ACCESS = [
 ]
 DEFAULT_TABLE_WORKGROUP_ACCESS = DEFAULT_WORKGROUP_ACCESS
 
+# converters are stateless once configured, so one instance is shared
+_converter = cattrs.BaseConverter()
+
+# parsed metadata files by class and path, with the signature of the parsed file
+_parsed_files: Dict[Tuple[type, str], Tuple[Tuple[int, int], Any]] = {}
+
+
+def _load_cached(cls: type, metadata_file, parse: Callable[[str], Any]) -> Any:
+    """Return parse(metadata_file), parsed again only if the file changed.
+
+    The returned instance is shared and must not be modified.
+    """
+    path = os.path.abspath(metadata_file)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _parsed_files.get((cls, path))
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    parsed = parse(path)
+    _parsed_files[(cls, path)] = (signature, parsed)
+    return parsed
+
+
+def _forget_cached(metadata_file):
+    """Drop cached instances of a metadata file that is being rewritten."""
+    path = os.path.abspath(metadata_file)
+    for key in [key for key in _parsed_files if key[1] == path]:
+        del _parsed_files[key]
+
 
 class Literal(str):
     """Represents a YAML literal."""
@@ -214,7 +252,15 @@ class Metadata:
 
     @classmethod
     def from_file(cls, metadata_file):
-        """Parse metadata from the provided file and create a new Metadata instance."""
+        """Parse metadata from the provided file and create a new Metadata instance.
+
+        Files are only parsed again if they changed since they were last parsed.
+        """
+        return copy.deepcopy(_load_cached(cls, metadata_file, cls._parse_file))
+
+    @classmethod
+    def _parse_file(cls, metadata_file):
+        """Parse metadata from the provided file."""
         friendly_name = None
         description = None
         owners = []
@@ -229,7 +275,7 @@ class Metadata:
 
         with open(metadata_file, "r") as yaml_stream:
             try:
-                metadata = yaml.safe_load(yaml_stream)
+                metadata = yaml.load(yaml_stream, Loader=SafeLoader)
 
                 friendly_name = metadata.get("friendly_name", None)
                 description = metadata.get("description", None)
@@ -254,8 +300,7 @@ class Metadata:
                         labels["dag"] = scheduling["dag_name"]
 
                 if "bigquery" in metadata and metadata["bigquery"]:
-                    converter = cattrs.BaseConverter()
-                    bigquery = converter.structure(
+                    bigquery = _converter.structure(
                         metadata["bigquery"], BigQueryMetadata
                     )
 
@@ -269,12 +314,10 @@ class Metadata:
                             owner_idx += 1
 
                 if "schema" in metadata:
-                    converter = cattrs.BaseConverter()
-                    schema = converter.structure(metadata["schema"], SchemaMetadata)
+                    schema = _converter.structure(metadata["schema"], SchemaMetadata)
 
                 if "workgroup_access" in metadata:
-                    converter = cattrs.BaseConverter()
-                    workgroup_access = converter.structure(
+                    workgroup_access = _converter.structure(
                         metadata["workgroup_access"], List[WorkgroupAccessMetadata]
                     )
 
@@ -282,8 +325,7 @@ class Metadata:
                     references = metadata["references"]
 
                 if "external_data" in metadata:
-                    converter = cattrs.BaseConverter()
-                    external_data = converter.structure(
+                    external_data = _converter.structure(
                         metadata["external_data"], ExternalDataMetadata
                     )
                 if "deprecated" in metadata:
@@ -315,8 +357,8 @@ class Metadata:
 
     def write(self, file):
         """Write metadata information to the provided file."""
-        converter = cattrs.BaseConverter()
-        metadata_dict = converter.unstructure(self)
+        _forget_cached(file)
+        metadata_dict = _converter.unstructure(self)
 
         if metadata_dict["scheduling"] == {}:
             del metadata_dict["scheduling"]
@@ -341,7 +383,7 @@ class Metadata:
 
         file.write_text(
             yaml.dump(
-                converter.unstructure(metadata_dict),
+                _converter.unstructure(metadata_dict),
                 default_flow_style=False,
                 sort_keys=False,
             )
@@ -446,10 +488,10 @@ class DatasetMetadata:
                 "default_table_workgroup_access"
             ]
 
-        converter = cattrs.BaseConverter()
+        _forget_cached(file)
         file.write_text(
             yaml.dump(
-                converter.unstructure(metadata_dict),
+                _converter.unstructure(metadata_dict),
                 default_flow_style=False,
                 sort_keys=False,
             )
@@ -459,11 +501,115 @@ class DatasetMetadata:
     def from_file(cls, metadata_file):
         """Parse dataset metadata from the provided file.
 
-        Returns a new DatasetMetadata instance.
+        Returns a new DatasetMetadata instance. Files are only parsed again if
+        they changed since they were last parsed.
         """
+        return copy.deepcopy(_load_cached(cls, metadata_file, cls._parse_file))
+
+    @classmethod
+    def _parse_file(cls, metadata_file):
+        """Parse dataset metadata from the provided file."""
         with open(metadata_file, "r") as yaml_stream:
             try:
-                metadata = yaml.safe_load(yaml_stream)
+                metadata = yaml.load(yaml_stream, Loader=SafeLoader)
                 return cls(**metadata)
             except yaml.YAMLError as e:
                 raise e
+
+
+def _subdirectories(path: Path) -> Iterator[Path]:
+    """Yield the subdirectories of path, sorted by name."""
+    try:
+        entries = sorted(os.scandir(path), key=lambda entry: entry.name)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    for entry in entries:
+        if entry.is_dir():
+            yield Path(entry.path)
+
+
+class MetadataCatalog:
+    """
+    Project-wide index of table and dataset metadata.
+
+    Indexes the metadata.yaml files in sql_dir by `project.dataset.table`, and
+    the dataset_metadata.yaml files by `project.dataset`. Files are parsed once
+    and parsed again only if their modification time changed. `refresh()`
+    picks up files that were added or removed since the catalog was created.
+    """
+
+    def __init__(self, sql_dir=None):
+        """Create a catalog of the metadata files in sql_dir."""
+        self.sql_dir = Path(
+            sql_dir or ConfigLoader.get("default", "sql_dir", fallback="sql")
+        )
+        self._table_files: Dict[str, Path] = {}
+        self._dataset_files: Dict[str, Path] = {}
+        self.refresh()
+
+    def refresh(self):
+        """Scan sql_dir for metadata files."""
+        self._table_files = {}
+        self._dataset_files = {}
+        for project in _subdirectories(self.sql_dir):
+            for dataset in _subdirectories(project):
+                dataset_id = f"{project.name}.{dataset.name}"
+                dataset_file = dataset / DATASET_METADATA_FILE
+                if dataset_file.is_file():
+                    self._dataset_files[dataset_id] = dataset_file
+                for table in _subdirectories(dataset):
+                    metadata_file = table / METADATA_FILE
+                    if metadata_file.is_file():
+                        self._table_files[f"{dataset_id}.{table.name}"] = metadata_file
+
+    def _table(self, table_id: str) -> Metadata:
+        return _load_cached(Metadata, self._table_files[table_id], Metadata._parse_file)
+
+    def table_ids(self) -> List[str]:
+        """Return the IDs of all tables with metadata."""
+        return list(self._table_files)
+
+    def dataset_ids(self) -> List[str]:
+        """Return the IDs of all datasets with dataset metadata."""
+        return list(self._dataset_files)
+
+    def metadata_file(self, table_id: str) -> Path:
+        """Return the path of the metadata file of a table."""
+        return self._table_files[table_id]
+
+    def table(self, table_id: str) -> Metadata:
+        """Return the metadata of a table, e.g. `project.dataset.table_v1`."""
+        return copy.deepcopy(self._table(table_id))
+
+    def dataset(self, dataset_id: str) -> DatasetMetadata:
+        """Return the dataset metadata of a dataset, e.g. `project.dataset`."""
+        return DatasetMetadata.from_file(self._dataset_files[dataset_id])
+
+    def filter_tables(self, predicate: Callable[[Metadata], bool]) -> List[str]:
+        """Return the IDs of tables whose metadata matches predicate.
+
+        Metadata passed to predicate is shared and must not be modified.
+        """
+        return [
+            table_id
+            for table_id in self._table_files
+            if predicate(self._table(table_id))
+        ]
+
+    def scheduled_in(self, dag_name: str) -> List[str]:
+        """Return the IDs of tables scheduled in the DAG dag_name."""
+        return self.filter_tables(
+            lambda metadata: (metadata.scheduling or {}).get("dag_name") == dag_name
+        )
+
+    def public_json(self) -> List[str]:
+        """Return the IDs of tables that are exported as public JSON."""
+        return self.filter_tables(Metadata.is_public_json)
+
+    def public_bigquery(self) -> List[str]:
+        """Return the IDs of tables that are published in public BigQuery datasets."""
+        return self.filter_tables(Metadata.is_public_bigquery)
+
+    def owned_by(self, owner: str) -> List[str]:
+        """Return the IDs of tables that owner is an owner of."""
+        return self.filter_tables(lambda metadata: owner in metadata.owners)
@@ -1,25 +1,212 @@
-"""Metric-hub integration."""
+"""Metric-hub integration.
 
+metric-hub is read from a snapshot in the local cache directory, so that it is
+only cloned once per commit instead of once per process. Snapshots are pinned by
+commit: the latest commit is fetched again after a TTL, or never if a commit is
+configured. Set `metric_hub.repo_path` in bqetl_project.yaml or
+BQETL_METRIC_HUB_PATH to use a local checkout instead, e.g. when offline.
+
+SQL generated from snapshots is also cached on disk by commit and arguments, so
+that it can be shared by processes without loading the configs again.
+
+For example, in bqetl_project.yaml:
+
+    metric_hub:
+      ttl_seconds: 86400
+      # commit: <sha> # pin snapshots to a commit
+      # repo_path: ../metric-hub # use a local checkout
+      # cache_dir: /path/to/shared/cache # defaults to metric_hub/ in default.cache_dir
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
 from typing import Dict, List, Optional, Union
 
 import attr
+from git import Repo
 from metric_config_parser.config import ConfigCollection
 
+from bigquery_etl.config import ConfigLoader
+from bigquery_etl.util.cache import atomic_write, cache_dir, content_hash
+
+# overrides metric_hub.repo_path in bqetl_project.yaml
+REPO_PATH_ENV = "BQETL_METRIC_HUB_PATH"
+# overrides metric_hub.commit in bqetl_project.yaml
+COMMIT_ENV = "BQETL_METRIC_HUB_COMMIT"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+# number of metric-hub snapshots that are kept in the cache
+SNAPSHOTS_KEPT = 3
+LATEST_FILE = "latest.json"
+# directory in snapshots for generated SQL, removed together with the snapshot
+SQL_CACHE_DIR = ".sql_cache"
+
+
+@lru_cache
+def _generator_version() -> str:
+    """Return the version of metric-config-parser, which generates the SQL."""
+    try:
+        return version("mozilla-metric-config-parser")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _snapshots_dir() -> Path:
+    directory = ConfigLoader.get("metric_hub", "cache_dir")
+    if directory is None:
+        return cache_dir("metric_hub")
+    path = Path(ConfigLoader.project_dir) / directory
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _clone(snapshots: Path, commit: Optional[str] = None) -> str:
+    """Clone metric-hub at commit, or its default branch, and return the commit.
+
+    The snapshot is stored in a directory named like commit, or like the full
+    hash of the default branch's commit if commit is not given.
+    """
+    tmp_dir = Path(tempfile.mkdtemp(dir=snapshots, prefix=".clone."))
+    try:
+        if commit is None:
+            repo = Repo.clone_from(ConfigCollection.repo_url, tmp_dir, depth=1)
+        else:
+            repo = Repo.clone_from(ConfigCollection.repo_url, tmp_dir)
+            # metric-config-parser requires a checked out branch
+            repo.git.checkout("-B", repo.active_branch.name, commit)
+        commit = commit or repo.head.commit.hexsha
+        repo.close()
+        try:
+            os.replace(tmp_dir, snapshots / commit)
+        except OSError:
+            pass  # created concurrently by another process
+        return commit
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _evict_snapshots(snapshots: Path, keep: str):
+    """Remove the least recently used snapshots beyond SNAPSHOTS_KEPT."""
+    cached = sorted(
+        (path for path in snapshots.iterdir() if path.is_dir() and path.name[0] != "."),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in cached[SNAPSHOTS_KEPT:]:
+        if path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def snapshot_commit() -> str:
+    """Return the metric-hub commit to use, cloning it into the cache if needed.
+
+    The latest commit is cloned again once the cached snapshot is older than
+    metric_hub.ttl_seconds. If that fails, e.g. because there is no network
+    connection, the outdated snapshot is used.
+    """
+    snapshots = _snapshots_dir()
+    commit = os.environ.get(COMMIT_ENV) or ConfigLoader.get("metric_hub", "commit")
+    if commit:
+        if not (snapshots / commit).is_dir():
+            _clone(snapshots, commit)
+        return commit
+
+    latest_file = snapshots / LATEST_FILE
+    try:
+        latest = json.loads(latest_file.read_text())
+    except (OSError, ValueError):
+        latest = None
+    ttl_seconds = ConfigLoader.get(
+        "metric_hub", "ttl_seconds", fallback=DEFAULT_TTL_SECONDS
+    )
+    if (
+        latest is not None
+        and time.time() - latest["fetched"] <= ttl_seconds
+        and (snapshots / latest["commit"]).is_dir()
+    ):
+        return latest["commit"]
+
+    try:
+        commit = _clone(snapshots)
+    except Exception:
+        if latest is None or not (snapshots / latest["commit"]).is_dir():
+            raise
+        logging.warning(
+            f"Failed to update metric-hub, using snapshot of {latest['commit']}",
+            exc_info=True,
+        )
+        return latest["commit"]
+    atomic_write(
+        latest_file,
+        json.dumps({"commit": commit, "fetched": time.time()}).encode("utf-8"),
+    )
+    # modification time tracks last use for eviction
+    os.utime(snapshots / commit)
+    _evict_snapshots(snapshots, keep=commit)
+    return commit
+
 
 @attr.s(auto_attribs=True, slots=True)
 class MetricHub:
     """Metric-hub integration for generating SQL from referenced metrics."""
 
     _config_collection: Optional[ConfigCollection] = None
+    _commit: Optional[str] = None
+    _repo_path: Optional[str] = None
+
+    def _resolve(self):
+        """Determine the local checkout or snapshot commit to read configs from."""
+        if self._repo_path is None and self._commit is None:
+            self._repo_path = os.environ.get(REPO_PATH_ENV) or ConfigLoader.get(
+                "metric_hub", "repo_path"
+            )
+            if self._repo_path is None:
+                self._commit = snapshot_commit()
 
     @property
     def config_collection(self):
         """Config collection instance."""
-        self._config_collection = (
-            self._config_collection or ConfigCollection.from_github_repo()
-        )
+        if self._config_collection is None:
+            self._resolve()
+            if self._repo_path is not None:
+                repo_path = str(Path(ConfigLoader.project_dir) / self._repo_path)
+            else:
+                repo_path = str(_snapshots_dir() / str(self._commit))
+            self._config_collection = ConfigCollection.from_github_repo(
+                repo_url=repo_path
+            )
         return self._config_collection
 
+    def _cached_sql(self, generate, *args) -> str:
+        """Return SQL from generate, cached on disk for snapshots of metric-hub.
+
+        SQL is cached by the metric-config-parser version and args. The order of
+        keys in args is kept, since it determines the order of generated columns.
+        """
+        if self._config_collection is None:
+            self._resolve()
+        if self._commit is None:
+            # local checkouts may have uncommitted changes
+            return generate()
+        key = content_hash(_generator_version(), json.dumps(args))
+        path = _snapshots_dir() / self._commit / SQL_CACHE_DIR / key[:2] / f"{key}.sql"
+        try:
+            return path.read_text()
+        except OSError:
+            pass
+        sql = generate()
+        try:
+            atomic_write(path, sql.encode("utf-8"))
+        except OSError:
+            pass  # caching is best effort
+        return sql
+
     def calculate(
         self,
         metrics: List[str],
@@ -30,13 +217,22 @@ class MetricHub:
         group_by_submission_date: bool = True,
     ) -> str:
         """Generate SQL query for specified metrics."""
-        return self.config_collection.get_metrics_sql(
-            metrics=metrics,
-            platform=platform,
-            group_by=group_by,
-            where=where,
-            group_by_client_id=group_by_client_id,
-            group_by_submission_date=group_by_submission_date,
+        return self._cached_sql(
+            lambda: self.config_collection.get_metrics_sql(
+                metrics=metrics,
+                platform=platform,
+                group_by=group_by,
+                where=where,
+                group_by_client_id=group_by_client_id,
+                group_by_submission_date=group_by_submission_date,
+            ),
+            "calculate",
+            metrics,
+            platform,
+            group_by,
+            where,
+            group_by_client_id,
+            group_by_submission_date,
         )
 
     def data_source(
@@ -46,6 +242,12 @@ class MetricHub:
         where: Optional[str] = None,
     ) -> str:
         """Generate SQL query for specified data source."""
-        return self.config_collection.get_data_source_sql(
-            data_source=data_source, platform=platform, where=where
+        return self._cached_sql(
+            lambda: self.config_collection.get_data_source_sql(
+                data_source=data_source, platform=platform, where=where
+            ),
+            "data_source",
+            data_source,
+            platform,
+            where,
         )
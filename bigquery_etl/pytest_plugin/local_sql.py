@@ -0,0 +1,226 @@
+"""Run query tests locally on DuckDB instead of BigQuery.
+
+Queries are transpiled from BigQuery SQL with sqlglot and run on an in-memory
+DuckDB database that is loaded with the test's fixture tables and views. Only
+plain queries are supported. Anything the engine cannot handle raises
+LocalEngineUnsupported so that the test can fall back to BigQuery. This includes
+init and script tests, temporary functions, fixture tables without a schema or
+in unsupported formats, constructs sqlglot cannot transpile and constructs with
+known differences in semantics between the engines.
+
+Without DuckDB installed, all tests fall back.
+"""
+
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import sqlglot
+from google.cloud import bigquery
+from sqlglot import ErrorLevel, exp
+
+from .sql_test import TABLE_EXTENSIONS, Table, default_encoding, load
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None  # type: ignore
+
+# name of the catalog of an in-memory DuckDB database
+CATALOG = "memory"
+SCHEMA = "main"
+
+_SCALAR_TYPES = {
+    "STRING": "VARCHAR",
+    "BYTES": "BLOB",
+    "INTEGER": "BIGINT",
+    "INT64": "BIGINT",
+    "FLOAT": "DOUBLE",
+    "FLOAT64": "DOUBLE",
+    "NUMERIC": "DECIMAL(38, 9)",
+    "BIGNUMERIC": "DECIMAL(38, 9)",
+    "BOOLEAN": "BOOLEAN",
+    "BOOL": "BOOLEAN",
+    "DATE": "DATE",
+    "DATETIME": "TIMESTAMP",
+    "TIME": "TIME",
+    "TIMESTAMP": "TIMESTAMPTZ",
+    "JSON": "JSON",
+}
+
+
+# constructs that transpile, but whose results differ between the engines
+_DIFFERING_SEMANTICS = {
+    exp.DateTrunc: "DATE_TRUNC of a date returns a timestamp in DuckDB",
+}
+
+
+class LocalEngineUnsupported(Exception):
+    """The local engine cannot run a test."""
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def duckdb_type(field: bigquery.SchemaField) -> str:
+    """Return the DuckDB type of a BigQuery schema field."""
+    if field.field_type in ("RECORD", "STRUCT"):
+        members = ", ".join(
+            f"{_quote(member.name)} {duckdb_type(member)}" for member in field.fields
+        )
+        type_ = f"STRUCT({members})"
+    elif field.field_type in _SCALAR_TYPES:
+        type_ = _SCALAR_TYPES[field.field_type]
+    else:
+        raise LocalEngineUnsupported(f"Unsupported column type: {field.field_type}")
+    if field.mode == "REPEATED":
+        type_ += "[]"
+    return type_
+
+
+def _query_parameter_literal(param) -> exp.Expression:
+    """Return a typed SQL literal for a scalar query parameter."""
+    if not isinstance(param, bigquery.ScalarQueryParameter):
+        raise LocalEngineUnsupported(f"Unsupported query parameter: {param.name}")
+    if param.value is None:
+        return exp.Null()
+    value = param.value
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    if isinstance(value, bool) or param.type_ in ("BOOL", "BOOLEAN"):
+        return exp.Boolean(this=str(value).lower() == "true")
+    return exp.cast(
+        exp.Literal.string(str(value)),
+        _SCALAR_TYPES.get(param.type_, "VARCHAR"),
+    )
+
+
+def _one_based_index(node: exp.Bracket) -> exp.Expression:
+    """Convert a BigQuery array subscript to DuckDB's one-based list index."""
+    if isinstance(node.this, exp.Bracket):
+        node.set("this", _one_based_index(node.this))
+    if len(node.expressions) != 1:
+        return node
+    index = node.expressions[0]
+    if isinstance(index, exp.Anonymous):
+        function = index.name.upper()
+        if function == "ORDINAL" or function == "SAFE_ORDINAL":
+            return exp.Bracket(this=node.this, expressions=index.expressions)
+        if function not in ("OFFSET", "SAFE_OFFSET"):
+            return node
+        (index,) = index.expressions
+    elif isinstance(index, exp.Literal) and index.is_string:
+        return node  # JSON subscript
+    if isinstance(index, exp.Literal):
+        one_based: exp.Expression = exp.Literal.number(int(index.this) + 1)
+    else:
+        one_based = exp.Add(
+            this=exp.Paren(this=index), expression=exp.Literal.number(1)
+        )
+    return exp.Bracket(this=node.this, expressions=[one_based])
+
+
+def transpile(sql: str, query_parameters: Sequence = ()) -> str:
+    """Transpile a single BigQuery statement into DuckDB SQL.
+
+    Query parameters are replaced with literals of their value, and array
+    subscripts are converted to one-based indexes.
+    """
+    try:
+        statements = sqlglot.parse(sql, read="bigquery", error_level=ErrorLevel.RAISE)
+    except sqlglot.errors.SqlglotError as e:
+        raise LocalEngineUnsupported(f"Failed to parse query: {e}")
+    parsed = [statement for statement in statements if statement is not None]
+    if len(parsed) != 1:
+        raise LocalEngineUnsupported("Only single statement queries are supported")
+    literals = {param.name: param for param in query_parameters}
+
+    def to_duckdb(node):
+        if isinstance(node, exp.Bracket):
+            return _one_based_index(node)
+        if isinstance(node, exp.Parameter):
+            name = node.name
+            if name not in literals:
+                raise LocalEngineUnsupported(f"Missing query parameter: {name}")
+            return _query_parameter_literal(literals[name])
+        return node
+
+    for node_type, difference in _DIFFERING_SEMANTICS.items():
+        if parsed[0].find(node_type):
+            raise LocalEngineUnsupported(difference)
+    statement = parsed[0].transform(to_duckdb)
+    try:
+        return statement.sql(dialect="duckdb", unsupported_level=ErrorLevel.RAISE)
+    except sqlglot.errors.SqlglotError as e:
+        raise LocalEngineUnsupported(f"Failed to transpile query: {e}")
+
+
+def _table_rows(table: Table) -> List[Any]:
+    if isinstance(table.source_path, str):
+        if table.source_format != TABLE_EXTENSIONS["ndjson"]:
+            raise LocalEngineUnsupported(
+                f"Unsupported format for table {table.name}: {table.source_format}"
+            )
+        with open(table.source_path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    return load(*table.source_path)
+
+
+def _load_table(con, table: Table, tmp_dir: str):
+    if table.schema is None:
+        # DuckDB detects different types than BigQuery, e.g. timestamps without
+        # time zone, so results would differ
+        raise LocalEngineUnsupported(f"Table {table.name} has no schema")
+    path = os.path.join(tmp_dir, f"{table.name}.ndjson")
+    with open(path, "w") as f:
+        for row in _table_rows(table):
+            f.write(json.dumps(row, default=default_encoding) + "\n")
+    columns = ", ".join(
+        f"{_string(field.name)}: {_string(duckdb_type(field))}"
+        for field in table.schema
+    )
+    source = f"read_json(?, format = 'newline_delimited', columns = {{{columns}}})"
+    con.execute(f"CREATE TABLE {_quote(table.name)} AS SELECT * FROM {source}", [path])
+
+
+def run_query(
+    query: str,
+    tables: Sequence[Table],
+    views: Dict[str, str],
+    query_parameters: Optional[Sequence] = None,
+) -> List[Dict[str, Any]]:
+    """Run query against tables and views in a fresh DuckDB database.
+
+    Rows are returned as dicts like bigquery.Row, so that they can be passed to
+    coerce_result. Raises LocalEngineUnsupported if DuckDB is not installed or
+    cannot run the query.
+    """
+    if duckdb is None:
+        raise LocalEngineUnsupported("duckdb is not installed")
+    sql = transpile(query, query_parameters or ())
+    view_sqls = {
+        name: transpile(view_query.format(project=CATALOG, dataset=SCHEMA))
+        for name, view_query in views.items()
+    }
+    con = duckdb.connect(":memory:")
+    try:
+        con.execute("SET TimeZone = 'UTC'")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for table in tables:
+                _load_table(con, table, tmp_dir)
+        for name, view_sql in view_sqls.items():
+            con.execute(f"CREATE VIEW {_quote(name)} AS {view_sql}")
+        cursor = con.execute(sql)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except duckdb.Error as e:
+        raise LocalEngineUnsupported(f"DuckDB failed to run query: {e}")
+    finally:
+        con.close()
@@ -13,6 +13,7 @@ from google.cloud import bigquery
 
 from ..routine import parse_routine
 from ..util.common import render
+from . import local_sql
 from .sql_test import (
     TABLE_EXTENSIONS,
     Table,
@@ -29,10 +30,56 @@ from .sql_test import (
 
 expect_names = {f"expect.{ext}" for ext in ("yaml", "json", "ndjson")}
 
+# default for --sql-engine
+SQL_ENGINE_ENV = "BQETL_SQL_TEST_ENGINE"
+SQL_ENGINES = ("bigquery", "duckdb")
+SQL_FALLBACKS = ("bigquery", "skip")
+
+
+def pytest_addoption(parser):
+    """Add options for choosing the engine that runs sql tests."""
+    group = parser.getgroup("sql")
+    group.addoption(
+        "--sql-engine",
+        choices=SQL_ENGINES,
+        default=os.environ.get(SQL_ENGINE_ENV, "bigquery"),
+        help="Engine that runs sql tests. duckdb runs tests locally, without "
+        f"credentials, where possible. Defaults to ${SQL_ENGINE_ENV} or bigquery.",
+    )
+    group.addoption(
+        "--sql-fallback",
+        choices=SQL_FALLBACKS,
+        default="bigquery",
+        help="What to do with sql tests that the local engine cannot run: run them "
+        "on bigquery, or skip them. Tests with results that do not match expect are "
+        "run on bigquery, or fail.",
+    )
+
 
 def pytest_configure(config):
-    """Register a custom marker."""
+    """Register custom markers."""
     config.addinivalue_line("markers", "sql: mark sql tests.")
+    config.addinivalue_line(
+        "markers", "sql_fallback: sql tests the local engine could not run."
+    )
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """Report sql tests that the local engine could not run."""
+    if config.getoption("sql_engine", "bigquery") == "bigquery":
+        return
+    fallbacks = [
+        report
+        for reports in terminalreporter.stats.values()
+        for report in reports
+        if getattr(report, "when", None) == "call"
+        and dict(getattr(report, "user_properties", ())).get("sql_fallback")
+    ]
+    if fallbacks:
+        terminalreporter.write_sep("=", "sql tests not run locally")
+        for report in fallbacks:
+            reason = dict(report.user_properties)["sql_fallback"]
+            terminalreporter.write_line(f"{report.nodeid}: {reason}")
 
 
 def pytest_collect_file(parent, path):
@@ -170,6 +217,16 @@ class SqlTest(pytest.Item, pytest.File):
             "require_partition_filter = TRUE", "require_partition_filter = FALSE"
         )
 
+        # make sure we encode dates correctly
+        expect = json.loads(json.dumps(_sorted_rows(expect), default=default_encoding))
+        query_params = list(get_query_params(self.fspath.strpath))
+
+        if self.config.getoption("sql_engine", "bigquery") == "duckdb":
+            if self._runtest_local(
+                query, tables, views, query_params, expect, init_test or script_test
+            ):
+                return
+
         dataset_id = "_".join(self.fspath.strpath.split(os.path.sep)[-3:])
         if "CIRCLE_BUILD_NUM" in os.environ:
             dataset_id += f"_{os.environ['CIRCLE_BUILD_NUM']}"
@@ -192,7 +249,7 @@ class SqlTest(pytest.Item, pytest.File):
             if init_test or script_test:
                 job_config = bigquery.QueryJobConfig(
                     default_dataset=default_dataset,
-                    query_parameters=get_query_params(self.fspath.strpath),
+                    query_parameters=query_params,
                     use_legacy_sql=False,
                 )
 
@@ -206,7 +263,7 @@ class SqlTest(pytest.Item, pytest.File):
                 job_config = bigquery.QueryJobConfig(
                     default_dataset=default_dataset,
                     destination=res_table,
-                    query_parameters=get_query_params(self.fspath.strpath),
+                    query_parameters=query_params,
                     use_legacy_sql=False,
                     write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
                 )
@@ -214,23 +271,42 @@ class SqlTest(pytest.Item, pytest.File):
                 # run query
                 job = bq.query(query, job_config=job_config)
 
-            result = list(coerce_result(*job.result()))
-            result.sort(
-                key=lambda row: json.dumps(
-                    row, sort_keys=True, default=default_encoding
+            result = _sorted_rows(coerce_result(*job.result()))
+            print_and_test(expect, result)
+
+    def _runtest_local(self, query, tables, views, query_params, expect, is_script):
+        """Run the test on the local engine and return whether it was run.
+
+        Tests that the local engine cannot run are marked with sql_fallback, and
+        are either skipped or left to run on BigQuery, depending on --sql-fallback.
+        Constructs whose semantics are known to differ between the engines are not
+        run locally. Other results that do not match expect are left to BigQuery to
+        decide, or fail the test if falling back to BigQuery is disabled.
+        """
+        fallback = self.config.getoption("sql_fallback", "bigquery")
+        try:
+            if is_script:
+                raise local_sql.LocalEngineUnsupported(
+                    "init and script tests are not supported"
                 )
-            )
-            # make sure we encode dates correctly
-            expect = json.loads(
-                json.dumps(
-                    sorted(
-                        expect,
-                        key=lambda row: json.dumps(
-                            row, sort_keys=True, default=default_encoding
-                        ),
-                    ),
-                    default=default_encoding,
+            rows = local_sql.run_query(query, tables.values(), views, query_params)
+            result = _sorted_rows(coerce_result(*rows))
+            if result != expect and fallback == "bigquery":
+                raise local_sql.LocalEngineUnsupported(
+                    "local result does not match expect"
                 )
-            )
-
-            print_and_test(expect, result)
+        except local_sql.LocalEngineUnsupported as e:
+            self.add_marker("sql_fallback")
+            self.user_properties.append(("sql_fallback", str(e)))
+            if fallback == "skip":
+                pytest.skip(f"not supported by local engine: {e}")
+            return False
+        print_and_test(expect, result)
+        return True
+
+
+def _sorted_rows(rows):
+    """Sort rows by their JSON encoding, for comparison regardless of order."""
+    return sorted(
+        rows, key=lambda row: json.dumps(row, sort_keys=True, default=default_encoding)
+    )
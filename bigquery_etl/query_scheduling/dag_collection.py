@@ -1,5 +1,6 @@
 """Represents a collection of configured Airflow DAGs."""
 
+import json
 from collections import defaultdict
 from functools import partial
 from itertools import groupby
@@ -7,10 +8,71 @@ from multiprocessing import get_context, set_start_method
 from operator import attrgetter
 from pathlib import Path
 
+import black
 import yaml
 from black import FileMode, format_file_contents
 
 from bigquery_etl.query_scheduling.dag import Dag, InvalidDag, PublicDataJsonDag
+from bigquery_etl.util.cache import atomic_write, content_hash
+
+
+def generator_version():
+    """Return a hash of the DAG generation source, which changes when output may."""
+    source_dir = Path(__file__).parent
+    sources = sorted(source_dir.glob("*.py")) + sorted(source_dir.glob("templates/*"))
+    return content_hash(black.__version__, *(path.read_bytes() for path in sources))
+
+
+class DagFingerprints:
+    """Fingerprints of the inputs of generated DAG files.
+
+    A DAG's fingerprint covers its dags.yaml configuration and its tasks, including
+    their metadata and resolved dependencies, as well as the generator source. It
+    is stored with a hash of the generated file, in a file beside the output
+    directory, e.g. `.dags_fingerprints.json` for `dags/`.
+    """
+
+    def __init__(self, output_dir):
+        """Load fingerprints for DAGs generated into output_dir."""
+        output_dir = Path(output_dir)
+        self.path = output_dir.parent / f".{output_dir.name}_fingerprints.json"
+        self.version = generator_version()
+        try:
+            self.entries = json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def fingerprint(self, dag):
+        """Return the fingerprint of the DAG with its dependencies resolved."""
+        return content_hash(self.version, repr(dag))
+
+    def is_current(self, name, fingerprint, output_file):
+        """Return whether output_file was generated from inputs with fingerprint."""
+        entry = self.entries.get(name)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return False
+        try:
+            return entry["output"] == content_hash(Path(output_file).read_bytes())
+        except FileNotFoundError:
+            return False
+
+    def update(self, name, fingerprint, output_file):
+        """Record that output_file was generated from inputs with fingerprint."""
+        self.entries[name] = {
+            "fingerprint": fingerprint,
+            "output": content_hash(Path(output_file).read_bytes()),
+        }
+
+    def retain(self, dag_names):
+        """Remove fingerprints of DAGs that are not in dag_names."""
+        self.entries = {
+            name: entry for name, entry in self.entries.items() if name in dag_names
+        }
+
+    def save(self):
+        """Write fingerprints to disk."""
+        content = json.dumps(self.entries, indent=2, sort_keys=True)
+        atomic_write(self.path, content.encode("utf-8"))
 
 
 class DagCollection:
@@ -20,6 +82,7 @@ class DagCollection:
         """Instantiate DAGs."""
         self.dags = dags
         self.dags_by_name = {dag.name: dag for dag in dags}
+        self._index_tasks()
 
     @classmethod
     def from_dict(cls, d):
@@ -64,34 +127,28 @@ class DagCollection:
         """Return the DAG with the provided name."""
         return self.dags_by_name.get(name)
 
-    def task_for_table(self, project, dataset, table):
-        """Return the task that schedules the query for the provided table."""
+    def _index_tasks(self):
+        """Index tasks by (project, dataset, table_version).
+
+        The first matching task in DAG order is indexed, like a scan.
+        """
+        self._tasks_by_table = {}
+        self._fail_checks_tasks_by_table = {}
         for dag in self.dags:
             for task in dag.tasks:
-                if (
-                    project == task.project
-                    and dataset == task.dataset
-                    and table == f"{task.table}_{task.version}"
-                    and not task.is_dq_check
-                ):
-                    return task
+                key = (task.project, task.dataset, f"{task.table}_{task.version}")
+                if not task.is_dq_check:
+                    self._tasks_by_table.setdefault(key, task)
+                elif task.is_dq_check_fail:
+                    self._fail_checks_tasks_by_table.setdefault(key, task)
 
-        return None
+    def task_for_table(self, project, dataset, table):
+        """Return the task that schedules the query for the provided table."""
+        return self._tasks_by_table.get((project, dataset, table))
 
     def fail_checks_task_for_table(self, project, dataset, table):
         """Return the task that schedules the checks for the provided table."""
-        for dag in self.dags:
-            for task in dag.tasks:
-                if (
-                    project == task.project
-                    and dataset == task.dataset
-                    and table == f"{task.table}_{task.version}"
-                    and task.is_dq_check
-                    and task.is_dq_check_fail
-                ):
-                    return task
-
-        return None
+        return self._fail_checks_tasks_by_table.get((project, dataset, table))
 
     def with_tasks(self, tasks):
         """Assign tasks to their corresponding DAGs."""
@@ -106,6 +163,7 @@ class DagCollection:
                     f"but used in task definition {next(group).task_name}."
                 )
             dag.add_tasks(list(group))
+        self._index_tasks()
 
         public_json_tasks = [
             task for task in tasks if task.public_json and not task.is_dq_check
@@ -116,6 +174,7 @@ class DagCollection:
                     public_data_json_dag = dag
             if public_data_json_dag:
                 public_data_json_dag.add_export_tasks(public_json_tasks, self)
+                self._index_tasks()
 
         return self
 
@@ -138,7 +197,10 @@ class DagCollection:
         return self._downstream_dependencies[task.task_key]
 
     def dag_to_airflow(self, output_dir, dag):
-        """Generate the Airflow DAG representation for the provided DAG."""
+        """Generate the Airflow DAG representation for the provided DAG.
+
+        Return whether the DAG file was written.
+        """
         output_file = Path(output_dir) / (dag.name + ".py")
 
         try:
@@ -146,32 +208,69 @@ class DagCollection:
                 dag.to_airflow_dag(), fast=False, mode=FileMode()
             )
             output_file.write_text(formatted_dag)
+            return True
         except InvalidDag as e:
             print(e)
+            return False
+
+    def to_airflow_dags(self, output_dir, dag_to_generate=None, incremental=False):
+        """Write DAG representation as Airflow dags to file.
 
-    def to_airflow_dags(self, output_dir, dag_to_generate=None):
-        """Write DAG representation as Airflow dags to file."""
+        With incremental, only DAGs whose fingerprint changed since they were last
+        generated, or whose file was changed or removed, are rendered and written.
+        Return the DAGs that were written.
+        """
         # https://pythonspeed.com/articles/python-multiprocessing/
         # when running tests on CI that call this function, we need
         # to create a custom pool to prevent processes from getting stuck
 
-        # Generate a single DAG:
         if dag_to_generate is not None:
+            # Generate a single DAG:
+            dags = [dag_to_generate]
             dag_to_generate.with_upstream_dependencies(self)
             dag_to_generate.with_downstream_dependencies(self)
-            self.dag_to_airflow(output_dir, dag_to_generate)
-            return
+        else:
+            # Generate all DAGs:
+            try:
+                set_start_method("spawn")
+            except Exception:
+                pass
 
-        # Generate all DAGs:
-        try:
-            set_start_method("spawn")
-        except Exception:
-            pass
+            dags = self.dags
+            for dag in dags:
+                dag.with_upstream_dependencies(self)
+                dag.with_downstream_dependencies(self)
 
-        for dag in self.dags:
-            dag.with_upstream_dependencies(self)
-            dag.with_downstream_dependencies(self)
+        def output_file(dag):
+            return Path(output_dir) / (dag.name + ".py")
+
+        fingerprints = DagFingerprints(output_dir) if incremental else None
+        if fingerprints is not None:
+            # fingerprint before rendering, which converts some DAG attributes
+            dag_fingerprints = {dag.name: fingerprints.fingerprint(dag) for dag in dags}
+            dags = [
+                dag
+                for dag in dags
+                if not fingerprints.is_current(
+                    dag.name, dag_fingerprints[dag.name], output_file(dag)
+                )
+            ]
 
         to_airflow_dag = partial(self.dag_to_airflow, output_dir)
-        with get_context("spawn").Pool(8) as p:
-            p.map(to_airflow_dag, self.dags)
+        if len(dags) > 1:
+            with get_context("spawn").Pool(8) as p:
+                written = p.map(to_airflow_dag, dags)
+        else:
+            written = [to_airflow_dag(dag) for dag in dags]
+        generated = [dag for dag, is_written in zip(dags, written) if is_written]
+
+        if fingerprints is not None:
+            if dag_to_generate is None:
+                fingerprints.retain({dag.name for dag in self.dags})
+            for dag in generated:
+                fingerprints.update(
+                    dag.name, dag_fingerprints[dag.name], output_file(dag)
+                )
+            fingerprints.save()
+
+        return generated
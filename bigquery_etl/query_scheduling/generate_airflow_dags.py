@@ -4,8 +4,11 @@ import copy
 import logging
 import os
 from argparse import ArgumentParser
+from functools import partial
+from multiprocessing import get_context
 from pathlib import Path
 
+from bigquery_etl.metadata.parse_metadata import Metadata
 from bigquery_etl.query_scheduling.dag_collection import DagCollection
 from bigquery_etl.query_scheduling.task import Task, TaskRef, UnscheduledTask
 from bigquery_etl.util import standard_args
@@ -18,6 +21,7 @@ SCRIPT_FILE = "script.sql"
 PYTHON_SCRIPT_FILE = "query.py"
 DEFAULT_DAGS_DIR = "dags"
 CHECKS_FILE = "checks.sql"
+TASK_FILES = (QUERY_FILE, QUERY_PART_FILE, SCRIPT_FILE, PYTHON_SCRIPT_FILE)
 
 parser = ArgumentParser(description=__doc__)
 parser.add_argument(
@@ -46,93 +50,22 @@ parser.add_argument(
     required=False,
 )
 
+parser.add_argument(
+    "--incremental",
+    action="store_true",
+    help="Only re-generate DAGs whose inputs changed since they were last generated",
+)
 standard_args.add_log_level(parser)
 
 
-def get_dags(project_id, dags_config, sql_dir=None):
-    """Return all configured DAGs including associated tasks."""
-    tasks = []
-    dag_collection = DagCollection.from_file(dags_config)
+def _table_dirs(project_id, sql_dir=None):
+    """Return (root, files) of directories that contain a query, in walk order."""
+    table_dirs = []
     for project_dir in project_dirs(project_id, sql_dir=sql_dir):
-        # parse metadata.yaml to retrieve scheduling information
         if os.path.isdir(project_dir):
             for root, dirs, files in os.walk(project_dir):
-                try:
-                    if QUERY_FILE in files:
-                        query_file = os.path.join(root, QUERY_FILE)
-                        task = Task.of_query(query_file, dag_collection=dag_collection)
-                    elif QUERY_PART_FILE in files:
-                        # multipart query
-                        query_file = os.path.join(root, QUERY_PART_FILE)
-                        task = Task.of_multipart_query(
-                            query_file, dag_collection=dag_collection
-                        )
-                    elif SCRIPT_FILE in files:
-                        query_file = os.path.join(root, SCRIPT_FILE)
-                        task = Task.of_script(query_file, dag_collection=dag_collection)
-                    elif PYTHON_SCRIPT_FILE in files:
-                        query_file = os.path.join(root, PYTHON_SCRIPT_FILE)
-                        task = Task.of_python_script(
-                            query_file, dag_collection=dag_collection
-                        )
-                    else:
-                        continue
-                except FileNotFoundError:
-                    # query has no metadata.yaml file; skip
-                    pass
-                except UnscheduledTask:
-                    # logging.debug(
-                    #     f"No scheduling information for {query_file}."
-                    # )
-                    #
-                    # most tasks lack scheduling information for now
-                    pass
-                except Exception as e:
-                    # in the case that there was some other error, report the query
-                    # that failed before exiting
-                    logging.error(f"Error processing task for query {query_file}")
-                    raise e
-                else:
-                    if CHECKS_FILE in files:
-                        checks_file = os.path.join(root, CHECKS_FILE)
-                        # todo: validate checks file
-
-                        with open(checks_file, "r") as file:
-                            file_contents = file.read()
-                            # check if file contains fail and warn and create checks task accordingly
-                            checks_tasks = []
-
-                            if "#fail" in file_contents:
-                                checks_task = copy.deepcopy(
-                                    Task.of_dq_check(
-                                        checks_file,
-                                        is_check_fail=True,
-                                        dag_collection=dag_collection,
-                                    )
-                                )
-                                checks_tasks.append(checks_task)
-
-                            if "#warn" in file_contents:
-                                checks_task = copy.deepcopy(
-                                    Task.of_dq_check(
-                                        checks_file,
-                                        is_check_fail=False,
-                                        dag_collection=dag_collection,
-                                    )
-                                )
-                                checks_tasks.append(checks_task)
-
-                            for checks_task in checks_tasks:
-                                tasks.append(checks_task)
-                                upstream_task_ref = TaskRef(
-                                    dag_name=task.dag_name,
-                                    task_id=task.task_name,
-                                )
-                                checks_task.upstream_dependencies.append(
-                                    upstream_task_ref
-                                )
-
-                    tasks.append(task)
+                if any(file in files for file in TASK_FILES):
+                    table_dirs.append((root, files))
         else:
             logging.error(
                 """
@@ -142,7 +75,98 @@ def get_dags(project_id, dags_config, sql_dir=None):
                     project_dir
                 )
             )
+    return table_dirs
+
+
+def _tasks_for_dir(dag_collection, table_dir):
+    """Return the tasks scheduled by metadata.yaml and checks.sql in table_dir."""
+    root, files = table_dir
+    tasks = []
+    try:
+        if QUERY_FILE in files:
+            query_file = os.path.join(root, QUERY_FILE)
+            metadata = Metadata.of_query_file(query_file)
+            task = Task.of_query(
+                query_file, copy.deepcopy(metadata), dag_collection=dag_collection
+            )
+        elif QUERY_PART_FILE in files:
+            # multipart query
+            query_file = os.path.join(root, QUERY_PART_FILE)
+            metadata = Metadata.of_query_file(query_file)
+            task = Task.of_multipart_query(
+                query_file, copy.deepcopy(metadata), dag_collection=dag_collection
+            )
+        elif SCRIPT_FILE in files:
+            query_file = os.path.join(root, SCRIPT_FILE)
+            metadata = Metadata.of_query_file(query_file)
+            task = Task.of_script(
+                query_file, copy.deepcopy(metadata), dag_collection=dag_collection
+            )
+        elif PYTHON_SCRIPT_FILE in files:
+            query_file = os.path.join(root, PYTHON_SCRIPT_FILE)
+            metadata = Metadata.of_query_file(query_file)
+            task = Task.of_python_script(
+                query_file, copy.deepcopy(metadata), dag_collection=dag_collection
+            )
+        else:
+            return tasks
+    except FileNotFoundError:
+        # query has no metadata.yaml file; skip
+        return tasks
+    except UnscheduledTask:
+        # most tasks lack scheduling information for now
+        return tasks
+    except Exception as e:
+        # in the case that there was some other error, report the query
+        # that failed before exiting
+        logging.error(f"Error processing task for query {query_file}")
+        raise e
+
+    if CHECKS_FILE in files:
+        checks_file = os.path.join(root, CHECKS_FILE)
+        # todo: validate checks file
+
+        with open(checks_file, "r") as file:
+            file_contents = file.read()
+
+        # check if file contains fail and warn and create checks task accordingly
+        for marker, is_check_fail in (("#fail", True), ("#warn", False)):
+            if marker in file_contents:
+                # the metadata.yaml is shared with the query, don't parse it again
+                checks_task = Task.of_dq_check(
+                    checks_file,
+                    is_check_fail=is_check_fail,
+                    metadata=copy.deepcopy(metadata),
+                    dag_collection=dag_collection,
+                )
+                checks_task.upstream_dependencies.append(
+                    TaskRef(dag_name=task.dag_name, task_id=task.task_name)
+                )
+                tasks.append(checks_task)
+
+    tasks.append(task)
+    return tasks
+
+
+def get_dags(project_id, dags_config, sql_dir=None, parallelism=1):
+    """Return all configured DAGs including associated tasks.
+
+    With parallelism > 1, directories are scanned for tasks in a pool of spawned
+    processes of that size. Tasks are added in the same order as when directories
+    are scanned sequentially.
+    """
+    dag_collection = DagCollection.from_file(dags_config)
+    table_dirs = _table_dirs(project_id, sql_dir=sql_dir)
+
+    tasks_for_dir = partial(_tasks_for_dir, dag_collection)
+    if parallelism > 1 and len(table_dirs) > 1:
+        with get_context("spawn").Pool(parallelism) as pool:
+            chunksize = max(1, len(table_dirs) // (parallelism * 4))
+            dir_tasks = pool.map(tasks_for_dir, table_dirs, chunksize=chunksize)
+    else:
+        dir_tasks = list(map(tasks_for_dir, table_dirs))
 
+    tasks = [task for tasks_in_dir in dir_tasks for task in tasks_in_dir]
     return dag_collection.with_tasks(tasks)
 
 
@@ -152,7 +176,11 @@ def main():
     dags_output_dir = Path(args.output_dir)
 
     dags = get_dags(args.project_id, args.dags_config)
-    dags.to_airflow_dags(dags_output_dir, args.dag_id)
+    dags.to_airflow_dags(
+        dags_output_dir,
+        dags.dag_by_name(args.dag_id) if args.dag_id else None,
+        incremental=args.incremental,
+    )
 
 
 if __name__ == "__main__":
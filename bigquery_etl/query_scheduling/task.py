@@ -396,7 +396,7 @@ class Task:
                 click.echo(
                     f"{owner} removed from email list in DAG {metadata.scheduling['dag_name']}"
                 )
-        task_config["email"] = list(set(email + metadata.owners))
+        task_config["email"] = sorted(set(email + metadata.owners))
 
         # data processed in task should be published
         if metadata.is_public_json():
@@ -5,10 +5,13 @@ This should eventually be refactored to a more general library for
 parsing UDF dependencies in queries as well.
 """
 
+import json
 import os
 import re
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
 import attr
 import sqlparse
@@ -16,6 +19,7 @@ import yaml
 
 from bigquery_etl.config import ConfigLoader
 from bigquery_etl.metadata.parse_metadata import METADATA_FILE
+from bigquery_etl.util.cache import atomic_write, cache_dir, content_hash
 from bigquery_etl.util.common import render
 
 UDF_CHAR = "[a-zA-Z0-9_]"
@@ -32,9 +36,25 @@ PERSISTENT_UDF_RE = re.compile(
     re.IGNORECASE,
 )
 UDF_NAME_RE = re.compile(r"^([a-zA-Z0-9_]+\.)?[a-zA-Z][a-zA-Z0-9_]{0,255}$")
+# string literals are matched so that comment markers in strings are kept
+SQL_COMMENT_RE = re.compile(
+    r"('''.*?'''|\"\"\".*?\"\"\"|'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"|`[^`]*`)"
+    r"|--[^\n]*|#[^\n]*|/\*.*?\*/",
+    re.DOTALL,
+)
+# dotted names, including overlapping ones like hist.extract in mozfun.hist.extract
+ROUTINE_NAME_RE = re.compile(r"(?<!\w)(?=(\w+\.\w+))")
+ROUTINE_CALL_RE = re.compile(
+    rf"(?<![\w\.])(?:`?([a-zA-Z0-9_-]+)`?\.)?`?({UDF_CHAR}+)`?\.`?({UDF_CHAR}+)`?(?=\()"
+)
 GENERIC_DATASET = "_generic_dataset_"
+# number of RoutineIndex instances kept for different raw_routines dicts
+ROUTINE_INDEX_CACHE_SIZE = 8
 
 raw_routines = {}
+_routine_indexes: "OrderedDict[int, Tuple[dict, Tuple[int, ...], RoutineIndex]]" = (
+    OrderedDict()
+)
 
 
 def get_routines_from_dir(project_dir):
@@ -58,6 +78,31 @@ def get_routines(project):
     )
 
 
+@lru_cache(maxsize=None)
+def _routine_names(project: str, sql_dir: str) -> FrozenSet[str]:
+    return frozenset(routine["name"] for routine in get_routines(project))
+
+
+def routine_names(project) -> FrozenSet[str]:
+    """Return names of all routines that could be referenced by the project.
+
+    Routine directories are only listed once per process.
+    """
+    return _routine_names(
+        str(project), ConfigLoader.get("default", "sql_dir", fallback="sql")
+    )
+
+
+def strip_sql_comments(sql: str) -> str:
+    """Remove comments from sql, without parsing it."""
+    return SQL_COMMENT_RE.sub(lambda match: match.group(1) or " ", sql)
+
+
+def dotted_names(sql: str) -> FrozenSet[str]:
+    """Return all names of the form `dataset.name` in sql."""
+    return frozenset(ROUTINE_NAME_RE.findall(sql))
+
+
 @attr.s(auto_attribs=True)
 class RawRoutine:
     """Representation of the content of a single routine sql file."""
@@ -184,16 +229,15 @@ class RawRoutine:
                     procedure_start = -1
 
         # get routines that could be referenced by the UDF
-        routines = get_routines(project)
         dependencies = []
-        for udf in routines:
+        for udf_name in routine_names(project):
             udf_re = re.compile(
                 r"\b"
-                + r"\.".join(f"`?{name}`?" for name in udf["name"].split("."))
+                + r"\.".join(f"`?{name}`?" for name in udf_name.split("."))
                 + r"\("
             )
             if udf_re.search("\n".join(definitions)):
-                dependencies.append(udf["name"])
+                dependencies.append(udf_name)
 
         dependencies.extend(re.findall(TEMP_UDF_RE, "\n".join(definitions)))
         dependencies = list(set(dependencies))
@@ -223,23 +267,125 @@ class ParsedRoutine(RawRoutine):
         return ParsedRoutine(*attr.astuple(raw_routine), tests_full_sql)
 
 
+@lru_cache
+def _parser_version() -> str:
+    """Return a hash of sqlparse's version and of the routine parsing source."""
+    return content_hash(sqlparse.__version__, Path(__file__).read_bytes())
+
+
+@lru_cache(maxsize=None)
+def _routine_names_hash(project: str, sql_dir: str) -> str:
+    return content_hash(*sorted(_routine_names(project, sql_dir)))
+
+
+def _file_signature(path: Path) -> Optional[List[int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class RoutineFileIndex:
+    """On-disk index of the routines parsed from a project directory.
+
+    Entries are keyed by routine file path, and are only used while the
+    modification times and sizes of the routine file and its metadata.yaml, and
+    the names of routines the project could reference, are unchanged. Other
+    routines are parsed again, so that the index is refreshed incrementally. The
+    index is written atomically, so that it can be shared by concurrent processes.
+    """
+
+    def __init__(self, project_dir):
+        """Initialize."""
+        try:
+            self.path: Optional[Path] = (
+                cache_dir("routine_index")
+                / f"{content_hash(str(Path(project_dir).resolve()))}.json"
+            )
+        except OSError:
+            self.path = None
+        self.entries = self._load()
+        self.seen: Set[str] = set()
+        self.changed = False
+
+    def _load(self) -> dict:
+        if self.path is None:
+            return {}
+        try:
+            index = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        if index.get("version") != _parser_version():
+            return {}
+        return index["entries"]
+
+    @staticmethod
+    def _signature(filepath: Path) -> list:
+        project = filepath.parent.parent.parent
+        return [
+            _file_signature(filepath),
+            _file_signature(filepath.parent / METADATA_FILE),
+            _routine_names_hash(
+                str(project), ConfigLoader.get("default", "sql_dir", fallback="sql")
+            ),
+        ]
+
+    def get(self, filepath) -> RawRoutine:
+        """Return the routine defined in filepath, parsing it if necessary."""
+        key = str(filepath)
+        self.seen.add(key)
+        signature = self._signature(Path(filepath))
+        entry = self.entries.get(key)
+        if entry is not None and entry["signature"] == signature:
+            return RawRoutine(filepath=filepath, **entry["routine"])
+
+        raw_routine = RawRoutine.from_file(filepath)
+        routine = attr.asdict(raw_routine)
+        del routine["filepath"]
+        self.entries[key] = {"signature": signature, "routine": routine}
+        self.changed = True
+        return raw_routine
+
+    def save(self):
+        """Write the index, dropping entries of routines that were not read."""
+        for key in set(self.entries) - self.seen:
+            del self.entries[key]
+            self.changed = True
+        if self.path is None or not self.changed:
+            return
+        index = {"version": _parser_version(), "entries": self.entries}
+        try:
+            atomic_write(self.path, json.dumps(index).encode("utf-8"))
+        except OSError:
+            pass
+        self.changed = False
+
+
 def read_routine_dir(*project_dirs):
-    """Read contents of routine dirs into dict of RawRoutine instances."""
+    """Read contents of routine dirs into dict of RawRoutine instances.
+
+    Parsed routines are cached in a RoutineFileIndex per project directory.
+    """
     global raw_routines
 
     if not project_dirs:
         project_dirs = (ConfigLoader.get("default", "sql_dir"),)
 
     if project_dirs not in raw_routines:
-        raw_routines[project_dirs] = {
-            raw_routine.name: raw_routine
-            for project_dir in project_dirs
-            for root, dirs, files in os.walk(project_dir)
-            if os.path.basename(root) != ConfigLoader.get("routine", "example_dir")
-            for filename in files
-            if filename in ROUTINE_FILE
-            for raw_routine in (RawRoutine.from_file(os.path.join(root, filename)),)
-        }
+        example_dir = ConfigLoader.get("routine", "example_dir")
+        routines = {}
+        for project_dir in project_dirs:
+            index = RoutineFileIndex(project_dir)
+            for root, dirs, files in os.walk(project_dir):
+                if os.path.basename(root) == example_dir:
+                    continue
+                for filename in files:
+                    if filename in ROUTINE_FILE:
+                        raw_routine = index.get(os.path.join(root, filename))
+                        routines[raw_routine.name] = raw_routine
+            index.save()
+        raw_routines[project_dirs] = routines
 
     return raw_routines[project_dirs]
 
@@ -258,6 +404,56 @@ def parse_routines(project_dir):
         yield ParsedRoutine.from_raw(raw_routine, tests_full_sql)
 
 
+class RoutineIndex:
+    """Lookups over a dict of raw routines, computed once per dict.
+
+    Caches transitive dependencies and persistent names of routines, and the
+    SQL rewritten by sub_local_routines.
+    """
+
+    def __init__(self, raw_routines):
+        """Initialize."""
+        self.raw_routines = raw_routines
+        self._dependencies: Dict[str, List[str]] = {}
+        self._persistent_names: Dict[str, List[Tuple[str, str]]] = {}
+        self.sub_local_routines_cache: Dict[tuple, str] = {}
+
+    def dependencies(self, udf_name) -> List[str]:
+        """Return udf_name and its transitive dependencies in depth-first order."""
+        if udf_name not in self._dependencies:
+            deps: List[str] = []
+            if udf_name in self.raw_routines:
+                for dep in self.raw_routines[udf_name].dependencies:
+                    deps += [d for d in self.dependencies(dep) if d not in deps]
+                if udf_name not in deps:
+                    deps.append(udf_name)
+            self._dependencies[udf_name] = deps
+        return self._dependencies[udf_name]
+
+    def persistent_names(self, udf_name) -> List[Tuple[str, str]]:
+        """Return (dataset, name) of each persistent definition of udf_name."""
+        if udf_name not in self._persistent_names:
+            self._persistent_names[udf_name] = [
+                PERSISTENT_UDF_RE.match(defn).groups()  # type: ignore
+                for defn in self.raw_routines[udf_name].definitions
+            ]
+        return self._persistent_names[udf_name]
+
+
+def routine_index(raw_routines) -> RoutineIndex:
+    """Return the RoutineIndex for raw_routines, rebuilt when it has changed."""
+    signature = tuple(map(id, raw_routines.values()))
+    cached = _routine_indexes.get(id(raw_routines))
+    if cached is not None and cached[0] is raw_routines and cached[1] == signature:
+        _routine_indexes.move_to_end(id(raw_routines))
+        return cached[2]
+    index = RoutineIndex(raw_routines)
+    _routine_indexes[id(raw_routines)] = (raw_routines, signature, index)
+    if len(_routine_indexes) > ROUTINE_INDEX_CACHE_SIZE:
+        _routine_indexes.popitem(last=False)
+    return index
+
+
 def accumulate_dependencies(deps, raw_routines, udf_name):
     """
     Accumulate a list of dependent routine names.
@@ -265,28 +461,14 @@ def accumulate_dependencies(deps, raw_routines, udf_name):
     Given a dict of raw_routines and a udf_name string, recurse into the
     routine's dependencies, adding the names to deps in depth-first order.
     """
-    if udf_name not in raw_routines:
-        return deps
-
-    raw_routine = raw_routines[udf_name]
-    for dep in raw_routine.dependencies:
-        deps = accumulate_dependencies(deps, raw_routines, dep)
-    if udf_name in deps:
-        return deps
-    else:
-        return deps + [udf_name]
+    dependencies = routine_index(raw_routines).dependencies(udf_name)
+    return deps + [dep for dep in dependencies if dep not in deps]
 
 
 def routine_usages_in_text(text, project):
     """Return a list of routine names used in the provided SQL text."""
-    sql = sqlparse.format(text, strip_comments=True)
-    routines = get_routines(project)
-
-    udf_usages = []
-
-    for routine in routines:
-        if routine["name"] in sql:
-            udf_usages.append(routine["name"])
+    sql = strip_sql_comments(text)
+    udf_usages = list(routine_names(project) & dotted_names(sql))
 
     # the TEMP_UDF_RE matches udf_js, remove since it's not a valid UDF
     tmp_udfs = list(filter(lambda u: u != "udf_js", TEMP_UDF_RE.findall(sql)))
@@ -319,24 +501,33 @@ def sub_local_routines(test, project, raw_routines=None, stored_procedure_test=F
     if raw_routines is None:
         raw_routines = read_routine_dir()
 
+    index = routine_index(raw_routines)
+    key = (test, str(project), stored_procedure_test)
+    if key in index.sub_local_routines_cache:
+        return index.sub_local_routines_cache[key]
+
     sql = prepend_routine_usage_definitions(test, project, raw_routines)
 
-    for name, routine in raw_routines.items():
-        if name in sql:
-            for defn in routine.definitions:
-                match = PERSISTENT_UDF_RE.match(defn)
-                dataset, name = match.group(1), match.group(2)
-                replace_name = f"{dataset}_{name}"
-                if stored_procedure_test:
-                    replace_name = f"{GENERIC_DATASET}.{replace_name}"
-                sql = re.sub(
-                    rf"(?<![\w\.])(`?{routine.project}`?\.)?`?{dataset}`?\.`?{name}`?(?=\()",
-                    replace_name,
-                    sql,
-                )
+    # projects of persistent routines by (dataset, name)
+    projects: Dict[Tuple[str, str], Set[str]] = {}
+    for name in dotted_names(sql).intersection(raw_routines):
+        for persistent_name in index.persistent_names(name):
+            projects.setdefault(persistent_name, set()).add(raw_routines[name].project)
+
+    def replace(match):
+        project, dataset, name = match.groups()
+        routine_projects = projects.get((dataset, name), ())
+        if not routine_projects or (project and project not in routine_projects):
+            return match.group(0)
+        if stored_procedure_test:
+            return f"{GENERIC_DATASET}.{dataset}_{name}"
+        return f"{dataset}_{name}"
+
+    sql = ROUTINE_CALL_RE.sub(replace, sql)
 
     if not stored_procedure_test:
         sql = PERSISTENT_UDF_PREFIX.sub("CREATE TEMP FUNCTION", sql)
+    index.sub_local_routines_cache[key] = sql
     return sql
 
 
@@ -56,21 +56,28 @@ class Schema:
         """Create schema from JSON object."""
         return cls(json_schema)
 
-    @classmethod
-    def for_table(cls, project, dataset, table, partitioned_by=None, *args, **kwargs):
-        """Get the schema for a BigQuery table."""
+    @staticmethod
+    def table_dry_run(project, dataset, table, partitioned_by=None, *args, **kwargs):
+        """Return the dry run of a query that selects from a BigQuery table."""
         query = f"SELECT * FROM `{project}.{dataset}.{table}`"
 
         if partitioned_by:
             query += f" WHERE DATE(`{partitioned_by}`) = DATE('2020-01-01')"
 
+        return dryrun.DryRun(
+            os.path.join(project, dataset, table, "query.sql"),
+            query,
+            *args,
+            **kwargs,
+        )
+
+    @classmethod
+    def for_table(cls, project, dataset, table, partitioned_by=None, *args, **kwargs):
+        """Get the schema for a BigQuery table."""
         try:
             return cls(
-                dryrun.DryRun(
-                    os.path.join(project, dataset, table, "query.sql"),
-                    query,
-                    *args,
-                    **kwargs,
+                cls.table_dry_run(
+                    project, dataset, table, partitioned_by, *args, **kwargs
                 ).get_schema()
             )
         except Exception as e:
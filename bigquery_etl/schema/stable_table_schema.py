@@ -1,14 +1,22 @@
 """Methods for working with stable table schemas."""
 import json
+import pickle
 import tarfile
 import urllib.request
 from dataclasses import dataclass
-from io import BytesIO
+from functools import lru_cache
 from itertools import groupby
-from typing import List
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 from bigquery_etl.config import ConfigLoader
 from bigquery_etl.dryrun import DryRun
+from bigquery_etl.util.cache import atomic_write, cache_dir
+
+# bump when SchemaFile changes, to invalidate cached schemas
+SCHEMAS_CACHE_VERSION = 1
+# number of schemas builds that are kept in the cache
+SCHEMAS_CACHE_BUILDS = 3
 
 
 @dataclass
@@ -46,8 +54,9 @@ class SchemaFile:
         )
 
 
-def prod_schemas_uri():
-    """Return URI for the schemas tarball deployed to shared-prod.
+@lru_cache
+def prod_schemas_commit() -> str:
+    """Return the commit hash of the most recent production schemas deploy.
 
     We construct a fake query and send it to the dry run service in order
     to read dataset labels, which contains the commit hash associated
@@ -55,53 +64,147 @@ def prod_schemas_uri():
     """
     dryrun = DryRun("telemetry_derived/foo/query.sql", content="SELECT 1")
     build_id = dryrun.get_dataset_labels()["schemas_build_id"]
-    commit_hash = build_id.split("_")[-1]
+    return build_id.split("_")[-1]
+
+
+def prod_schemas_uri(commit_hash: Optional[str] = None):
+    """Return URI for the schemas tarball deployed to shared-prod."""
+    commit_hash = commit_hash or prod_schemas_commit()
     mps_uri = ConfigLoader.get("schema", "mozilla_pipeline_schemas_uri")
     return f"{mps_uri}/archive/{commit_hash}.tar.gz"
 
 
-def get_stable_table_schemas() -> List[SchemaFile]:
-    """Fetch last schema metadata per doctype by version."""
-    schemas_uri = prod_schemas_uri()
-    with urllib.request.urlopen(schemas_uri) as f:
-        tarbytes = BytesIO(f.read())
+def _schemas_cache_path(commit_hash: str) -> Path:
+    return cache_dir("stable_table_schemas") / (
+        f"{commit_hash}.v{SCHEMAS_CACHE_VERSION}.pickle"
+    )
+
+
+def _load_cached_schemas(commit_hash: str) -> Optional[List[SchemaFile]]:
+    """Return the cached schemas of a schemas build, or None if not cached."""
+    try:
+        path = _schemas_cache_path(commit_hash)
+        with open(path, "rb") as f:
+            schemas = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    try:
+        # modification time tracks last use for eviction
+        path.touch()
+    except OSError:
+        pass
+    return schemas
+
+
+def _cache_schemas(commit_hash: str, schemas: List[SchemaFile]):
+    """Cache the schemas of a schemas build, evicting least recently used builds."""
+    try:
+        path = _schemas_cache_path(commit_hash)
+        atomic_write(path, pickle.dumps(schemas, protocol=pickle.HIGHEST_PROTOCOL))
+        cached = sorted(
+            path.parent.glob("*.pickle"),
+            key=lambda cached_path: cached_path.stat().st_mtime,
+            reverse=True,
+        )
+        for old_path in cached[SCHEMAS_CACHE_BUILDS:]:
+            old_path.unlink(missing_ok=True)
+    except OSError:
+        pass  # caching is best effort
+
+
+def _download_schemas(commit_hash: str) -> List[SchemaFile]:
+    """Download and parse the latest schema per doctype of a schemas build."""
+    with urllib.request.urlopen(prod_schemas_uri(commit_hash)) as f:
+        return _parse_schemas_tarball(f)
 
-    schemas = []
-    with tarfile.open(fileobj=tarbytes, mode="r:gz") as tar:
+
+def _parse_schemas_tarball(fileobj) -> List[SchemaFile]:
+    """Parse the latest schema per doctype from a gzipped schemas tarball stream.
+
+    The tarball is read in a single pass, so that it never has to be held in
+    memory. JSON schemas are paired with their BigQuery schemas as members
+    arrive, and only the highest version per doctype is retained.
+    """
+    # schema and BigQuery schema files waiting for their counterpart, by base path
+    pending_schemas: Dict[str, Tuple[dict, str, str, int]] = {}
+    pending_bq_schemas: Dict[str, Any] = {}
+    latest: Dict[Tuple[str, str], SchemaFile] = {}
+
+    def add_schema(schema, document_namespace, document_type, version, bq_schema):
+        current = latest.get((document_namespace, document_type))
+        if current is not None and current.document_version > version:
+            return
+        pipeline_meta = schema["mozPipelineMetadata"]
+        latest[(document_namespace, document_type)] = SchemaFile(
+            schema=bq_schema,
+            schema_id=schema.get("$id", ""),
+            bq_dataset_family=pipeline_meta["bq_dataset_family"],
+            bq_table=pipeline_meta["bq_table"],
+            document_namespace=document_namespace,
+            document_type=document_type,
+            document_version=version,
+        )
+
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as tar:
         for tarinfo in tar:
             if tarinfo.name.endswith(".schema.json"):
+                base = tarinfo.name[: -len(".schema.json")]
                 *_, document_namespace, document_type, basename = tarinfo.name.split(
                     "/"
                 )
                 version = int(basename.split(".")[1])
-                schema = json.load(tar.extractfile(tarinfo.name))  # type: ignore
-                bq_schema = {}
+                schema = json.load(tar.extractfile(tarinfo))  # type: ignore
 
                 # Schemas without pipeline metadata (like glean/glean)
                 # do not have corresponding BQ tables, so we skip them here.
-                pipeline_meta = schema.get("mozPipelineMetadata", None)
-                if pipeline_meta is None:
+                if schema.get("mozPipelineMetadata", None) is None:
+                    pending_bq_schemas.pop(base, None)
                     continue
 
-                try:
-                    bq_schema_file = tar.extractfile(
-                        tarinfo.name.replace(".schema.json", ".bq")
+                if base in pending_bq_schemas:
+                    add_schema(
+                        schema,
+                        document_namespace,
+                        document_type,
+                        version,
+                        pending_bq_schemas.pop(base),
                     )
-                    bq_schema = json.load(bq_schema_file)  # type: ignore
-                except KeyError as e:
-                    print(f"Cannot get Bigquery schema for {tarinfo.name}: {e}")
-
-                schemas.append(
-                    SchemaFile(
-                        schema=bq_schema,
-                        schema_id=schema.get("$id", ""),
-                        bq_dataset_family=pipeline_meta["bq_dataset_family"],
-                        bq_table=pipeline_meta["bq_table"],
-                        document_namespace=document_namespace,
-                        document_type=document_type,
-                        document_version=version,
+                else:
+                    pending_schemas[base] = (
+                        schema,
+                        document_namespace,
+                        document_type,
+                        version,
                     )
-                )
+            elif tarinfo.name.endswith(".bq"):
+                base = tarinfo.name[: -len(".bq")]
+                bq_schema = json.load(tar.extractfile(tarinfo))  # type: ignore
+                if base in pending_schemas:
+                    add_schema(*pending_schemas.pop(base), bq_schema)
+                else:
+                    pending_bq_schemas[base] = bq_schema
+
+    for base, pending_schema in pending_schemas.items():
+        print(f"Cannot get Bigquery schema for {base}.schema.json")
+        add_schema(*pending_schema, {})
+
+    return sorted(
+        latest.values(),
+        key=lambda t: (t.document_namespace, t.document_type),
+    )
+
+
+def get_stable_table_schemas() -> List[SchemaFile]:
+    """Fetch last schema metadata per doctype by version.
+
+    Parsed schemas are cached locally per production schemas deploy, so that the
+    schemas tarball is only downloaded once per deploy.
+    """
+    commit_hash = prod_schemas_commit()
+    schemas = _load_cached_schemas(commit_hash)
+    if schemas is None:
+        schemas = _download_schemas(commit_hash)
+        _cache_schemas(commit_hash, schemas)
 
     # Exclude doctypes maintained in separate projects.
     for prefix in ConfigLoader.get("schema", "skip_prefixes", fallback=[]):
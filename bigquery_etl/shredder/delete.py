@@ -11,7 +11,7 @@ from itertools import chain
 from multiprocessing.pool import ThreadPool
 from operator import attrgetter
 from textwrap import dedent
-from typing import Callable, Iterable, Optional, Tuple
+from typing import Callable, Iterable, List, Optional, Tuple
 
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
@@ -28,6 +28,8 @@ from .config import (
     find_glean_targets,
     find_pioneer_targets,
 )
+from .cost import JOBS_QUERY
+from .schedule import CostAwareScheduler, expected_duration, order_by_cost
 
 NULL_PARTITION_ID = "__NULL__"
 OUTSIDE_RANGE_PARTITION_ID = "__UNPARTITIONED__"
@@ -122,6 +124,21 @@ parser.add_argument(
     help="Table for recording tasks; Used along with --state-table to determine "
     "progress; Create it if it does not exist; By default tasks are not recorded",
 )
+parser.add_argument(
+    "--max-total-in-flight-bytes",
+    "--max_total_in_flight_bytes",
+    type=int,
+    help="Maximum number of target table bytes to process concurrently in total, "
+    "across all billing projects; tasks are started largest first, and smaller tasks "
+    "are started while larger ones would exceed this; by default only --parallelism "
+    "is limited",
+)
+parser.add_argument(
+    "--slots",
+    type=int,
+    help="Number of reserved slots available to shredder; if set, report the "
+    "expected completion time based on the speed of previous shredder jobs",
+)
 standard_args.add_table_filter(parser)
 
 
@@ -298,6 +315,7 @@ class Partition:
     condition: str
     id: Optional[str] = None
     is_special: bool = False
+    size_bytes: int = 0
 
 
 def get_partition(table, partition_expr, end_date, id_=None) -> Optional[Partition]:
@@ -339,29 +357,43 @@ def get_partition(table, partition_expr, end_date, id_=None) -> Optional[Partiti
 def list_partitions(
     client, table, partition_expr, end_date, max_single_dml_bytes, partition_limit
 ):
-    """List the relevant partitions in a table."""
-    partitions = [
-        partition
-        for partition in (
-            [
-                get_partition(table, partition_expr, end_date, row["partition_id"])
-                for row in client.query(
-                    dedent(
-                        f"""
-                        SELECT
-                          partition_id
-                        FROM
-                          [{sql_table_id(table)}$__PARTITIONS_SUMMARY__]
-                        """
-                    ).strip(),
-                    bigquery.QueryJobConfig(use_legacy_sql=True),
-                ).result()
-            ]
-            if table.num_bytes > max_single_dml_bytes and partition_expr is not None
-            else [get_partition(table, partition_expr, end_date)]
+    """List the relevant partitions in a table, with their sizes."""
+    if table.num_bytes > max_single_dml_bytes and partition_expr is not None:
+        rows = list(
+            client.query(
+                dedent(
+                    f"""
+                    SELECT
+                      partition_id,
+                      total_logical_bytes
+                    FROM
+                      `{table.project}.{table.dataset_id}.INFORMATION_SCHEMA.PARTITIONS`
+                    WHERE
+                      table_name = '{table.table_id}'
+                    """
+                ).strip()
+            ).result()
         )
-        if partition is not None
-    ]
+        # for partitions without a reported size, spread the table's bytes over
+        # all of its partitions, before they are filtered and limited
+        default_size = (table.num_bytes or 0) // max(len(rows), 1)
+        sizes = [
+            (
+                row["partition_id"],
+                default_size
+                if row["total_logical_bytes"] is None
+                else row["total_logical_bytes"],
+            )
+            for row in rows
+        ]
+    else:
+        sizes = [(None, table.num_bytes or 0)]
+    partitions = []
+    for id_, size_bytes in sizes:
+        partition = get_partition(table, partition_expr, end_date, id_)
+        if partition is not None:
+            partition.size_bytes = size_bytes
+            partitions.append(partition)
     if partition_limit:
         return sorted(partitions, key=attrgetter("id"), reverse=True)[:partition_limit]
     return partitions
@@ -375,6 +407,7 @@ class Task:
     sources: Tuple[DeleteSource]
     partition_id: Optional[str]
     func: Callable[[bigquery.Client], bigquery.QueryJob]
+    estimated_bytes: int = 0
 
     @property
     def partition_sort_key(self):
@@ -407,13 +440,15 @@ def delete_from_table(
         logging.warning(f"Skipping {sql_table_id(target)} due to NotFound exception")
         return ()
     partition_expr = get_partition_expr(table)
-    for partition in list_partitions(
+    partitions = list_partitions(
         client, table, partition_expr, end_date, max_single_dml_bytes, partition_limit
-    ):
+    )
+    for partition in partitions:
         yield Task(
             table=table,
             sources=sources,
             partition_id=partition.id,
+            estimated_bytes=partition.size_bytes,
             func=delete_from_partition(
                 dry_run=dry_run,
                 partition=partition,
@@ -426,6 +461,27 @@ def delete_from_table(
         )
 
 
+def plan_deletes(client_q, pool, targets_with_sources, **kwargs) -> List[Task]:
+    """Return tasks to handle deletion requests for all targets.
+
+    Table metadata and partitions are fetched for many targets concurrently in pool,
+    using clients from client_q. Tasks are returned in the order of targets.
+    """
+
+    def _delete_from_table(client, target, sources):
+        return list(delete_from_table(client, target, sources, **kwargs))
+
+    return [
+        task
+        for target_tasks in pool.starmap(
+            partial(client_q.with_client, _delete_from_table),
+            targets_with_sources,
+            chunksize=1,
+        )
+        for task in target_tasks
+    ]
+
+
 def main():
     """Process deletion requests."""
     args = parser.parse_args()
@@ -496,17 +552,22 @@ def main():
                 pool, client, study_projects=args.pioneer_study_projects
             ).items()
 
-    tasks = [
-        task
-        for target, sources in targets_with_sources
-        if args.table_filter(target.table)
-        for task in delete_from_table(
-            client=client,
-            target=replace(target, project=args.target_project or target.project),
-            sources=[
+    targets_with_sources = [
+        (
+            replace(target, project=args.target_project or target.project),
+            [
                 replace(source, project=args.source_project or source.project)
                 for source in (sources if isinstance(sources, tuple) else (sources,))
             ],
+        )
+        for target, sources in targets_with_sources
+        if args.table_filter(target.table)
+    ]
+    with ThreadPool(args.parallelism) as pool:
+        tasks = plan_deletes(
+            client_q,
+            pool,
+            targets_with_sources,
             source_condition=source_condition,
             dry_run=args.dry_run,
             use_dml=args.use_dml,
@@ -518,14 +579,19 @@ def main():
             state_table=args.state_table,
             states=states,
         )
-    ]
     if not tasks:
         logging.error("No tables selected")
         parser.exit(1)
-    # ORDER BY partition_sort_key DESC, sql_table_id ASC
-    # https://docs.python.org/3/howto/sorting.html#sort-stability-and-complex-sorts
-    tasks.sort(key=lambda task: sql_table_id(task.table))
-    tasks.sort(key=attrgetter("partition_sort_key"), reverse=True)
+    tasks = order_by_cost(tasks)
+    if args.slots:
+        duration = expected_duration(
+            tasks, list(client.query(JOBS_QUERY).result()), args.slots
+        )
+        if duration is not None:
+            logging.info(
+                f"Expecting to process {len(tasks)} tasks in {duration} "
+                f"using {args.slots} slots"
+            )
     with ThreadPool(args.parallelism) as pool:
         if args.task_table and not args.dry_run:
             # record task information
@@ -595,9 +661,8 @@ def main():
                         ],
                     )
                 )
-        results = pool.map(
-            client_q.with_client, (task.func for task in tasks), chunksize=1
-        )
+    scheduler = CostAwareScheduler(args.parallelism, args.max_total_in_flight_bytes)
+    results = scheduler.map(lambda task: client_q.with_client(task.func), tasks)
     jobs_by_table = defaultdict(list)
     for i, job in enumerate(results):
         jobs_by_table[tasks[i].table].append(job)
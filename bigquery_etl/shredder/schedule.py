@@ -0,0 +1,162 @@
+"""Cost-aware scheduling of shredder tasks."""
+
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from operator import attrgetter
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ..util.bigquery_id import sql_table_id
+from .cost import get_bytes_per_second, mean
+
+
+def order_by_cost(tasks: Sequence) -> List:
+    """Return tasks with the largest estimated bytes first.
+
+    Starting the longest tasks first keeps huge partitions from being queued behind
+    thousands of small ones, which would leave them running alone at the end. Ties
+    are ordered by partition_sort_key, like tasks without estimates.
+    """
+    # https://docs.python.org/3/howto/sorting.html#sort-stability-and-complex-sorts
+    tasks = sorted(tasks, key=lambda task: sql_table_id(task.table))
+    tasks.sort(key=attrgetter("partition_sort_key"), reverse=True)
+    tasks.sort(key=attrgetter("estimated_bytes"), reverse=True)
+    return tasks
+
+
+class _PendingTasks:
+    """Tasks in order_by_cost order that can be taken from the head or the middle.
+
+    Tasks are ordered by estimated bytes, largest first, so the first task that
+    fits a budget is found by bisection. Taken tasks are skipped by following
+    pointers to the next pending task, which are compressed as they are followed.
+    """
+
+    def __init__(self, tasks: Sequence):
+        self._tasks = list(tasks)
+        self._negated_bytes = [-task.estimated_bytes for task in self._tasks]
+        self._next = list(range(len(self._tasks) + 1))
+        self._len = len(self._tasks)
+
+    def __len__(self):
+        return self._len
+
+    def _find(self, i: int) -> int:
+        """Return the index of the first pending task at or after i."""
+        root = i
+        while self._next[root] != root:
+            root = self._next[root]
+        while self._next[i] != root:
+            self._next[i], i = root, self._next[i]
+        return root
+
+    def _take(self, i: int):
+        self._next[i] = i + 1
+        self._len -= 1
+        return self._tasks[i]
+
+    def head(self):
+        """Return the first pending task."""
+        return self._tasks[self._find(0)]
+
+    def take_head(self):
+        """Remove and return the first pending task."""
+        return self._take(self._find(0))
+
+    def take_fitting(self, budget: int):
+        """Remove and return the first pending task within budget, if any."""
+        i = self._find(bisect_left(self._negated_bytes, -budget))
+        if i == len(self._tasks):
+            return None
+        return self._take(i)
+
+
+class CostAwareScheduler:
+    """Run tasks concurrently, bounding the estimated bytes processed in flight.
+
+    Tasks are started in order_by_cost order, at most parallelism at a time. When
+    max_in_flight_bytes is set, a task is only started while the estimated bytes
+    of running tasks leave room for it. If the next task in order does not fit,
+    smaller tasks that fit are started instead, but only until parallelism tasks
+    were started ahead of it; then the budget is reserved for it, so that large
+    tasks are not starved by small ones. A task that exceeds the budget on its own
+    runs when nothing else does.
+    """
+
+    def __init__(self, parallelism: int, max_in_flight_bytes: Optional[int] = None):
+        """Initialize."""
+        self.parallelism = parallelism
+        self.max_in_flight_bytes = max_in_flight_bytes
+
+    def _fits(self, task, in_flight_bytes, running):
+        return (
+            not running
+            or self.max_in_flight_bytes is None
+            or in_flight_bytes + task.estimated_bytes <= self.max_in_flight_bytes
+        )
+
+    def map(self, func: Callable, tasks: Sequence) -> List:
+        """Call func for each task and return the results in the order of tasks."""
+        tasks = list(tasks)
+        index = {id(task): i for i, task in enumerate(tasks)}
+        pending = _PendingTasks(order_by_cost(tasks))
+        results: Dict[int, object] = {}
+        running: Dict = {}
+        in_flight_bytes = 0
+        # number of tasks started ahead of the blocked head of the queue
+        head_skips = 0
+        with ThreadPoolExecutor(self.parallelism) as executor:
+            try:
+                while pending or running:
+                    while pending and len(running) < self.parallelism:
+                        if self._fits(pending.head(), in_flight_bytes, running):
+                            task = pending.take_head()
+                            head_skips = 0
+                        elif head_skips < self.parallelism:
+                            assert self.max_in_flight_bytes is not None
+                            task = pending.take_fitting(
+                                self.max_in_flight_bytes - in_flight_bytes
+                            )
+                            if task is None:
+                                break
+                            head_skips += 1
+                        else:
+                            break  # reserve the budget for the head of the queue
+                        in_flight_bytes += task.estimated_bytes
+                        running[executor.submit(func, task)] = task
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = running.pop(future)
+                        in_flight_bytes -= task.estimated_bytes
+                        results[index[id(task)]] = future.result()
+            finally:
+                for future in running:
+                    future.cancel()
+        return [results[i] for i in range(len(tasks))]
+
+
+def expected_duration(
+    tasks: Sequence, jobs: Sequence, slots: int
+) -> Optional[timedelta]:
+    """Estimate how long tasks take to complete with slots reserved slots.
+
+    Processing speed per table is taken from previous shredder jobs, using the
+    mean speed weighted by table size for tables without previous jobs.
+    """
+    tables = {sql_table_id(task.table): task.table for task in tasks}
+    speeds = {
+        table_id: get_bytes_per_second(jobs, slots, table)
+        for table_id, table in tables.items()
+    }
+    mean_speed = mean(
+        (speeds[table_id], table.num_bytes) for table_id, table in tables.items()
+    )
+    if mean_speed is None:
+        return None
+    return timedelta(
+        seconds=sum(
+            task.estimated_bytes / (speeds[sql_table_id(task.table)] or mean_speed)
+            for task in tasks
+        )
+    )
@@ -0,0 +1,106 @@
+"""
+Snapshot of the tables and views that exist in BigQuery projects.
+
+Generators use the snapshot to decide whether a referenced table exists
+without a dry run per generated query. A snapshot is read with one query of
+INFORMATION_SCHEMA.TABLES per project and stored in the local cache directory
+until it is older than `table_catalog.ttl_seconds`, so that it is shared
+between processes and runs.
+
+Tables that were created after the snapshot was taken are missing from it, so
+a missing table is not proof that it does not exist: callers should fall back
+to a dry run instead. If the snapshot cannot be read, e.g. without BigQuery
+credentials, every table is treated as missing.
+"""
+
+import json
+import logging
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Optional
+
+from google.cloud import bigquery
+
+from .config import ConfigLoader
+from .util.cache import atomic_write, cache_dir
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+TABLES_QUERY = (
+    "SELECT table_schema, table_name "
+    "FROM `{project}.region-us.INFORMATION_SCHEMA.TABLES`"
+)
+
+
+class TableCatalog:
+    """Snapshots of the table IDs in BigQuery projects."""
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        client: Optional[bigquery.Client] = None,
+    ):
+        """Initialize."""
+        self.directory = Path(directory) if directory else cache_dir("table_catalog")
+        self.ttl_seconds = ttl_seconds
+        self._client = client
+        self._snapshots: Dict[str, Optional[FrozenSet[str]]] = {}
+
+    def _path(self, project: str) -> Path:
+        return self.directory / f"{project}.json"
+
+    def _fetch(self, project: str) -> FrozenSet[str]:
+        if self._client is None:
+            self._client = bigquery.Client()
+        rows = self._client.query(TABLES_QUERY.format(project=project)).result()
+        return frozenset(f"{row.table_schema}.{row.table_name}" for row in rows)
+
+    def tables(self, project: str) -> Optional[FrozenSet[str]]:
+        """Return the `dataset.table` IDs in project, or None if unavailable."""
+        if project in self._snapshots:
+            return self._snapshots[project]
+
+        path = self._path(project)
+        try:
+            snapshot = json.loads(path.read_text())
+            if time.time() - snapshot["fetched"] <= self.ttl_seconds:
+                self._snapshots[project] = frozenset(snapshot["tables"])
+                return self._snapshots[project]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        try:
+            tables = self._fetch(project)
+        except Exception as e:
+            logging.warning(f"Unable to read tables of {project}: {e}")
+            # don't retry for every table of the project
+            self._snapshots[project] = None
+            return None
+        snapshot = {"fetched": time.time(), "tables": sorted(tables)}
+        try:
+            atomic_write(path, json.dumps(snapshot).encode("utf-8"))
+        except OSError:
+            pass  # caching is best effort
+        self._snapshots[project] = tables
+        return tables
+
+    def contains(self, table_id: str) -> bool:
+        """Return whether the `project.dataset.table` is in the snapshot."""
+        parts = table_id.replace("`", "").split(".")
+        if len(parts) != 3:
+            return False
+        project, dataset, table = parts
+        tables = self.tables(project)
+        return tables is not None and f"{dataset}.{table}" in tables
+
+
+@lru_cache(maxsize=None)
+def default_catalog() -> TableCatalog:
+    """Return the table catalog configured in bqetl_project.yaml."""
+    config = ConfigLoader.get("table_catalog", fallback={}) or {}
+    directory = config.get("dir")
+    return TableCatalog(
+        directory=Path(ConfigLoader.project_dir) / directory if directory else None,
+        ttl_seconds=config.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+    )
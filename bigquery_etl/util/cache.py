@@ -0,0 +1,51 @@
+"""Local on-disk caches shared by bqetl commands."""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from bigquery_etl.config import ConfigLoader
+
+# overrides the configured cache directory, e.g. to share a cache in CI
+CACHE_DIR_ENV = "BQETL_CACHE_DIR"
+DEFAULT_CACHE_DIR = ".bqetl_cache"
+
+
+def cache_dir(*parts: str) -> Path:
+    """Return the directory for a named cache, creating it if necessary.
+
+    Relative cache directories are resolved against the project directory.
+    """
+    base = os.environ.get(CACHE_DIR_ENV) or ConfigLoader.get(
+        "default", "cache_dir", fallback=DEFAULT_CACHE_DIR
+    )
+    path = Path(ConfigLoader.project_dir) / base
+    path = path.joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def content_hash(*parts) -> str:
+    """Return a stable hex digest of the given str or bytes parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(part)
+        # separate parts so that ("ab", "c") and ("a", "bc") differ
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def atomic_write(path: Path, data: bytes):
+    """Write data to path so that concurrent readers never see partial content."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
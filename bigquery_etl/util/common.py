@@ -5,18 +5,20 @@ import os
 import random
 import re
 import string
-import tempfile
+import time
 import warnings
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import FrozenSet, List, Optional, Tuple
 from uuid import uuid4
 
 from google.cloud import bigquery
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 from bigquery_etl.config import ConfigLoader
 from bigquery_etl.format_sql.formatter import reformat
 from bigquery_etl.metrics import MetricHub
+from bigquery_etl.util.cache import cache_dir
 
 # Search for all camelCase situations in reverse with arbitrary lookaheads.
 REV_WORD_BOUND_PAT = re.compile(
@@ -32,6 +34,8 @@ FILE_PATH = Path(os.path.dirname(__file__))
 DEFAULT_QUERY_TEMPLATE_VARS = {"is_init": lambda: False, "metrics": MetricHub()}
 ROOT = Path(__file__).parent.parent.parent
 CHECKS_MACROS_DIR = ROOT / "tests" / "checks"
+BYTECODE_CACHE_MAX_SIZE_BYTES = 64 * 1024 * 1024
+BYTECODE_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
 
 
 def snake_case(line: str) -> str:
@@ -61,6 +65,120 @@ def random_str(length: int = 12) -> str:
     return "".join(random.choice(string.ascii_lowercase) for i in range(length))
 
 
+class _ChecksLoader(FileSystemLoader):
+    """Template loader that pastes the check macro definitions into checks.sql.
+
+    It is not possible to use `include` or `import` for the macros, since they live
+    in a different directory than the checks Jinja template and need access to the
+    render context.
+    """
+
+    def get_source(self, environment, template):
+        """Get the template source, prepending macros for checks templates."""
+        source, filename, uptodate = super().get_source(environment, template)
+        if template == "checks.sql":
+            source = _checks_macros() + "\n" + source
+        return source, filename, uptodate
+
+
+@lru_cache
+def _checks_macros() -> str:
+    """Return the check macro definitions."""
+    return "\n".join(
+        macro_file.read_text() for macro_file in sorted(CHECKS_MACROS_DIR.glob("*"))
+    )
+
+
+def _evict_bytecode(
+    directory: Path,
+    ttl_seconds: float = BYTECODE_CACHE_TTL_SECONDS,
+    max_size_bytes: int = BYTECODE_CACHE_MAX_SIZE_BYTES,
+):
+    """Remove expired compiled templates, then the oldest ones over max size.
+
+    Templates are cached under a checksum of their source, so every change of a
+    template leaves the bytecode of the previous version behind.
+    """
+    now = time.time()
+    entries = []
+    total_size = 0
+    for path in directory.glob("__jinja2_*.cache"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue  # removed by another process
+        if now - stat.st_mtime > ttl_seconds:
+            path.unlink(missing_ok=True)
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total_size += stat.st_size
+    for _, size, path in sorted(entries):
+        if total_size <= max_size_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total_size -= size
+
+
+@lru_cache
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """Return the persistent bytecode cache for compiled templates, if writable."""
+    try:
+        directory = cache_dir("jinja")
+        _evict_bytecode(directory)
+        return FileSystemBytecodeCache(str(directory))
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=256)
+def _environment(template_folder: str) -> Environment:
+    """Return the Jinja environment for a template folder.
+
+    Environments are memoized so that templates are only compiled once per process,
+    and reloaded if they change on disk.
+    """
+    return Environment(
+        loader=_ChecksLoader(template_folder), bytecode_cache=_bytecode_cache()
+    )
+
+
+@lru_cache
+def _configured_render_skip(cwd: str, patterns: Tuple[str, ...]) -> FrozenSet[str]:
+    """Return the files matching the configured render skip globs.
+
+    Globs are relative to the current working directory, so results are cached
+    per cwd.
+    """
+    return frozenset(
+        file for skip in patterns for file in glob.glob(skip, recursive=True)
+    )
+
+
+def _render_skip(cwd: str, include_staged: bool) -> FrozenSet[str]:
+    """Return the configured files for which rendering should be skipped.
+
+    With include_staged, also include copies of the skipped files staged in the
+    test project. Staged copies are created while the process runs, so they are
+    not cached.
+    """
+    skip = _configured_render_skip(
+        cwd, tuple(ConfigLoader.get("render", "skip", fallback=[]))
+    )
+    if not include_staged:
+        return skip
+    test_project = ConfigLoader.get("default", "test_project")
+    sql_dir = ConfigLoader.get("default", "sql_dir", fallback="sql")
+    # check if staged file needs to be skipped
+    return skip.union(
+        p
+        for f in [Path(s) for s in skip]
+        for p in glob.glob(
+            f"{sql_dir}/{test_project}/{f.parent.parent.name}*/{f.parent.name}/{f.name}",
+            recursive=True,
+        )
+    )
+
+
 def render(
     sql_filename,
     template_folder=".",
@@ -70,60 +188,14 @@ def render(
 ) -> str:
     """Render a given template query using Jinja."""
     path = Path(template_folder) / sql_filename
-    skip = {
-        file
-        for skip in ConfigLoader.get("render", "skip", fallback=[])
-        for file in glob.glob(
-            skip,
-            recursive=True,
-        )
-    }
     test_project = ConfigLoader.get("default", "test_project")
-    sql_dir = ConfigLoader.get("default", "sql_dir", fallback="sql")
-
-    if test_project in str(path):
-        # check if staged file needs to be skipped
-        skip.update(
-            [
-                p
-                for f in [Path(s) for s in skip]
-                for p in glob.glob(
-                    f"{sql_dir}/{test_project}/{f.parent.parent.name}*/{f.parent.name}/{f.name}",
-                    recursive=True,
-                )
-            ]
-        )
+    skip = _render_skip(os.getcwd(), test_project in str(path))
 
     if any(s in str(path) for s in skip):
         rendered = path.read_text()
     else:
-        if sql_filename == "checks.sql":
-            # make macros available by creating a temporary file and pasting macro definition
-            # alongside checks.
-            # it is not possible to use `include` or `import` since the macros live in a different
-            # directory than the checks Jinja template.
-            with tempfile.NamedTemporaryFile(mode="w+") as tmp_checks_file:
-                macro_imports = "\n".join(
-                    [
-                        macro_file.read_text()
-                        for macro_file in CHECKS_MACROS_DIR.glob("*")
-                    ]
-                )
-                checks_template = Path(str(tmp_checks_file.name))
-                checks_template.write_text(
-                    macro_imports
-                    + "\n"
-                    + (Path(template_folder) / sql_filename).read_text()
-                )
-
-                file_loader = FileSystemLoader(f"{str(checks_template.parent)}")
-                env = Environment(loader=file_loader)
-                main_sql = env.get_template(checks_template.name)
-        else:
-            file_loader = FileSystemLoader(f"{template_folder}")
-            env = Environment(loader=file_loader)
-            main_sql = env.get_template(sql_filename)
-
+        environment = _environment(os.path.abspath(template_folder))
+        main_sql = environment.get_template(sql_filename)
         template_vars = DEFAULT_QUERY_TEMPLATE_VARS | kwargs
         rendered = main_sql.render(**template_vars)
 
@@ -1,89 +1,190 @@
 """Threaded TopologialSorter."""
 
-import multiprocessing
+import asyncio
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
 from copy import deepcopy
 from graphlib import TopologicalSorter
-from typing import Dict, Set
+from time import perf_counter
+from typing import Dict, Hashable, List, Optional, Set
+
+
+class _FollowUps:
+    """Collects follow-up items requested by a callback, via a queue-like put."""
+
+    def __init__(self):
+        self.items: List[Hashable] = []
+
+    def put(self, item):
+        """Request that item is processed after the current item."""
+        self.items.append(item)
+
+
+def _run_callback(callback, item, with_follow_up):
+    """Run callback for item and return requested follow-up items and elapsed time.
+
+    Defined at module level so that it can be submitted to a process pool.
+    """
+    follow_ups = _FollowUps() if with_follow_up else None
+    start = perf_counter()
+    callback(item, follow_ups)
+    return (follow_ups.items if follow_ups else []), perf_counter() - start
+
+
+class _Schedule:
+    """Ready-queue schedule of a dependency graph that accepts follow-up items."""
+
+    def __init__(self, dependencies: Dict[Hashable, Set[Hashable]]):
+        # validate the graph, raising graphlib.CycleError for cycles
+        TopologicalSorter(dependencies).prepare()
+        self.waiting_for: Dict[Hashable, Set[Hashable]] = {}
+        self.dependents: Dict[Hashable, Set[Hashable]] = {}
+        for node, deps in dependencies.items():
+            self.waiting_for.setdefault(node, set()).update(deps)
+            for dep in deps:
+                self.waiting_for.setdefault(dep, set())
+                self.dependents.setdefault(dep, set()).add(node)
+        self.ready = deque(node for node, deps in self.waiting_for.items() if not deps)
+        for node in self.ready:
+            del self.waiting_for[node]
+        self.running: Set[Hashable] = set()
+        self.rerun: Set[Hashable] = set()
+        self.done: Set[Hashable] = set()
+
+    def is_active(self) -> bool:
+        return bool(self.ready or self.running or self.waiting_for)
+
+    def start(self, node):
+        self.running.add(node)
+
+    def finish(self, node, follow_ups):
+        """Mark node as processed and schedule dependents and follow-up items."""
+        self.running.discard(node)
+        self.done.add(node)
+        for dependent in self.dependents.pop(node, ()):
+            waiting_for = self.waiting_for[dependent]
+            waiting_for.discard(node)
+            if not waiting_for:
+                del self.waiting_for[dependent]
+                self.ready.append(dependent)
+        if node in self.rerun:
+            self.rerun.discard(node)
+            self.ready.append(node)
+        for item in follow_ups:
+            self.follow_up(item)
+
+    def follow_up(self, item):
+        """Schedule item to be processed again, once it is not already running.
+
+        Items that have not started yet are already going to be processed after
+        the item that requested the follow-up, so they are not scheduled twice.
+        """
+        if item in self.waiting_for or item in self.ready:
+            return
+        if item in self.running:
+            self.rerun.add(item)
+        else:
+            self.ready.append(item)
 
 
 class ParallelTopologicalSorter:
-    """TopologicalSorter that processes sorted items concurrently."""
+    """TopologicalSorter that processes sorted items concurrently.
+
+    Items are processed as soon as all of their dependencies are processed. The
+    callback is called with the item and, if with_follow_up is set, a queue-like
+    object whose `put` schedules another item to be processed after the current
+    item. Follow-up items are scheduled into the live graph, so that they run
+    concurrently with the remaining items.
+
+    Callbacks run on a thread pool by default. Pass an executor to use a different
+    pool, e.g. a ProcessPoolExecutor for CPU-bound callbacks, in which case the
+    callback must be picklable; executors that are passed in are not shut down.
+    Use `map_async` to process items with a coroutine function on the running
+    event loop instead.
+
+    After processing, `timings` contains the total seconds spent processing each
+    item.
+    """
 
     def __init__(
         self,
         dependencies: Dict[str, Set[str]],
         parallelism: int = 8,
         with_follow_up=False,
+        executor: Optional[Executor] = None,
     ):
         """Initialize."""
         self.dependencies = deepcopy(dependencies)
         self.parallelism = parallelism
-
-        manager = multiprocessing.Manager()
-        self.visited = manager.dict({dep: False for dep, _ in dependencies.items()})
         self.with_follow_up = with_follow_up
+        self.executor = executor
+        self.timings: Dict[Hashable, float] = {}
 
-    def _worker(
-        self, task_queue, finalized_tasks_queue, followup_queue, visited_map, callback
-    ):
-        while True:
-            item = task_queue.get()
-            callback(item, followup_queue)
-            if item in visited_map:
-                visited_map[item] = True
-            finalized_tasks_queue.put(item)
-            task_queue.task_done()
+    def _record(self, item, seconds):
+        self.timings[item] = self.timings.get(item, 0.0) + seconds
+
+    def _check_visited(self, schedule):
+        # check that all dependencies have been processed
+        for task in self.dependencies:
+            assert task in schedule.done
 
     def map(self, callback):
         """Sort and process dependencies."""
-        task_queue = multiprocessing.JoinableQueue()
-        finalized_tasks_queue = multiprocessing.JoinableQueue()
-        processes = []
+        executor = self.executor or ThreadPoolExecutor(self.parallelism)
+        schedule = _Schedule(self.dependencies)
+        futures = {}
+        try:
+            while schedule.is_active():
+                while schedule.ready and len(futures) < self.parallelism:
+                    item = schedule.ready.popleft()
+                    schedule.start(item)
+                    future = executor.submit(
+                        _run_callback, callback, item, self.with_follow_up
+                    )
+                    futures[future] = item
 
-        if self.with_follow_up:
-            followup_queue = multiprocessing.Queue()
-        else:
-            followup_queue = None
-
-        for _ in range(self.parallelism):
-            process = multiprocessing.Process(
-                target=self._worker,
-                args=(
-                    task_queue,
-                    finalized_tasks_queue,
-                    followup_queue,
-                    self.visited,
-                    callback,
-                ),
-                daemon=True,
-            )
-            process.start()
-            processes.append(process)
-
-        # pallel sorting and processing
-        ts = TopologicalSorter(self.dependencies)
-        ts.prepare()
-
-        while ts.is_active():
-            # queue task to process
-            for task in ts.get_ready():
-                task_queue.put(task)
-
-            # task done
-            task = finalized_tasks_queue.get()
-            ts.done(task)
-            finalized_tasks_queue.task_done()
-
-        task_queue.join()
-        finalized_tasks_queue.join()
-
-        # followup items cannot be added to the topological sorter after prepare() is called
-        # processing them here sequentially
-        if followup_queue:
-            while not followup_queue.empty():
-                follow_up_item = followup_queue.get()
-                callback(follow_up_item, followup_queue)
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    item = futures.pop(future)
+                    follow_ups, seconds = future.result()
+                    self._record(item, seconds)
+                    schedule.finish(item, follow_ups)
+        finally:
+            for future in futures:
+                future.cancel()
+            if self.executor is None:
+                executor.shutdown(wait=True, cancel_futures=True)
 
-        # check that all dependencies have been processed
-        for task, _ in self.visited.items():
-            assert self.visited[task]
+        self._check_visited(schedule)
+
+    async def map_async(self, callback):
+        """Sort and process dependencies with a coroutine function callback."""
+        schedule = _Schedule(self.dependencies)
+        tasks = {}
+
+        async def run(item):
+            follow_ups = _FollowUps() if self.with_follow_up else None
+            start = perf_counter()
+            await callback(item, follow_ups)
+            return (follow_ups.items if follow_ups else []), perf_counter() - start
+
+        try:
+            while schedule.is_active():
+                while schedule.ready and len(tasks) < self.parallelism:
+                    item = schedule.ready.popleft()
+                    schedule.start(item)
+                    tasks[asyncio.ensure_future(run(item))] = item
+
+                finished, _ = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in finished:
+                    item = tasks.pop(task)
+                    follow_ups, seconds = task.result()
+                    self._record(item, seconds)
+                    schedule.finish(item, follow_ups)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        self._check_visited(schedule)
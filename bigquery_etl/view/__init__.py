@@ -30,6 +30,11 @@ CREATE_VIEW_PATTERN = re.compile(
 )
 
 
+def normalize_view_query(sql):
+    """Return the view query without comments and surrounding whitespace."""
+    return sqlparse.format(sql, strip_comments=True).strip(";" + string.whitespace)
+
+
 @attr.s(auto_attribs=True)
 class View:
     """Representation of a SQL view stored in a view.sql file."""
@@ -237,15 +242,40 @@ class View:
             return self.view_identifier.replace(self.project, target_project, 1)
         return self.view_identifier
 
-    def has_changes(self, target_project=None):
-        """Determine whether there are any changes that would be published."""
+    def is_skipped_for_publish(self, target_project=None):
+        """Return whether publishing this view would be skipped."""
         if any(str(self.path).endswith(p) for p in self.skip_publish()):
-            return False
+            return True
 
-        if target_project and self.project != ConfigLoader.get(
+        # view would be skipped if --target-project is set
+        return bool(target_project) and self.project != ConfigLoader.get(
             "default", "project", fallback="moz-fx-data-shared-prod"
-        ):
-            # view would be skipped because --target-project is set
+        )
+
+    @property
+    def expected_view_query(self):
+        """Return the normalized query that the deployed view is expected to have."""
+        return CREATE_VIEW_PATTERN.sub(
+            "", sqlparse.format(self.content, strip_comments=True), count=1
+        ).strip(";" + string.whitespace)
+
+    def has_schema_changes(self, table):
+        """Determine whether the schema of the deployed view table differs."""
+        schema_file = Path(self.path).parent / "schema.yaml"
+        if schema_file.is_file():
+            view_schema = Schema.from_schema_file(schema_file)
+            table_schema = Schema.from_json(
+                {"fields": [f.to_api_repr() for f in table.schema]}
+            )
+            return not view_schema.equal(table_schema)
+        return False
+
+    def has_changes(self, target_project=None):
+        """Determine whether there are any changes that would be published.
+
+        See `bigquery_etl.view.diff.ViewDiff` for detecting changes of many views.
+        """
+        if self.is_skipped_for_publish(target_project):
             return False
 
         client = bigquery.Client()
@@ -256,26 +286,14 @@ class View:
             print(f"view {target_view_id} will change: does not exist in BigQuery")
             return True
 
-        expected_view_query = CREATE_VIEW_PATTERN.sub(
-            "", sqlparse.format(self.content, strip_comments=True), count=1
-        ).strip(";" + string.whitespace)
-        actual_view_query = sqlparse.format(
-            table.view_query, strip_comments=True
-        ).strip(";" + string.whitespace)
-        if expected_view_query != actual_view_query:
+        if self.expected_view_query != normalize_view_query(table.view_query):
             print(f"view {target_view_id} will change: query does not match")
             return True
 
         # check schema
-        schema_file = Path(self.path).parent / "schema.yaml"
-        if schema_file.is_file():
-            view_schema = Schema.from_schema_file(schema_file)
-            table_schema = Schema.from_json(
-                {"fields": [f.to_api_repr() for f in table.schema]}
-            )
-            if not view_schema.equal(table_schema):
-                print(f"view {target_view_id} will change: schema does not match")
-                return True
+        if self.has_schema_changes(table):
+            print(f"view {target_view_id} will change: schema does not match")
+            return True
 
         # check metadata
         if self.metadata is not None:
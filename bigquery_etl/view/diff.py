@@ -0,0 +1,201 @@
+"""Detect changes of many views with a few BigQuery requests per dataset."""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import attr
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+
+from bigquery_etl.util.cache import content_hash
+from bigquery_etl.view import View, normalize_view_query
+
+# string literal as used in INFORMATION_SCHEMA.TABLE_OPTIONS option values
+_STRING_LITERAL = r'"((?:[^"\\]|\\.)*)"'
+_STRING_OPTION = re.compile(_STRING_LITERAL, re.DOTALL)
+_LABELS_OPTION = re.compile(
+    rf"\[\s*(?:STRUCT\(\s*{_STRING_LITERAL}\s*,\s*{_STRING_LITERAL}\s*\)\s*,?\s*)*\]",
+    re.DOTALL,
+)
+_LABEL = re.compile(
+    rf"STRUCT\(\s*{_STRING_LITERAL}\s*,\s*{_STRING_LITERAL}\s*\)", re.DOTALL
+)
+_ESCAPE_SEQUENCE = re.compile(
+    r"\\(x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|[0-7]{3}|.)", re.DOTALL
+)
+_SIMPLE_ESCAPES = {
+    "a": "\a",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+}
+
+
+def _unescape(match):
+    escape = match.group(1)
+    if escape[0] in "xuU" and len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    if escape[0] in "01234567" and len(escape) == 3:
+        return chr(int(escape, 8))
+    return _SIMPLE_ESCAPES.get(escape, escape)
+
+
+def _parse_string(value: str) -> str:
+    """Parse a string literal option value, raising ValueError if invalid."""
+    match = _STRING_OPTION.fullmatch(value.strip())
+    if match is None:
+        raise ValueError(f"Unexpected string option value: {value}")
+    return _ESCAPE_SEQUENCE.sub(_unescape, match.group(1))
+
+
+def _parse_labels(value: str) -> Dict[str, str]:
+    """Parse a labels option value, raising ValueError if invalid."""
+    if _LABELS_OPTION.fullmatch(value.strip()) is None:
+        raise ValueError(f"Unexpected labels option value: {value}")
+    return {
+        _ESCAPE_SEQUENCE.sub(_unescape, key): _ESCAPE_SEQUENCE.sub(_unescape, label)
+        for key, label in _LABEL.findall(value)
+    }
+
+
+@attr.s(auto_attribs=True)
+class DeployedView:
+    """Properties of a deployed view that are compared with the local view."""
+
+    query_hash: str
+    description: Optional[str] = None
+    friendly_name: Optional[str] = None
+    labels: Dict[str, str] = attr.Factory(dict)
+    # whether description, friendly_name and labels could be read from options
+    options_parsed: bool = True
+
+
+class ViewDiff:
+    """Determine which views have changes that would be published.
+
+    Unlike `View.has_changes`, which gets every deployed view from the API, this
+    reads the queries and options of all deployed views in a dataset with one query
+    of INFORMATION_SCHEMA.VIEWS and one of INFORMATION_SCHEMA.TABLE_OPTIONS. Tables
+    are only fetched individually to compare schemas of views with a schema.yaml,
+    or if their options could not be parsed.
+    """
+
+    def __init__(self, client: Optional[bigquery.Client] = None):
+        """Initialize."""
+        self.client = client or bigquery.Client()
+        self._deployed_views: Dict[Tuple[str, str], Dict[str, DeployedView]] = {}
+
+    def deployed_views(self, project: str, dataset: str) -> Dict[str, DeployedView]:
+        """Return the deployed views in a dataset by name."""
+        key = (project, dataset)
+        if key not in self._deployed_views:
+            self._deployed_views[key] = self._fetch_deployed_views(project, dataset)
+        return self._deployed_views[key]
+
+    def _fetch_deployed_views(self, project, dataset):
+        try:
+            views = {
+                row.table_name: DeployedView(
+                    query_hash=content_hash(normalize_view_query(row.view_definition))
+                )
+                for row in self.client.query(
+                    "SELECT table_name, view_definition "
+                    f"FROM `{project}.{dataset}.INFORMATION_SCHEMA.VIEWS`"
+                ).result()
+            }
+        except NotFound:
+            # dataset does not exist yet
+            return {}
+
+        for row in self.client.query(
+            "SELECT table_name, option_name, option_value "
+            f"FROM `{project}.{dataset}.INFORMATION_SCHEMA.TABLE_OPTIONS` "
+            "WHERE option_name IN ('description', 'friendly_name', 'labels')"
+        ).result():
+            view = views.get(row.table_name)
+            if view is None:
+                continue
+            try:
+                if row.option_name == "labels":
+                    view.labels = _parse_labels(row.option_value)
+                elif row.option_name == "description":
+                    view.description = _parse_string(row.option_value)
+                else:
+                    view.friendly_name = _parse_string(row.option_value)
+            except ValueError:
+                view.options_parsed = False
+        return views
+
+    def has_changes(self, view: View, target_project: Optional[str] = None) -> bool:
+        """Determine whether there are any changes to view that would be published."""
+        if view.is_skipped_for_publish(target_project):
+            return False
+
+        target_view_id = view.target_view_identifier(target_project)
+        project, dataset, name = target_view_id.rsplit(".", 2)
+        deployed = self.deployed_views(project, dataset).get(name)
+        if deployed is None:
+            print(f"view {target_view_id} will change: does not exist in BigQuery")
+            return True
+
+        if content_hash(view.expected_view_query) != deployed.query_hash:
+            print(f"view {target_view_id} will change: query does not match")
+            return True
+
+        table = None
+        if not deployed.options_parsed:
+            table = self.client.get_table(target_view_id)
+            deployed = attr.evolve(
+                deployed,
+                description=table.description,
+                friendly_name=table.friendly_name,
+                labels=table.labels,
+            )
+
+        # check metadata
+        if view.metadata is not None:
+            if view.metadata.description != deployed.description:
+                print(f"view {target_view_id} will change: description does not match")
+                return True
+            if view.metadata.friendly_name != deployed.friendly_name:
+                print(
+                    f"view {target_view_id} will change: friendly_name does not match"
+                )
+                return True
+            if view.labels != deployed.labels:
+                print(f"view {target_view_id} will change: labels do not match")
+                return True
+
+        # check schema
+        if (Path(view.path).parent / "schema.yaml").is_file():
+            table = table or self.client.get_table(target_view_id)
+            if view.has_schema_changes(table):
+                print(f"view {target_view_id} will change: schema does not match")
+                return True
+
+        return False
+
+    def changes(
+        self,
+        views: Iterable[View],
+        target_project: Optional[str] = None,
+        parallelism: int = 8,
+    ) -> List[bool]:
+        """Return whether each of views has changes that would be published."""
+        views = list(views)
+        datasets = {
+            tuple(view.target_view_identifier(target_project).rsplit(".", 2)[:2])
+            for view in views
+            if not view.is_skipped_for_publish(target_project)
+        }
+        with ThreadPoolExecutor(parallelism) as executor:
+            # fetch each dataset once before comparing views concurrently
+            list(executor.map(lambda d: self.deployed_views(*d), sorted(datasets)))
+            return list(
+                executor.map(lambda v: self.has_changes(v, target_project), views)
+            )
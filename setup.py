@@ -30,6 +30,7 @@ setup(
     },
     include_package_data=True,
     install_requires=[
+        "aiohttp",
         "gcloud",
         "gcsfs",
         "google-cloud-bigquery",
@@ -1,12 +1,24 @@
-"""Generate and record schemas for user-facing derived dataset views."""
+"""Generate and record schemas for user-facing derived dataset views.
 
-from functools import partial
+Views of all datasets are processed in two stages: their table references and
+partition keys are determined by a single process pool, and the views are then
+dry run concurrently through the dry run service before schemas are written.
+"""
+
+import logging
+from multiprocessing.pool import ThreadPool
 from pathlib import Path
 
 import click
 from pathos.multiprocessing import ProcessingPool
 
+# imported at module level, so that forked workers start with these loaded
 from bigquery_etl.cli.utils import use_cloud_function_option
+from bigquery_etl.dependency import extract_table_references
+from bigquery_etl.dryrun import DryRun
+from bigquery_etl.metadata.parse_metadata import Metadata
+from bigquery_etl.schema import Schema
+from bigquery_etl.util.common import render
 
 NON_USER_FACING_DATASET_SUBSTRINGS = (
     "_derived",
@@ -16,104 +28,108 @@ NON_USER_FACING_DATASET_SUBSTRINGS = (
     "udf",
 )
 
+VIEW_FILE = "view.sql"
+METADATA_FILE = "metadata.yaml"
+SCHEMA_FILE = "schema.yaml"
 
-def _generate_view_schema(sql_dir, view_directory):
-    import logging
 
-    from bigquery_etl.dependency import extract_table_references
-    from bigquery_etl.metadata.parse_metadata import Metadata
-    from bigquery_etl.schema import Schema
-    from bigquery_etl.util.common import render
+# If the view references only one table, we can:
+# 1. Get the reference table partition key if it exists.
+#   (to dry run views to partitioned tables).
+# 2. Get the reference table schema and use it to enrich the
+#   view schema we get from dry-running.
+def _get_reference_dir_path(sql_dir, view_dir):
+    view_file = view_dir / VIEW_FILE
+    if not view_file.exists():
+        return
 
-    logging.basicConfig(format="%(levelname)s (%(filename)s:%(lineno)d) - %(message)s")
+    view_references = extract_table_references(render(view_file.name, view_dir))
+    if len(view_references) != 1:
+        return
 
-    VIEW_FILE = "view.sql"
-    METADATA_FILE = "metadata.yaml"
-    SCHEMA_FILE = "schema.yaml"
-
-    # If the view references only one table, we can:
-    # 1. Get the reference table partition key if it exists.
-    #   (to dry run views to partitioned tables).
-    # 2. Get the reference table schema and use it to enrich the
-    #   view schema we get from dry-running.
-    def _get_reference_dir_path(view_dir):
-        view_file = view_dir / VIEW_FILE
-        if not view_file.exists():
-            return
-
-        view_references = extract_table_references(render(view_file.name, view_dir))
-        if len(view_references) != 1:
-            return
-
-        target_project = view_dir.parent.parent.name
-        target_dataset = view_dir.parent.name
-
-        target_reference = view_references[0]
-        parts = target_reference.split(".")
-        if len(parts) == 3:
-            reference_project_id, reference_dataset_id, reference_table_id = parts
-        # Fully qualify the reference:
-        elif len(parts) == 2:
-            reference_project_id = target_project
-            reference_dataset_id, reference_table_id = parts
-        elif len(parts) == 1:
-            reference_project_id = target_project
-            reference_dataset_id = target_dataset
-            reference_table_id = parts[0]
-        else:
-            return
-
-        return (
-            sql_dir / reference_project_id / reference_dataset_id / reference_table_id
+    target_project = view_dir.parent.parent.name
+    target_dataset = view_dir.parent.name
+
+    target_reference = view_references[0]
+    parts = target_reference.split(".")
+    if len(parts) == 3:
+        reference_project_id, reference_dataset_id, reference_table_id = parts
+    # Fully qualify the reference:
+    elif len(parts) == 2:
+        reference_project_id = target_project
+        reference_dataset_id, reference_table_id = parts
+    elif len(parts) == 1:
+        reference_project_id = target_project
+        reference_dataset_id = target_dataset
+        reference_table_id = parts[0]
+    else:
+        return
+
+    return sql_dir / reference_project_id / reference_dataset_id / reference_table_id
+
+
+def _get_reference_partition_key(ref_path):
+    if ref_path is None:
+        logging.debug("No table reference, skipping partition key.")
+        return
+
+    try:
+        reference_metadata = Metadata.from_file(ref_path / METADATA_FILE)
+    except Exception as metadata_exception:
+        logging.warning(f"Unable to get reference metadata: {metadata_exception}")
+        return
+
+    bigquery_metadata = reference_metadata.bigquery
+    if bigquery_metadata is None:
+        logging.warning(
+            f"No bigquery metadata at {ref_path}, unable to get partition key."
+        )
+        return
+
+    partition_metadata = bigquery_metadata.time_partitioning
+    if partition_metadata is None:
+        logging.warning(
+            f"No partition metadata at {ref_path}, unable to get partition key."
         )
+        return
 
-    def _get_reference_partition_key(ref_path):
-        if ref_path is None:
-            logging.debug("No table reference, skipping partition key.")
-            return
+    return partition_metadata.field
 
-        try:
-            reference_metadata = Metadata.from_file(ref_path / METADATA_FILE)
-        except Exception as metadata_exception:
-            logging.warning(f"Unable to get reference metadata: {metadata_exception}")
-            return
-
-        bigquery_metadata = reference_metadata.bigquery
-        if bigquery_metadata is None:
-            logging.warning(
-                f"No bigquery metadata at {ref_path}, unable to get partition key."
-            )
-            return
 
-        partition_metadata = bigquery_metadata.time_partitioning
-        if partition_metadata is None:
-            logging.warning(
-                f"No partition metadata at {ref_path}, unable to get partition key."
-            )
-            return
+def _view_reference(sql_dir, view_directory):
+    """Return the view's reference path and partition key.
 
-        return partition_metadata.field
+    Return None if no schema should be written for the view.
+    """
+    logging.basicConfig(format="%(levelname)s (%(filename)s:%(lineno)d) - %(message)s")
 
-    reference_path = _get_reference_dir_path(view_directory)
+    reference_path = _get_reference_dir_path(sql_dir, view_directory)
 
     # If this is a view to a stable table, don't try to write the schema:
     if reference_path is not None:
         reference_dataset = reference_path.parent.name
         if reference_dataset.endswith("_stable"):
-            return
+            return None
 
     # Optionally get the upstream partition key
     reference_partition_key = _get_reference_partition_key(reference_path)
     if reference_partition_key is None:
         logging.debug("No reference partition key, dry running without one.")
 
+    return reference_path, reference_partition_key
+
+
+def _write_view_schema(view_directory, reference_path, dry_run):
     project_id = view_directory.parent.parent.name
     dataset_id = view_directory.parent.name
     view_id = view_directory.name
 
-    schema = Schema.for_table(
-        project_id, dataset_id, view_id, partitioned_by=reference_partition_key
-    )
+    try:
+        schema = Schema(dry_run.get_schema())
+    except Exception as e:
+        print(f"Cannot get schema for {project_id}.{dataset_id}.{view_id}: {e}")
+        schema = Schema.empty()
+
     if len(schema.schema.get("fields")) == 0:
         logging.warning(
             f"Got empty schema for {project_id}.{dataset_id}.{view_id} potentially "
@@ -177,14 +193,47 @@ def generate(target_project, output_dir, parallelism, use_cloud_function):
         )
     ]
 
-    for dataset_path in dataset_paths:
-        view_directories = [path for path in dataset_path.iterdir() if path.is_dir()]
+    # a single queue of the views of all datasets, so that datasets are not
+    # processed one after another
+    view_directories = [
+        path
+        for dataset_path in dataset_paths
+        for path in dataset_path.iterdir()
+        if path.is_dir()
+    ]
 
-        with ProcessingPool(parallelism) as pool:
-            pool.map(
-                partial(
-                    _generate_view_schema,
-                    Path(output_dir),
-                ),
-                view_directories,
-            )
+    with ProcessingPool(parallelism) as pool:
+        references = pool.map(
+            _view_reference,
+            [Path(output_dir)] * len(view_directories),
+            view_directories,
+        )
+
+    views = [
+        (view_directory, reference[0], reference[1])
+        for view_directory, reference in zip(view_directories, references)
+        if reference is not None
+    ]
+    dry_runs = [
+        Schema.table_dry_run(
+            view_directory.parent.parent.name,
+            view_directory.parent.name,
+            view_directory.name,
+            partitioned_by=reference_partition_key,
+            use_cloud_function=use_cloud_function,
+        )
+        for view_directory, _, reference_partition_key in views
+    ]
+    # dry runs through the dry run service share one session, other dry runs
+    # are sent from a thread each
+    DryRun.prefetch(dry_runs, concurrency=parallelism)
+
+    with ThreadPool(parallelism) as pool:
+        pool.starmap(
+            _write_view_schema,
+            [
+                (view_directory, reference_path, dry_run)
+                for (view_directory, reference_path, _), dry_run in zip(views, dry_runs)
+            ],
+            chunksize=1,
+        )
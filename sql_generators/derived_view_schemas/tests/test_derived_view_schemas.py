@@ -0,0 +1,97 @@
+from unittest import mock
+
+import yaml
+from click.testing import CliRunner
+
+from bigquery_etl.dryrun import DryRun
+from sql_generators.derived_view_schemas import generate
+
+SCHEMA = {
+    "fields": [
+        {"name": "submission_date", "type": "DATE", "mode": "NULLABLE"},
+        {"name": "client_id", "type": "STRING", "mode": "NULLABLE"},
+    ]
+}
+
+
+def _prefetch(dry_runs, concurrency):
+    for dry_run in dry_runs:
+        vars(dry_run)["dry_run_result"] = {"valid": True, "schema": SCHEMA}
+
+
+class TestDerivedViewSchemas:
+    @mock.patch.object(DryRun, "prefetch", side_effect=_prefetch)
+    def test_generate(self, prefetch, tmp_path):
+        project_dir = tmp_path / "sql" / "moz-fx-data-test-project"
+        for dataset in ("telemetry", "search", "telemetry_derived"):
+            (project_dir / dataset / "clients").mkdir(parents=True)
+            (project_dir / dataset / "clients" / "view.sql").write_text(
+                "SELECT * FROM `moz-fx-data-test-project.telemetry_derived.clients_v1`"
+            )
+        (project_dir / "telemetry" / "events").mkdir()
+        (project_dir / "telemetry" / "events" / "view.sql").write_text(
+            "SELECT * FROM `moz-fx-data-test-project.telemetry_stable.events_v1`"
+        )
+        reference_dir = project_dir / "telemetry_derived" / "clients_v1"
+        reference_dir.mkdir()
+        (reference_dir / "metadata.yaml").write_text(
+            yaml.dump(
+                {
+                    "friendly_name": "Clients",
+                    "description": "Clients",
+                    "owners": ["test@example.org"],
+                    "bigquery": {
+                        "time_partitioning": {
+                            "type": "day",
+                            "field": "submission_date",
+                            "require_partition_filter": True,
+                        }
+                    },
+                }
+            )
+        )
+        (reference_dir / "schema.yaml").write_text(
+            yaml.dump(
+                {
+                    "fields": [
+                        {
+                            "name": "client_id",
+                            "type": "STRING",
+                            "mode": "NULLABLE",
+                            "description": "Client ID",
+                        }
+                    ]
+                }
+            )
+        )
+
+        result = CliRunner().invoke(
+            generate,
+            [
+                "--target-project=moz-fx-data-test-project",
+                f"--output-dir={tmp_path / 'sql'}",
+                "--parallelism=2",
+            ],
+        )
+        assert result.exit_code == 0, result.output
+
+        # views of all user-facing datasets are dry run at once
+        prefetch.assert_called_once()
+        (dry_runs,) = prefetch.call_args.args
+        assert sorted(dry_run.content for dry_run in dry_runs) == [
+            "SELECT * FROM `moz-fx-data-test-project.search.clients` "
+            "WHERE DATE(`submission_date`) = DATE('2020-01-01')",
+            "SELECT * FROM `moz-fx-data-test-project.telemetry.clients` "
+            "WHERE DATE(`submission_date`) = DATE('2020-01-01')",
+        ]
+
+        schema = yaml.safe_load(
+            (project_dir / "telemetry" / "clients" / "schema.yaml").read_text()
+        )
+        assert schema["fields"][1]["description"] == "Client ID"
+        assert (project_dir / "search" / "clients" / "schema.yaml").exists()
+        # views of stable tables and non-user-facing datasets are skipped
+        assert not (project_dir / "telemetry" / "events" / "schema.yaml").exists()
+        assert not (
+            project_dir / "telemetry_derived" / "clients" / "schema.yaml"
+        ).exists()
@@ -11,8 +11,10 @@ import requests
 from jinja2 import Environment, FileSystemLoader, TemplateNotFound
 
 from bigquery_etl.config import ConfigLoader
+from bigquery_etl.dependency import extract_table_references
 from bigquery_etl.dryrun import DryRun
 from bigquery_etl.schema.stable_table_schema import get_stable_table_schemas
+from bigquery_etl.table_catalog import default_catalog
 from bigquery_etl.util.common import get_table_dir, render, write_sql
 
 APP_LISTINGS_URL = "https://probeinfo.telemetry.mozilla.org/v2/glean/app-listings"
@@ -105,7 +107,19 @@ def table_names_from_baseline(baseline_table, include_project_id=True):
 
 
 def referenced_table_exists(view_sql):
-    """Dry run the given view SQL to see if its referent exists."""
+    """Check whether the tables referenced by the given view SQL exist.
+
+    Tables in the table catalog snapshot exist; otherwise the view SQL is
+    dry run to see if its referent exists.
+    """
+    try:
+        references = extract_table_references(view_sql)
+    except Exception:
+        references = []
+    catalog = default_catalog()
+    if references and all(catalog.contains(table) for table in references):
+        return True
+
     dryrun = DryRun("foo/bar/view.sql", content=view_sql)
     # 403 is returned if referenced dataset doesn't exist; we need to check that the 403 is due to dataset not existing
     # since dryruns on views will also return 403 due to the table CREATE
@@ -329,7 +329,7 @@ def generate(target_project, output_dir, log_level, parallelism, use_cloud_funct
     document type in parallel.
 
     There is a performance bottleneck here due to the need to dry-run each
-    view to ensure the source table actually exists.
+    view to get its schema with descriptions.
     """
     # set log level
     logging.basicConfig(level=log_level, format="%(levelname)s %(message)s")
@@ -0,0 +1,195 @@
+from datetime import date
+from unittest import mock
+
+import pytest
+from google.api_core.exceptions import BadRequest
+
+from bigquery_etl.backfill.executor import BackfillExecutor, partition_id
+from bigquery_etl.metadata.parse_metadata import PartitionType
+
+DATES = [date(2023, 1, 1), date(2023, 1, 2), date(2023, 1, 3)]
+
+
+class FakeJob:
+    def __init__(self, query, job_config, fail):
+        self.query = query
+        self.job_config = job_config
+        self.polls = 0
+        self.finished = False
+        self.error_result = {"message": "failed"} if fail else None
+        self.total_bytes_processed = 10
+
+    def done(self):
+        self.polls += 1
+        self.finished = self.polls > 1
+        return self.finished
+
+
+class FakeClient:
+    def __init__(self, fail_dates=()):
+        self.jobs = []
+        self.fail_dates = fail_dates
+        # maximum number of jobs that were running at the same time
+        self.max_running = 0
+
+    def query(self, query, job_config, project):
+        backfill_date = job_config.query_parameters[0].value
+        job = FakeJob(query, job_config, backfill_date in self.fail_dates)
+        self.jobs.append(job)
+        running = [job for job in self.jobs if not job.finished]
+        self.max_running = max(self.max_running, len(running))
+        return job
+
+
+@pytest.fixture
+def query_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("BQETL_CACHE_DIR", str(tmp_path / "cache"))
+    query_dir = tmp_path / "sql" / "moz-fx-data-test-project" / "test" / "table_v1"
+    query_dir.mkdir(parents=True)
+    query_file = query_dir / "query.sql"
+    query_file.write_text("SELECT {{ 1 + 1 }} AS two, @submission_date AS d")
+    return query_file
+
+
+class TestBackfillExecutor:
+    def test_partition_id(self):
+        assert partition_id(PartitionType.DAY, date(2023, 2, 14)) == "20230214"
+        assert partition_id(PartitionType.MONTH, date(2023, 2, 1)) == "202302"
+
+    def test_run(self, query_file):
+        client = FakeClient()
+        executor = BackfillExecutor(
+            client, query_file, "moz-fx-data-test-project", poll_interval=0
+        )
+        assert executor.run(DATES, exclude=["2023-01-02"])
+
+        assert len(client.jobs) == 2
+        job = client.jobs[0]
+        assert job.query == "SELECT 2 AS two, @submission_date AS d"
+        assert job.job_config.destination.table_id == "table_v1$20230101"
+        assert job.job_config.write_disposition == "WRITE_TRUNCATE"
+        assert job.job_config.default_dataset.dataset_id == "test"
+        assert client.jobs[1].job_config.destination.table_id == "table_v1$20230103"
+        assert not executor.checkpoint_file.exists()
+
+    def test_max_in_flight(self, query_file):
+        client = FakeClient()
+        executor = BackfillExecutor(
+            client,
+            query_file,
+            "moz-fx-data-test-project",
+            max_in_flight=2,
+            poll_interval=0,
+        )
+        assert executor.run(DATES)
+        assert len(client.jobs) == 3
+        assert client.max_running == 2
+
+    def test_depends_on_past(self, query_file):
+        client = FakeClient(fail_dates=[date(2023, 1, 2)])
+        executor = BackfillExecutor(
+            client,
+            query_file,
+            "moz-fx-data-test-project",
+            depends_on_past=True,
+            poll_interval=0,
+        )
+        assert not executor.run(DATES)
+        # dates after the failed date are not backfilled
+        assert [job.job_config.query_parameters[0].value for job in client.jobs] == [
+            date(2023, 1, 1),
+            date(2023, 1, 2),
+        ]
+        assert client.max_running == 1
+
+    def test_invalid_destination_table(self, query_file):
+        with pytest.raises(ValueError):
+            BackfillExecutor(
+                FakeClient(),
+                query_file,
+                "moz-fx-data-test-project",
+                destination_table="table_v1",
+            )
+
+    def test_submit_error(self, query_file):
+        client = FakeClient()
+
+        def invalid_query(query, job_config, project):
+            raise BadRequest("Syntax error")
+
+        client.query = invalid_query
+        executor = BackfillExecutor(
+            client,
+            query_file,
+            "moz-fx-data-test-project",
+            dry_run=True,
+            poll_interval=0,
+        )
+        assert not executor.run(DATES)
+
+    def test_no_resume_by_default(self, query_file):
+        executor = BackfillExecutor(
+            FakeClient(fail_dates=[date(2023, 1, 2)]),
+            query_file,
+            "moz-fx-data-test-project",
+            poll_interval=0,
+        )
+        assert not executor.run(DATES)
+
+        client = FakeClient()
+        executor.client = client
+        assert executor.run(DATES)
+        assert len(client.jobs) == 3
+
+    def test_resume(self, query_file):
+        executor = BackfillExecutor(
+            FakeClient(fail_dates=[date(2023, 1, 2)]),
+            query_file,
+            "moz-fx-data-test-project",
+            resume=True,
+            poll_interval=0,
+        )
+        assert not executor.run(DATES)
+        assert executor.checkpoint_file.exists()
+
+        client = FakeClient()
+        executor.client = client
+        assert executor.run(DATES)
+        assert len(client.jobs) == 1
+        assert client.jobs[0].job_config.query_parameters[0].value == date(2023, 1, 2)
+        assert not executor.checkpoint_file.exists()
+
+    def test_checks(self, query_file):
+        client = FakeClient()
+        checks = mock.Mock(return_value=["SELECT 1", "SELECT 2", ""])
+        executor = BackfillExecutor(
+            client,
+            query_file,
+            "moz-fx-data-test-project",
+            checks=checks,
+            poll_interval=0,
+        )
+        assert executor.run(DATES[:1])
+        checks.assert_called_once_with(date(2023, 1, 1))
+        assert [job.query for job in client.jobs[1:]] == ["SELECT 1", "SELECT 2"]
+
+    def test_failed_checks(self, query_file):
+        client = FakeClient()
+        executor = BackfillExecutor(
+            client,
+            query_file,
+            "moz-fx-data-test-project",
+            checks=lambda _: ["SELECT ERROR('ETL Data Check Failed')"],
+            poll_interval=0,
+        )
+        query = client.query
+
+        def fail_checks(sql, job_config, project):
+            job = query(sql, job_config, project)
+            if "ERROR" in sql:
+                job.error_result = {"message": "ETL Data Check Failed"}
+            return job
+
+        client.query = fail_checks
+        assert not executor.run(DATES[:1])
+        assert not executor.checkpoint_file.exists()
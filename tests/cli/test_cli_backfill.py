@@ -1,12 +1,14 @@
+import json
 import os
 from datetime import date, timedelta
 from pathlib import Path
+from unittest import mock
 from unittest.mock import patch
 
 import pytest
 import yaml
 from click.testing import CliRunner
-from google.api_core.exceptions import NotFound
+from google.api_core.exceptions import BadRequest, InternalServerError, NotFound
 
 from bigquery_etl.backfill.parse import (
     BACKFILL_FILE,
@@ -25,7 +27,13 @@ from bigquery_etl.backfill.utils import (
     qualified_table_name_matching,
     validate_metadata_workgroups,
 )
-from bigquery_etl.cli.backfill import create, info, scheduled, validate
+from bigquery_etl.cli.backfill import (
+    _swap_partitions,
+    create,
+    info,
+    scheduled,
+    validate,
+)
 
 DEFAULT_STATUS = BackfillStatus.DRAFTING
 VALID_REASON = "test_reason"
@@ -1822,3 +1830,56 @@ class TestBackfill:
                 in result.output
             )
             assert Path("tmp.json").exists()
+
+    @patch("bigquery_etl.cli.backfill.COPY_RETRY_DELAY_SECONDS", 0)
+    def test_swap_partitions(self, tmp_path):
+        client = mock.Mock()
+        attempts = []
+
+        def copy_table(source, destination, job_config):
+            attempts.append(destination)
+            job = mock.Mock()
+            if destination.endswith("$20210102") and attempts.count(destination) == 1:
+                job.result.side_effect = InternalServerError("transient")
+            return job
+
+        client.copy_table.side_effect = copy_table
+        checkpoint_file = tmp_path / "checkpoint.json"
+        checkpoint = {"backup": "backup_table", "swapped": ["2021-01-01"]}
+        dates = [date(2021, 1, 1), date(2021, 1, 2), date(2021, 1, 3)]
+
+        _swap_partitions(
+            client, "staging", "production", dates, 2, checkpoint_file, checkpoint
+        )
+
+        # swapped partitions are skipped, failed copies are retried
+        assert sorted(attempts) == [
+            "production$20210102",
+            "production$20210102",
+            "production$20210103",
+        ]
+        assert json.loads(checkpoint_file.read_text())["swapped"] == [
+            "2021-01-01",
+            "2021-01-02",
+            "2021-01-03",
+        ]
+
+    @patch("bigquery_etl.cli.backfill.COPY_RETRY_DELAY_SECONDS", 0)
+    def test_swap_partitions_failed(self, tmp_path):
+        client = mock.Mock()
+        client.copy_table.return_value.result.side_effect = BadRequest("invalid")
+        checkpoint_file = tmp_path / "checkpoint.json"
+
+        with pytest.raises(SystemExit):
+            _swap_partitions(
+                client,
+                "staging",
+                "production",
+                [date(2021, 1, 1)],
+                2,
+                checkpoint_file,
+                {"backup": "backup_table", "swapped": []},
+            )
+        # errors that are not transient are not retried
+        assert client.copy_table.call_count == 1
+        assert not checkpoint_file.exists()
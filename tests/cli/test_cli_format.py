@@ -1,4 +1,5 @@
 import os
+from unittest import mock
 
 import pytest
 from click.testing import CliRunner
@@ -33,3 +34,48 @@ class TestFormat:
             result = runner.invoke(sql_format, ["test"])
             assert "2 files reformatted." in result.output
             assert result.exit_code == 0
+
+    def test_format_parallel(self, runner):
+        with runner.isolated_filesystem():
+            os.mkdir("test")
+            for name in ("foo", "bar", "baz"):
+                with open(f"test/{name}.sql", "w") as f:
+                    f.write("SELECT 1 FROM test")
+            with open("test/qux.sql", "w") as f:
+                f.write("SELECT\n  1\nFROM\n  test\n")
+
+            result = runner.invoke(sql_format, ["--check", "--parallelism=2", "test"])
+            assert "3 files would be reformatted, 1 file would be left unchanged." in (
+                result.output
+            )
+            assert result.exit_code == 1
+
+            result = runner.invoke(sql_format, ["--parallelism=2", "test"])
+            assert "3 files reformatted, 1 file left unchanged." in result.output
+            assert result.exit_code == 0
+
+            with open("test/foo.sql") as f:
+                assert f.read() == "SELECT\n  1\nFROM\n  test\n"
+
+    def test_format_use_cache(self, runner, monkeypatch):
+        with runner.isolated_filesystem():
+            monkeypatch.setenv("BQETL_CACHE_DIR", os.path.abspath("cache"))
+            os.mkdir("test")
+            with open("test/foo.sql", "w") as f:
+                f.write("SELECT 1 FROM test")
+            with open("test/bar.sql", "w") as f:
+                f.write("SELECT\n  1\nFROM\n  test\n")
+
+            result = runner.invoke(sql_format, ["--check", "--use-cache", "test"])
+            assert result.exit_code == 1
+            assert len(os.listdir("cache/format")) == 1
+
+            with mock.patch(
+                "bigquery_etl.format_sql.format.reformat", side_effect=AssertionError
+            ):
+                # bar.sql is known to be formatted, so it is not reformatted again
+                result = runner.invoke(
+                    sql_format, ["--check", "--use-cache", "test/bar.sql"]
+                )
+            assert "1 file would be left unchanged." in result.output
+            assert result.exit_code == 0
@@ -0,0 +1,66 @@
+import os
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from bigquery_etl.cli.view import publish
+
+PROJECT = "moz-fx-data-test-project"
+
+
+def _write_view(name, sql):
+    os.makedirs(f"sql/{PROJECT}/test/{name}")
+    with open(f"sql/{PROJECT}/test/{name}/view.sql", "w") as f:
+        f.write(f"CREATE OR REPLACE VIEW `{PROJECT}.test.{name}` AS {sql}")
+
+
+class TestPublish:
+    @pytest.fixture
+    def runner(self):
+        return CliRunner()
+
+    def _write_views(self):
+        _write_view("base", "SELECT 1 AS a")
+        _write_view("first", f"SELECT * FROM `{PROJECT}.test.base`")
+        _write_view("second", f"SELECT * FROM `{PROJECT}.test.base`")
+        _write_view(
+            "combined",
+            f"SELECT * FROM `{PROJECT}.test.first` "
+            f"JOIN `{PROJECT}.test.second` USING (a)",
+        )
+
+    def test_publish_in_dependency_order(self, runner):
+        published = []
+
+        def _publish(view, target_project=None, dry_run=False):
+            published.append(view.name)
+            return True
+
+        with runner.isolated_filesystem():
+            self._write_views()
+            with patch("bigquery_etl.view.View.publish", _publish):
+                result = runner.invoke(
+                    publish, ["--sql-dir=sql", "--force", "--parallelism=4"]
+                )
+
+        assert result.exit_code == 0
+        assert sorted(published) == ["base", "combined", "first", "second"]
+        assert published[0] == "base"
+        assert published[-1] == "combined"
+
+    def test_publish_failure(self, runner):
+        def _publish(view, target_project=None, dry_run=False):
+            if view.name == "first":
+                raise Exception("failed")
+            return True
+
+        with runner.isolated_filesystem():
+            self._write_views()
+            with patch("bigquery_etl.view.View.publish", _publish):
+                result = runner.invoke(
+                    publish, ["--sql-dir=sql", "--force", "--parallelism=4"]
+                )
+
+        assert result.exit_code == 1
+        assert f"Failed to publish view: {PROJECT}.test.first" in result.output
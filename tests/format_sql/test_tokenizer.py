@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+from bigquery_etl.format_sql.tokenizer import (
+    ClosingBracket,
+    Identifier,
+    Literal,
+    OpeningBracket,
+    Operator,
+    tokenize,
+    tokenize_sequential,
+)
+
+TEST_DIR = Path(__file__).parent
+
+
+def _tokens(tokenizer, query):
+    return [(type(token), token.value) for token in tokenizer(query)]
+
+
+class TestTokenizer:
+    @pytest.mark.parametrize(
+        "path",
+        sorted(TEST_DIR.glob("*/*.sql")),
+        ids=lambda path: f"{path.parent.name}/{path.name}",
+    )
+    def test_matches_sequential(self, path):
+        query = path.read_text()
+        assert _tokens(tokenize, query) == _tokens(tokenize_sequential, query)
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "SELECT a.select, b AS from FROM t AS end",
+            "SELECT ARRAY<STRUCT<a INT64, b ARRAY<STRING>>>[], 1 < 2, 3 >> 1",
+            "SELECT '''a\\'''b''', r\"\\\\\", b'\\x00', \"\"\"\n\"\"\"",
+            "CASE WHEN x THEN 1 ELSE 2 END; IF x THEN SELECT 1; ELSE SELECT 2; END IF",
+            "{% if x %}SELECT {{ y }}{# z #}{% else %}SELECT 1{% endif %}",
+        ],
+    )
+    def test_stateful_matches(self, query):
+        assert _tokens(tokenize, query) == _tokens(tokenize_sequential, query)
+
+    def test_angle_brackets(self):
+        types = [type(token) for token in tokenize("a<b")]
+        assert types == [Identifier, Operator, Identifier]
+        types = [type(token) for token in tokenize("ARRAY<INT64>")]
+        assert types[1:] == [OpeningBracket, Identifier, ClosingBracket]
+
+    def test_backreference(self):
+        tokens = list(tokenize("SELECT 'a\"b', \"c'd\""))
+        assert [token.value for token in tokens if isinstance(token, Literal)] == [
+            "'a\"b'",
+            '"c\'d"',
+        ]
+
+    def test_invalid_token(self):
+        with pytest.raises(ValueError, match="Could not determine next token"):
+            list(tokenize("SELECT 1", token_priority=[Identifier]))
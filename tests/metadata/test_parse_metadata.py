@@ -5,6 +5,7 @@ import pytest
 from bigquery_etl.metadata.parse_metadata import (
     DatasetMetadata,
     Metadata,
+    MetadataCatalog,
     PartitionType,
 )
 
@@ -211,3 +212,73 @@ class TestParseMetadata(object):
             metadata.default_table_workgroup_access[0]["role"]
             == "roles/bigquery.dataViewer"
         )
+
+    def test_from_file_returns_copies(self):
+        metadata_file = TEST_DIR / "data" / "metadata.yaml"
+        metadata = Metadata.from_file(metadata_file)
+        metadata.labels["changed"] = "true"
+        metadata.owners.append("test3@example.com")
+
+        metadata = Metadata.from_file(metadata_file)
+        assert "changed" not in metadata.labels
+        assert "test3@example.com" not in metadata.owners
+
+
+class TestMetadataCatalog:
+    def _write_metadata(self, path, owner, dag_name=None, public_json=False):
+        path.mkdir(parents=True, exist_ok=True)
+        metadata = Metadata(
+            friendly_name="Test",
+            description="Test",
+            owners=[owner],
+            labels={"public_json": ""} if public_json else {},
+            scheduling={"dag_name": dag_name} if dag_name else {},
+        )
+        metadata.write(path / "metadata.yaml")
+
+    def test_catalog(self, tmp_path):
+        project_dir = tmp_path / "sql" / "moz-fx-data-test-project"
+        self._write_metadata(
+            project_dir / "test" / "a_v1", "a@example.com", "bqetl_test", True
+        )
+        self._write_metadata(project_dir / "test" / "b_v1", "b@example.com")
+        (project_dir / "test" / "no_metadata").mkdir()
+        DatasetMetadata("Test", "Test", "derived").write(
+            project_dir / "test" / "dataset_metadata.yaml"
+        )
+
+        catalog = MetadataCatalog(tmp_path / "sql")
+        assert catalog.table_ids() == [
+            "moz-fx-data-test-project.test.a_v1",
+            "moz-fx-data-test-project.test.b_v1",
+        ]
+        assert catalog.dataset_ids() == ["moz-fx-data-test-project.test"]
+        assert catalog.dataset("moz-fx-data-test-project.test").friendly_name == "Test"
+        assert catalog.scheduled_in("bqetl_test") == [
+            "moz-fx-data-test-project.test.a_v1"
+        ]
+        assert catalog.public_json() == ["moz-fx-data-test-project.test.a_v1"]
+        assert catalog.owned_by("b@example.com") == [
+            "moz-fx-data-test-project.test.b_v1"
+        ]
+
+        # changed files are parsed again
+        self._write_metadata(
+            project_dir / "test" / "b_v1", "b@example.com", "bqetl_test"
+        )
+        assert catalog.scheduled_in("bqetl_test") == [
+            "moz-fx-data-test-project.test.a_v1",
+            "moz-fx-data-test-project.test.b_v1",
+        ]
+
+        # new files are indexed on refresh
+        self._write_metadata(project_dir / "test" / "c_v1", "b@example.com")
+        assert len(catalog.owned_by("b@example.com")) == 1
+        catalog.refresh()
+        assert len(catalog.owned_by("b@example.com")) == 2
+
+    def test_table_returns_copies(self):
+        catalog = MetadataCatalog(TEST_DIR / "data" / "test_sql")
+        table_id = "moz-fx-data-test-project.test.non_incremental_query_v1"
+        catalog.table(table_id).owners.append("changed@example.com")
+        assert "changed@example.com" not in catalog.table(table_id).owners
@@ -0,0 +1,81 @@
+from datetime import date
+
+import pytest
+from google.cloud import bigquery
+
+from bigquery_etl.pytest_plugin import local_sql
+from bigquery_etl.pytest_plugin.sql_test import TABLE_EXTENSIONS, Table, coerce_result
+
+duckdb = pytest.importorskip("duckdb")
+
+
+class TestLocalSql:
+    def test_transpile_query_parameters(self):
+        sql = local_sql.transpile(
+            "SELECT * FROM t WHERE submission_date = @submission_date",
+            [bigquery.ScalarQueryParameter("submission_date", "DATE", "2023-02-14")],
+        )
+        assert "@submission_date" not in sql
+        assert "CAST('2023-02-14' AS DATE)" in sql
+
+    def test_transpile_array_subscripts(self):
+        sql = local_sql.transpile(
+            "SELECT a[OFFSET(0)], a[SAFE_OFFSET(i)], a[ORDINAL(1)], a[2] FROM t"
+        )
+        assert sql == "SELECT a[1], a[(i) + 1], a[1], a[3] FROM t"
+
+    def test_transpile_unsupported(self):
+        with pytest.raises(local_sql.LocalEngineUnsupported):
+            local_sql.transpile("CREATE TEMP FUNCTION f() AS (1); SELECT f() AS one")
+        with pytest.raises(local_sql.LocalEngineUnsupported):
+            local_sql.transpile("SELECT @missing")
+        with pytest.raises(local_sql.LocalEngineUnsupported, match="DATE_TRUNC"):
+            local_sql.transpile("SELECT DATE_TRUNC(submission_date, MONTH) FROM t")
+
+    def test_duckdb_type(self):
+        field = bigquery.SchemaField(
+            "event",
+            "RECORD",
+            mode="REPEATED",
+            fields=[
+                bigquery.SchemaField("name", "STRING"),
+                bigquery.SchemaField("timestamp", "TIMESTAMP"),
+            ],
+        )
+        assert (
+            local_sql.duckdb_type(field)
+            == 'STRUCT("name" VARCHAR, "timestamp" TIMESTAMPTZ)[]'
+        )
+
+    def test_run_query(self, tmp_path):
+        test_dir = tmp_path / "project" / "dataset" / "table" / "test_query"
+        test_dir.mkdir(parents=True)
+        (test_dir / "events.yaml").write_text(
+            "- {submission_date: 2023-02-14, client_id: a, n: 1}\n"
+            "- {submission_date: 2023-02-14, client_id: a, n: 2}\n"
+            "- {submission_date: 2023-02-13, client_id: b, n: 4}\n"
+        )
+        (test_dir.parent / "events.schema.json").write_text(
+            '[{"name": "submission_date", "type": "DATE"},'
+            ' {"name": "client_id", "type": "STRING"},'
+            ' {"name": "n", "type": "INT64"}]'
+        )
+        table = Table("events", TABLE_EXTENSIONS["ndjson"], (str(test_dir), "events"))
+        rows = local_sql.run_query(
+            "SELECT submission_date, client_id, SUM(n) AS n FROM events "
+            "WHERE submission_date = @submission_date GROUP BY 1, 2",
+            [table],
+            {"events_view": "SELECT * FROM `{project}.{dataset}.events`"},
+            [
+                bigquery.ScalarQueryParameter(
+                    "submission_date", "DATE", date(2023, 2, 14)
+                )
+            ],
+        )
+        assert list(coerce_result(*rows)) == [
+            {"submission_date": "2023-02-14", "client_id": "a", "n": 3}
+        ]
+
+    def test_run_query_error(self):
+        with pytest.raises(local_sql.LocalEngineUnsupported):
+            local_sql.run_query("SELECT * FROM missing_table", [], {})
@@ -127,6 +127,57 @@ class TestDagCollection:
         assert task
         assert task.dag_name == "bqetl_test_dag"
 
+    def test_task_for_table_index_updated_with_tasks(self):
+        query_file = (
+            TEST_DIR
+            / "data"
+            / "test_sql"
+            / "moz-fx-data-test-project"
+            / "test"
+            / "incremental_query_v1"
+            / "query.sql"
+        )
+
+        metadata = Metadata(
+            "test",
+            "test",
+            ["test@example.org"],
+            {},
+            {"dag_name": "bqetl_test_dag", "depends_on_past": True},
+        )
+
+        dags = DagCollection.from_dict(
+            {
+                "bqetl_test_dag": {
+                    "schedule_interval": "daily",
+                    "default_args": self.default_args,
+                }
+            }
+        ).with_tasks([])
+
+        assert (
+            dags.task_for_table(
+                "moz-fx-data-test-project", "test", "incremental_query_v1"
+            )
+            is None
+        )
+
+        task = Task.of_query(query_file, metadata)
+        dags.with_tasks([task])
+
+        assert (
+            dags.task_for_table(
+                "moz-fx-data-test-project", "test", "incremental_query_v1"
+            )
+            is task
+        )
+        assert (
+            dags.fail_checks_task_for_table(
+                "moz-fx-data-test-project", "test", "incremental_query_v1"
+            )
+            is None
+        )
+
     def test_task_for_non_existing_table(self):
         dags = DagCollection.from_dict(
             {
@@ -266,6 +317,50 @@ class TestDagCollection:
         expected = (TEST_DIR / "data" / "dags" / "simple_test_dag").read_text().strip()
         assert result == expected
 
+    def test_to_airflow_incremental(self, tmp_path):
+        query_file = (
+            TEST_DIR
+            / "data"
+            / "test_sql"
+            / "moz-fx-data-test-project"
+            / "test"
+            / "non_incremental_query_v1"
+            / "query.sql"
+        )
+        output_dir = tmp_path / "dags"
+        output_dir.mkdir()
+
+        def dag_collection(argument):
+            metadata = Metadata(
+                "test",
+                "test",
+                ["test@example.com"],
+                {},
+                {"dag_name": "bqetl_test_dag", "arguments": [argument]},
+            )
+            return DagCollection.from_dict(
+                {
+                    "bqetl_test_dag": {
+                        "schedule_interval": "daily",
+                        "default_args": self.default_args,
+                    }
+                }
+            ).with_tasks([Task.of_query(query_file, metadata)])
+
+        generated = dag_collection("--a").to_airflow_dags(output_dir, incremental=True)
+        assert [dag.name for dag in generated] == ["bqetl_test_dag"]
+        assert (tmp_path / ".dags_fingerprints.json").exists()
+        assert dag_collection("--a").to_airflow_dags(output_dir, incremental=True) == []
+
+        generated = dag_collection("--b").to_airflow_dags(output_dir, incremental=True)
+        assert [dag.name for dag in generated] == ["bqetl_test_dag"]
+        assert "--b" in (output_dir / "bqetl_test_dag.py").read_text()
+
+        (output_dir / "bqetl_test_dag.py").unlink()
+        generated = dag_collection("--b").to_airflow_dags(output_dir, incremental=True)
+        assert [dag.name for dag in generated] == ["bqetl_test_dag"]
+        assert (output_dir / "bqetl_test_dag.py").exists()
+
     def test_python_script_to_airflow(self, tmp_path):
         query_file = (
             TEST_DIR
@@ -24,3 +24,41 @@ class TestGenerateAirflowDags(object):
 
         core_dag = dags.dag_by_name("bqetl_core")
         assert len(core_dag.tasks) == 3
+
+    def test_get_dags_parallel(self):
+        dags = gad.get_dags(None, self.dags_config, self.sql_dir, parallelism=1)
+        parallel_dags = gad.get_dags(
+            None, self.dags_config, self.sql_dir, parallelism=2
+        )
+
+        assert [dag.name for dag in dags.dags] == [
+            dag.name for dag in parallel_dags.dags
+        ]
+        for dag, parallel_dag in zip(dags.dags, parallel_dags.dags):
+            assert dag.tasks == parallel_dag.tasks
+
+    def test_get_dags_with_checks(self, tmp_path):
+        table_dir = tmp_path / "sql" / "moz-fx-data-test-project" / "test" / "table_v1"
+        table_dir.mkdir(parents=True)
+        (table_dir / "query.sql").write_text("SELECT 1")
+        (table_dir / "metadata.yaml").write_text(
+            "owners: [test@example.org]\nscheduling:\n  dag_name: bqetl_events\n"
+        )
+        (table_dir / "checks.sql").write_text(
+            "#fail\n{{ not_null(['a']) }}\n#warn\n{{ not_null(['b']) }}"
+        )
+
+        dags = gad.get_dags(None, self.dags_config, tmp_path / "sql", parallelism=1)
+
+        tasks = dags.dag_by_name("bqetl_events").tasks
+        assert [task.task_name for task in tasks] == [
+            "checks__fail_test__table__v1",
+            "checks__warn_test__table__v1",
+            "test__table__v1",
+        ]
+        for checks_task in tasks[:2]:
+            assert checks_task.is_dq_check
+            assert checks_task.owner == "test@example.org"
+            assert [ref.task_key for ref in checks_task.upstream_dependencies] == [
+                "bqetl_events.test__table__v1"
+            ]
@@ -302,3 +302,95 @@ END;"""
 
         routines = parse_routine.get_routines_from_dir("non-existing")
         assert len(routines) == 0
+
+    def test_routine_usages_in_text_ignores_comments(self):
+        text = (
+            "-- udf.test_js_udf(1)\n"
+            "/* udf.test_safe_sample_id('') */\n"
+            "SELECT '-- not a comment', udf.test_bitmask_lowest_28(1)\n"
+            "# udf.test_safe_crc32_uuid(b'')"
+        )
+        result = parse_routine.routine_usages_in_text(text, project=self.udf_dir.parent)
+        assert result == ["udf.test_bitmask_lowest_28"]
+
+        # names that merely contain a routine name are not usages
+        text = "SELECT udf.test_bitmask_lowest_28_v2(1), myudf.test_js_udf(1)"
+        assert (
+            parse_routine.routine_usages_in_text(text, project=self.udf_dir.parent)
+            == []
+        )
+
+    def test_accumulate_dependencies_with_existing_deps(self):
+        raw_routines = {
+            raw_routine.name: raw_routine
+            for raw_routine in parse_routine.read_routine_dir(self.udf_dir).values()
+        }
+
+        result = parse_routine.accumulate_dependencies(
+            ["udf.test_bitmask_lowest_28"],
+            raw_routines,
+            "udf.test_shift_28_bits_one_day",
+        )
+        assert result == [
+            "udf.test_bitmask_lowest_28",
+            "udf.test_shift_28_bits_one_day",
+        ]
+
+        # the index is rebuilt when raw_routines changes
+        del raw_routines["udf.test_bitmask_lowest_28"]
+        result = parse_routine.accumulate_dependencies(
+            [], raw_routines, "udf.test_shift_28_bits_one_day"
+        )
+        assert result == ["udf.test_shift_28_bits_one_day"]
+
+    def test_sub_local_routines_project_qualified(self):
+        raw_routines = {
+            raw_routine.name: raw_routine
+            for raw_routine in parse_routine.read_routine_dir(self.udf_dir).values()
+        }
+        text = (
+            "SELECT `moz-fx-data-test-project`.udf.test_bitmask_lowest_28(), "
+            "other_project.udf.test_bitmask_lowest_28()"
+        )
+        result = parse_routine.sub_local_routines(
+            text, self.udf_dir.parent, raw_routines
+        )
+        assert result.endswith(
+            "SELECT udf_test_bitmask_lowest_28(), "
+            "other_project.udf.test_bitmask_lowest_28()"
+        )
+        # results are memoized
+        assert (
+            parse_routine.sub_local_routines(text, self.udf_dir.parent, raw_routines)
+            is result
+        )
+
+    def test_routine_file_index(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("BQETL_CACHE_DIR", str(tmp_path / "cache"))
+        project_dir = tmp_path / "sql" / "moz-fx-data-test-project"
+        udf_file = project_dir / "udf" / "test_udf" / "udf.sql"
+        udf_file.parent.mkdir(parents=True)
+        udf_file.write_text(
+            "CREATE OR REPLACE FUNCTION udf.test_udf() AS (1);\n"
+            "SELECT assert.equals(1, udf.test_udf());"
+        )
+
+        index = parse_routine.RoutineFileIndex(project_dir)
+        expected = index.get(str(udf_file))
+        index.save()
+
+        def fail(path):
+            raise AssertionError(f"{path} was parsed again")
+
+        monkeypatch.setattr(parse_routine.RawRoutine, "from_file", fail)
+        index = parse_routine.RoutineFileIndex(project_dir)
+        assert index.get(str(udf_file)) == expected
+        assert not index.changed
+
+        # changes to the routine or its metadata invalidate the entry
+        monkeypatch.undo()
+        monkeypatch.setenv("BQETL_CACHE_DIR", str(tmp_path / "cache"))
+        (udf_file.parent / "metadata.yaml").write_text("description: Changed")
+        index = parse_routine.RoutineFileIndex(project_dir)
+        assert index.get(str(udf_file)).description == "Changed"
+        assert index.changed
@@ -0,0 +1,133 @@
+import io
+import json
+import tarfile
+
+import pytest
+
+from bigquery_etl.schema import stable_table_schema
+from bigquery_etl.schema.stable_table_schema import get_stable_table_schemas
+
+
+def _tarball(files):
+    tarbytes = io.BytesIO()
+    with tarfile.open(fileobj=tarbytes, mode="w:gz") as tar:
+        for name, content in files.items():
+            data = json.dumps(content).encode("utf-8")
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.size = len(data)
+            tar.addfile(tarinfo, io.BytesIO(data))
+    return tarbytes.getvalue()
+
+
+def _schema(namespace, doctype, version):
+    return {
+        "$id": f"moz://mozilla.org/schemas/{namespace}/{doctype}/{version}",
+        "mozPipelineMetadata": {
+            "bq_dataset_family": namespace,
+            "bq_table": f"{doctype}_v{version}",
+        },
+    }
+
+
+def _schemas_tarball():
+    return _tarball(
+        {
+            "mps/schemas/telemetry/event/event.4.schema.json": {
+                "$id": "moz://mozilla.org/schemas/telemetry/event/4",
+                "mozPipelineMetadata": {
+                    "bq_dataset_family": "telemetry",
+                    "bq_table": "event_v4",
+                },
+            },
+            "mps/schemas/telemetry/event/event.4.bq": [
+                {"name": "submission_timestamp", "type": "TIMESTAMP"}
+            ],
+            "mps/schemas/glean/glean/glean.1.schema.json": {"$id": "glean"},
+        }
+    )
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    monkeypatch.setenv("BQETL_CACHE_DIR", str(tmp_path))
+    downloads = []
+    tarball = _schemas_tarball()
+
+    def urlopen(uri):
+        downloads.append(uri)
+        return io.BytesIO(tarball)
+
+    monkeypatch.setattr(stable_table_schema.urllib.request, "urlopen", urlopen)
+    monkeypatch.setattr(stable_table_schema, "prod_schemas_commit", lambda: "abc")
+    return downloads
+
+
+class TestStableTableSchema:
+    def test_get_stable_table_schemas(self, downloads):
+        schemas = get_stable_table_schemas()
+
+        assert len(downloads) == 1
+        assert downloads[0].endswith("/archive/abc.tar.gz")
+        assert [schema.stable_table for schema in schemas] == [
+            "telemetry_stable.event_v4"
+        ]
+        assert schemas[0].schema == [
+            {"name": "submission_timestamp", "type": "TIMESTAMP"}
+        ]
+
+    def test_get_stable_table_schemas_cached(self, downloads, monkeypatch):
+        schemas = get_stable_table_schemas()
+        assert get_stable_table_schemas() == schemas
+        assert len(downloads) == 1
+
+        monkeypatch.setattr(stable_table_schema, "prod_schemas_commit", lambda: "def")
+        assert get_stable_table_schemas() == schemas
+        assert len(downloads) == 2
+
+    def test_old_builds_evicted(self, downloads, monkeypatch, tmp_path):
+        for commit_hash in ("a", "b", "c", "d"):
+            monkeypatch.setattr(
+                stable_table_schema, "prod_schemas_commit", lambda: commit_hash
+            )
+            get_stable_table_schemas()
+
+        cached = sorted(
+            path.name for path in (tmp_path / "stable_table_schemas").iterdir()
+        )
+        assert len(cached) == stable_table_schema.SCHEMAS_CACHE_BUILDS
+        assert not any(name.startswith("a.") for name in cached)
+
+    def test_parse_schemas_tarball(self, capsys):
+        tarball = _tarball(
+            {
+                # BigQuery schemas may precede or follow their JSON schema
+                "mps/schemas/telemetry/main/main.4.bq": [{"name": "v4"}],
+                "mps/schemas/telemetry/main/main.4.schema.json": _schema(
+                    "telemetry", "main", 4
+                ),
+                "mps/schemas/telemetry/main/main.5.schema.json": _schema(
+                    "telemetry", "main", 5
+                ),
+                "mps/schemas/telemetry/main/main.5.bq": [{"name": "v5"}],
+                "mps/schemas/telemetry/crash/crash.10.bq": [{"name": "v10"}],
+                "mps/schemas/telemetry/crash/crash.10.schema.json": _schema(
+                    "telemetry", "crash", 10
+                ),
+                "mps/schemas/telemetry/crash/crash.9.schema.json": _schema(
+                    "telemetry", "crash", 9
+                ),
+                "mps/schemas/telemetry/crash/crash.9.bq": [{"name": "v9"}],
+                "mps/schemas/telemetry/event/event.1.schema.json": _schema(
+                    "telemetry", "event", 1
+                ),
+            }
+        )
+
+        schemas = stable_table_schema._parse_schemas_tarball(io.BytesIO(tarball))
+
+        assert [(s.stable_table, s.schema) for s in schemas] == [
+            ("telemetry_stable.crash_v10", [{"name": "v10"}]),
+            ("telemetry_stable.event_v1", {}),
+            ("telemetry_stable.main_v5", [{"name": "v5"}]),
+        ]
+        assert "Cannot get Bigquery schema" in capsys.readouterr().out
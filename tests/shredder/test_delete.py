@@ -0,0 +1,114 @@
+from datetime import date
+from multiprocessing.pool import ThreadPool
+from types import SimpleNamespace
+
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+
+from bigquery_etl.shredder.config import DeleteSource, DeleteTarget
+from bigquery_etl.shredder.delete import plan_deletes
+from bigquery_etl.util.bigquery_id import sql_table_id
+
+
+class FakeClient:
+    def __init__(self, num_bytes=100, partitions=()):
+        self.num_bytes = num_bytes
+        # rows of INFORMATION_SCHEMA.PARTITIONS
+        self.partitions = partitions
+
+    def get_table(self, table_id):
+        if table_id.endswith("missing_v1"):
+            raise NotFound(table_id)
+        table = bigquery.Table(table_id)
+        table.time_partitioning = bigquery.TimePartitioning(field="submission_date")
+        table._properties["numBytes"] = str(self.num_bytes)
+        return table
+
+    def query(self, sql, job_config=None):
+        assert "INFORMATION_SCHEMA.PARTITIONS" in sql
+        return SimpleNamespace(result=lambda: list(self.partitions))
+
+
+class FakeClientQueue:
+    def __init__(self, client):
+        self.client = client
+
+    def with_client(self, func, *args):
+        return func(self.client, *args)
+
+
+def _plan_deletes(client, targets, source, max_single_dml_bytes, partition_limit):
+    with ThreadPool(2) as pool:
+        return plan_deletes(
+            FakeClientQueue(client),
+            pool,
+            [(target, [source]) for target in targets],
+            source_condition="TRUE",
+            dry_run=True,
+            use_dml=True,
+            priority=bigquery.QueryPriority.INTERACTIVE,
+            start_date=date(2023, 1, 1),
+            end_date=date(2023, 1, 15),
+            max_single_dml_bytes=max_single_dml_bytes,
+            partition_limit=partition_limit,
+            state_table=None,
+            states={},
+        )
+
+
+class TestPlanDeletes:
+    def test_plan_deletes(self):
+        client = FakeClient()
+        source = DeleteSource(table="telemetry_stable.deletion_request_v4", field="id")
+        targets = [
+            DeleteTarget(table=f"telemetry_derived.{name}_v1", field="client_id")
+            for name in ("a", "missing", "b", "c")
+        ]
+
+        tasks = _plan_deletes(
+            client,
+            targets,
+            source,
+            max_single_dml_bytes=10 * 2**40,
+            partition_limit=None,
+        )
+
+        assert [sql_table_id(task.table) for task in tasks] == [
+            "moz-fx-data-shared-prod.telemetry_derived.a_v1",
+            "moz-fx-data-shared-prod.telemetry_derived.b_v1",
+            "moz-fx-data-shared-prod.telemetry_derived.c_v1",
+        ]
+        assert all(task.partition_id is None for task in tasks)
+        assert all(task.sources == [source] for task in tasks)
+        assert all(task.estimated_bytes == 100 for task in tasks)
+
+    def test_plan_deletes_partition_sizes(self):
+        client = FakeClient(
+            num_bytes=1000,
+            partitions=[
+                {"partition_id": "20230112", "total_logical_bytes": 100},
+                {"partition_id": "20230113", "total_logical_bytes": None},
+                {"partition_id": "20230114", "total_logical_bytes": 300},
+                # on or after end_date
+                {"partition_id": "20230115", "total_logical_bytes": 350},
+            ],
+        )
+        source = DeleteSource(table="telemetry_stable.deletion_request_v4", field="id")
+        target = DeleteTarget(table="telemetry_derived.a_v1", field="client_id")
+
+        tasks = _plan_deletes(
+            client, [target], source, max_single_dml_bytes=10, partition_limit=None
+        )
+        # sizes that are not reported are estimated over all partitions
+        assert {task.partition_id: task.estimated_bytes for task in tasks} == {
+            "20230112": 100,
+            "20230113": 250,
+            "20230114": 300,
+        }
+
+        tasks = _plan_deletes(
+            client, [target], source, max_single_dml_bytes=10, partition_limit=1
+        )
+        assert [(task.partition_id, task.estimated_bytes) for task in tasks] == [
+            ("20230114", 300)
+        ]
@@ -0,0 +1,103 @@
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from google.cloud import bigquery
+
+from bigquery_etl.shredder.schedule import (
+    CostAwareScheduler,
+    expected_duration,
+    order_by_cost,
+)
+
+
+def _task(name, estimated_bytes, partition_id=None):
+    table = bigquery.Table(f"project.dataset.{name}")
+    table._properties["numBytes"] = str(estimated_bytes)
+    return SimpleNamespace(
+        name=name,
+        table=table,
+        partition_id=partition_id,
+        partition_sort_key=(partition_id is None, False, partition_id),
+        estimated_bytes=estimated_bytes,
+    )
+
+
+class TestSchedule:
+    def test_order_by_cost(self):
+        tasks = [
+            _task("small", 10),
+            _task("large", 100, "20230102"),
+            _task("large", 100, "20230103"),
+            _task("medium", 50),
+        ]
+        assert [(t.name, t.partition_id) for t in order_by_cost(tasks)] == [
+            ("large", "20230103"),
+            ("large", "20230102"),
+            ("medium", None),
+            ("small", None),
+        ]
+
+    def test_map_bounds_in_flight_bytes(self):
+        tasks = [_task(str(size), size) for size in (10, 50, 60, 100)]
+        lock = threading.Lock()
+        in_flight = []
+        started = []
+        max_in_flight = 0
+
+        def run(task):
+            nonlocal max_in_flight
+            with lock:
+                started.append(task.name)
+                in_flight.append(task.estimated_bytes)
+                max_in_flight = max(max_in_flight, sum(in_flight))
+            time.sleep(0.05)
+            with lock:
+                in_flight.remove(task.estimated_bytes)
+            return task.name
+
+        results = CostAwareScheduler(4, max_in_flight_bytes=110).map(run, tasks)
+
+        assert results == ["10", "50", "60", "100"]
+        assert max_in_flight <= 110
+        assert started[:2] == ["100", "10"]
+
+    def test_map_reserves_budget_for_blocked_task(self):
+        tasks = [_task("large", 60), _task("medium", 50)] + [
+            _task("small", 10) for _ in range(20)
+        ]
+        started = []
+
+        def run(task):
+            started.append(task.name)
+            time.sleep(0.2 if task.name == "large" else 0.01)
+            return task.name
+
+        CostAwareScheduler(2, max_in_flight_bytes=100).map(run, tasks)
+
+        # only parallelism small tasks are started ahead of the medium one
+        assert started[:4] == ["large", "small", "small", "medium"]
+
+    def test_map_runs_task_larger_than_budget(self):
+        tasks = [_task("huge", 1000), _task("small", 1)]
+        results = CostAwareScheduler(2, max_in_flight_bytes=10).map(
+            lambda task: task.name, tasks
+        )
+        assert results == ["huge", "small"]
+
+    def test_expected_duration(self):
+        tasks = [_task("a", 1000), _task("b", 3000)]
+        jobs = [
+            SimpleNamespace(
+                project="project",
+                dataset_id="dataset",
+                table_id="a",
+                total_bytes_processed=1000,
+                slot_millis=10000,
+            )
+        ]
+        # table a was processed at 1000 bytes per 10 slot seconds, i.e. 1000
+        # bytes/second with 10 slots, which is used for table b too
+        assert expected_duration(tasks, jobs, slots=10) == timedelta(seconds=4)
+        assert expected_duration(tasks, [], slots=10) is None
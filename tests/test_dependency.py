@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+
+from bigquery_etl import dependency
+from bigquery_etl.dependency import (
+    extract_table_references,
+    extract_table_references_without_views,
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("BQETL_CACHE_DIR", str(tmp_path / "cache"))
+    dependency._table_references_without_views.cache_clear()
+    yield
+    dependency._table_references_without_views.cache_clear()
+
+
+class TestDependency:
+    def test_extract_table_references(self):
+        sql = "WITH a AS (SELECT * FROM `project.dataset.table`) SELECT * FROM a"
+        assert extract_table_references(sql) == ["project.dataset.table"]
+
+    def test_extract_table_references_cached(self, monkeypatch):
+        sql = "SELECT * FROM dataset.table JOIN other_table USING (id)"
+        expected = extract_table_references(sql)
+
+        def fail(sql):
+            raise AssertionError("cached references should not be parsed again")
+
+        monkeypatch.setattr(dependency, "_parse_table_references", fail)
+        assert extract_table_references(sql) == expected
+        with pytest.raises(AssertionError):
+            extract_table_references(sql + " WHERE TRUE")
+
+    def test_extract_table_references_without_views_memoized(
+        self, tmp_path, monkeypatch
+    ):
+        dataset = tmp_path / "sql" / "test-project" / "test"
+        (dataset / "view").mkdir(parents=True)
+        (dataset / "view" / "view.sql").write_text(
+            "CREATE VIEW `test-project.test.view` AS SELECT * FROM test.table_v1"
+        )
+        for query in ("query_a_v1", "query_b_v1"):
+            (dataset / query).mkdir()
+            (dataset / query / "query.sql").write_text("SELECT * FROM test.view")
+
+        rendered = []
+        render = dependency.render
+
+        def counting_render(sql_filename, template_folder, **kwargs):
+            rendered.append(Path(template_folder) / sql_filename)
+            return render(sql_filename, template_folder=template_folder, **kwargs)
+
+        monkeypatch.setattr(dependency, "render", counting_render)
+
+        for query in ("query_a_v1", "query_b_v1"):
+            assert list(
+                extract_table_references_without_views(dataset / query / "query.sql")
+            ) == ["test-project.test.table_v1"]
+
+        assert rendered.count(dataset / "view" / "view.sql") == 1
@@ -0,0 +1,60 @@
+import os
+import time
+
+from bigquery_etl.dryrun_cache import DryRunCache
+
+VALID = {"valid": True, "referencedTables": [], "schema": {"fields": []}}
+
+
+class TestDryRunCache:
+    def test_get_put(self, tmp_path):
+        cache = DryRunCache(tmp_path)
+        key = DryRunCache.key("dataset", "SELECT 1", "build_1")
+        assert cache.get(key) is None
+        cache.put(key, VALID)
+        assert cache.get(key) == VALID
+        assert cache.get(DryRunCache.key("dataset", "SELECT 1", "build_2")) is None
+
+    def test_ttl(self, tmp_path):
+        cache = DryRunCache(tmp_path, ttl_seconds=0)
+        key = DryRunCache.key("dataset", "SELECT 1")
+        cache.put(key, VALID)
+        time.sleep(0.01)
+        assert cache.get(key) is None
+        assert not list(tmp_path.glob("*/*.json"))
+
+    def test_evict_least_recently_used(self, tmp_path):
+        cache = DryRunCache(tmp_path)
+        keys = [DryRunCache.key(str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, VALID)
+            path = cache._path(key)
+            os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+        # reading an entry marks it as recently used
+        cache.get(keys[0])
+        # entries differ in size by the length of their creation time
+        cache.max_size_bytes = sum(
+            cache._path(key).stat().st_size for key in (keys[0], keys[2])
+        )
+        cache.evict()
+        assert cache.get(keys[0]) == VALID
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[2]) == VALID
+
+    def test_cacheable(self):
+        assert DryRunCache.cacheable(VALID)
+        assert not DryRunCache.cacheable(None)
+        assert not DryRunCache.cacheable(
+            {"valid": False, "errors": [{"code": 404, "message": "Not found"}]}
+        )
+        assert DryRunCache.cacheable(
+            {
+                "valid": False,
+                "errors": [
+                    {
+                        "code": 403,
+                        "message": "Permission bigquery.tables.create denied",
+                    }
+                ],
+            }
+        )
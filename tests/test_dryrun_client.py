@@ -0,0 +1,156 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bigquery_etl import dryrun
+from bigquery_etl.dryrun import DryRun
+from bigquery_etl.dryrun_cache import DryRunCache
+from bigquery_etl.dryrun_client import DryRunServiceError, dry_run_batch
+
+
+class DryRunHandler(BaseHTTPRequestHandler):
+    """Stand-in for the dry run Cloud Function."""
+
+    protocol_version = "HTTP/1.1"  # keep connections alive
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append(request)
+            server.connections.add(self.client_address)
+            status = server.statuses.pop(0) if server.statuses else 200
+        if status == 200 and "INVALID" in request["query"]:
+            body = json.dumps(
+                {"valid": False, "errors": [{"code": 400, "message": "Syntax error"}]}
+            ).encode()
+        elif status == 200:
+            body = json.dumps(
+                {
+                    "valid": True,
+                    "referencedTables": [],
+                    "schema": {"fields": []},
+                    "datasetLabels": {
+                        "dataset": request["dataset"],
+                        "schemas_build_id": server.schemas_build_id,
+                    },
+                }
+            ).encode()
+        else:
+            body = b"error"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def dry_run_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DryRunHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.connections = set()
+    server.statuses = []
+    server.schemas_build_id = "build_1"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestDryRunClient:
+    def test_dry_run_batch(self, dry_run_server):
+        requests = [(f"dataset_{i}", f"SELECT {i}") for i in range(20)]
+        results = dry_run_batch(requests, url=dry_run_server.url, concurrency=2)
+
+        assert [result["datasetLabels"]["dataset"] for result in results] == [
+            dataset for dataset, _ in requests
+        ]
+        assert len(dry_run_server.requests) == 20
+        # connections are reused instead of opened per request
+        assert len(dry_run_server.connections) <= 2
+
+    def test_retry(self, dry_run_server):
+        dry_run_server.statuses = [503, 500]
+        (result,) = dry_run_batch(
+            [("dataset", "SELECT 1")], url=dry_run_server.url, backoff=0
+        )
+        assert result["valid"]
+        assert len(dry_run_server.requests) == 3
+
+    def test_retries_exhausted(self, dry_run_server):
+        dry_run_server.statuses = [503, 503]
+        (result,) = dry_run_batch(
+            [("dataset", "SELECT 1")], url=dry_run_server.url, retries=1, backoff=0
+        )
+        assert isinstance(result, DryRunServiceError)
+        assert result.status == 503
+
+    def test_no_retry_for_client_error(self, dry_run_server):
+        dry_run_server.statuses = [400]
+        results = dry_run_batch(
+            [("dataset", "SELECT 1"), ("dataset", "SELECT 2")],
+            url=dry_run_server.url,
+            concurrency=1,
+            backoff=0,
+        )
+        assert isinstance(results[0], DryRunServiceError)
+        assert results[1]["valid"]
+        assert len(dry_run_server.requests) == 2
+
+    def test_prefetch(self, dry_run_server, tmp_path):
+        dry_runs = []
+        for i, sql in enumerate(["SELECT 1", "SELECT INVALID"]):
+            query_file = tmp_path / "telemetry_derived" / f"table_{i}" / "query.sql"
+            query_file.parent.mkdir(parents=True)
+            query_file.write_text(sql)
+            dry_run = DryRun(str(query_file))
+            dry_run.dry_run_url = dry_run_server.url
+            dry_runs.append(dry_run)
+
+        DryRun.prefetch(dry_runs)
+        assert len(dry_run_server.requests) == 2
+        assert dry_run_server.requests[0]["dataset"] == "telemetry_derived"
+        assert dry_runs[0].is_valid()
+        assert not dry_runs[1].is_valid()
+        assert dry_runs[0].get_dataset_labels()["dataset"] == "telemetry_derived"
+        # results are reused
+        assert len(dry_run_server.requests) == 2
+
+    def test_cached_dry_run(self, dry_run_server, tmp_path, monkeypatch):
+        monkeypatch.setattr(dryrun, "default_cache", lambda: DryRunCache(tmp_path))
+        dryrun._schemas_build_id.cache_clear()
+        query_file = tmp_path / "telemetry_derived" / "table" / "query.sql"
+        query_file.parent.mkdir(parents=True)
+        query_file.write_text("SELECT 1")
+
+        def dry_run_result():
+            dry_run = DryRun(str(query_file))
+            dry_run.dry_run_url = dry_run_server.url
+            return dry_run.dry_run_result
+
+        assert dry_run_result()["valid"]
+        # the schemas build id is looked up once per process
+        assert len(dry_run_server.requests) == 2
+        assert dry_run_result()["valid"]
+        assert len(dry_run_server.requests) == 2
+
+        dry_runs = [DryRun(str(query_file))]
+        dry_runs[0].dry_run_url = dry_run_server.url
+        DryRun.prefetch(dry_runs)
+        assert dry_runs[0].dry_run_result["valid"]
+        assert len(dry_run_server.requests) == 2
+
+        # a new schemas deploy invalidates cached results
+        dry_run_server.schemas_build_id = "build_2"
+        dryrun._schemas_build_id.cache_clear()
+        assert dry_run_result()["valid"]
+        assert len(dry_run_server.requests) == 4
+        dryrun._schemas_build_id.cache_clear()
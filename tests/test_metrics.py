@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+
+import pytest
+from git import Repo
+from metric_config_parser.config import ConfigCollection
+
+from bigquery_etl import metrics
+from bigquery_etl.metrics import MetricHub, snapshot_commit
+
+
+@pytest.fixture
+def metric_hub_repo(tmp_path, monkeypatch):
+    """Serve metric-hub from a local repository and isolate the cache."""
+    monkeypatch.setenv("BQETL_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv(metrics.REPO_PATH_ENV, raising=False)
+    monkeypatch.delenv(metrics.COMMIT_ENV, raising=False)
+    repo = Repo.init(tmp_path / "metric-hub")
+    (tmp_path / "metric-hub" / "README.md").write_text("metric-hub")
+    repo.index.add(["README.md"])
+    repo.index.commit("Initial commit")
+    monkeypatch.setattr(ConfigCollection, "repo_url", f"file://{repo.working_dir}")
+    return repo
+
+
+class TestMetricHub:
+    def test_snapshot_commit(self, metric_hub_repo, monkeypatch):
+        commit = snapshot_commit()
+        assert commit == metric_hub_repo.head.commit.hexsha
+
+        def fail(*args, **kwargs):
+            raise AssertionError("metric-hub was cloned again")
+
+        monkeypatch.setattr(metrics, "_clone", fail)
+        assert snapshot_commit() == commit
+
+    def test_snapshot_commit_offline(self, metric_hub_repo, monkeypatch):
+        commit = snapshot_commit()
+        # expire the snapshot
+        latest_file = metrics._snapshots_dir() / metrics.LATEST_FILE
+        latest_file.write_text(json.dumps({"commit": commit, "fetched": 0}))
+        monkeypatch.setattr(ConfigCollection, "repo_url", "file:///does/not/exist")
+        # fall back to the outdated snapshot
+        assert snapshot_commit() == commit
+
+    def test_calculate_cached(self, metric_hub_repo, monkeypatch):
+        calls = []
+
+        def get_metrics_sql(self, **kwargs):
+            calls.append(kwargs)
+            return "SELECT 1"
+
+        monkeypatch.setattr(ConfigCollection, "get_metrics_sql", get_metrics_sql)
+        assert MetricHub().calculate(["active_hours"], "firefox_desktop") == "SELECT 1"
+        assert MetricHub().calculate(["active_hours"], "firefox_desktop") == "SELECT 1"
+        assert len(calls) == 1
+
+        MetricHub().calculate(["active_hours"], "firefox_desktop", where="TRUE")
+        assert len(calls) == 2
+
+    def test_calculate_cache_key(self, metric_hub_repo, monkeypatch):
+        calls = []
+
+        def get_metrics_sql(self, **kwargs):
+            calls.append(kwargs)
+            return "SELECT 1"
+
+        monkeypatch.setattr(ConfigCollection, "get_metrics_sql", get_metrics_sql)
+        group_by = {"os": "normalized_os", "channel": "normalized_channel"}
+        MetricHub().calculate(["active_hours"], "firefox_desktop", group_by=group_by)
+        assert len(calls) == 1
+
+        # generated columns follow the order of group_by
+        reordered = dict(reversed(group_by.items()))
+        MetricHub().calculate(["active_hours"], "firefox_desktop", group_by=reordered)
+        assert len(calls) == 2
+
+        # SQL generated by another version of metric-config-parser is not used
+        monkeypatch.setattr(metrics, "_generator_version", lambda: "0.0.0")
+        MetricHub().calculate(["active_hours"], "firefox_desktop", group_by=group_by)
+        assert len(calls) == 3
+
+    def test_local_checkout_is_not_cached(self, metric_hub_repo, monkeypatch):
+        monkeypatch.setenv(metrics.REPO_PATH_ENV, metric_hub_repo.working_dir)
+        monkeypatch.setattr(
+            metrics, "snapshot_commit", lambda: pytest.fail("snapshot was used")
+        )
+        calls = []
+
+        def get_data_source_sql(self, **kwargs):
+            calls.append(kwargs)
+            return "SELECT 1"
+
+        monkeypatch.setattr(
+            ConfigCollection, "get_data_source_sql", get_data_source_sql
+        )
+        MetricHub().data_source("clients_daily", "firefox_desktop")
+        MetricHub().data_source("clients_daily", "firefox_desktop")
+        assert len(calls) == 2
+
+    def test_snapshot_commit_pinned(self, metric_hub_repo, monkeypatch):
+        pinned = metric_hub_repo.head.commit.hexsha
+        (metric_hub_repo.working_tree_dir / Path("README.md")).write_text("changed")
+        metric_hub_repo.index.add(["README.md"])
+        metric_hub_repo.index.commit("Change README")
+
+        monkeypatch.setenv(metrics.COMMIT_ENV, pinned)
+        assert snapshot_commit() == pinned
+        snapshot = metrics._snapshots_dir() / pinned
+        assert (snapshot / "README.md").read_text() == "metric-hub"
+        assert Repo(snapshot).active_branch is not None
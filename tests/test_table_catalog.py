@@ -0,0 +1,58 @@
+import json
+from collections import namedtuple
+from unittest import mock
+
+from bigquery_etl.table_catalog import TableCatalog
+
+Row = namedtuple("Row", "table_schema table_name")
+
+
+def _client():
+    client = mock.Mock()
+    client.query.return_value.result.return_value = [
+        Row("telemetry_stable", "main_v5"),
+        Row("telemetry", "main"),
+    ]
+    return client
+
+
+class TestTableCatalog:
+    def test_contains(self, tmp_path):
+        client = _client()
+        catalog = TableCatalog(tmp_path, client=client)
+
+        assert catalog.contains("moz-fx-data-shared-prod.telemetry_stable.main_v5")
+        assert catalog.contains("`moz-fx-data-shared-prod`.telemetry.main")
+        assert not catalog.contains("moz-fx-data-shared-prod.telemetry.missing")
+        assert not catalog.contains("telemetry.main")
+        # one query per project
+        client.query.assert_called_once()
+        assert "moz-fx-data-shared-prod.region-us" in client.query.call_args.args[0]
+
+    def test_snapshot_shared_on_disk(self, tmp_path):
+        TableCatalog(tmp_path, client=_client()).tables("moz-fx-data-shared-prod")
+
+        client = _client()
+        catalog = TableCatalog(tmp_path, client=client)
+        assert catalog.contains("moz-fx-data-shared-prod.telemetry.main")
+        client.query.assert_not_called()
+
+    def test_snapshot_expired(self, tmp_path):
+        (tmp_path / "moz-fx-data-shared-prod.json").write_text(
+            json.dumps({"fetched": 0, "tables": ["telemetry.old"]})
+        )
+        client = _client()
+        catalog = TableCatalog(tmp_path, client=client)
+        assert not catalog.contains("moz-fx-data-shared-prod.telemetry.old")
+        assert catalog.contains("moz-fx-data-shared-prod.telemetry.main")
+        client.query.assert_called_once()
+
+    def test_snapshot_unavailable(self, tmp_path):
+        client = mock.Mock()
+        client.query.side_effect = Exception("Access Denied")
+        catalog = TableCatalog(tmp_path, client=client)
+
+        assert catalog.tables("moz-fx-data-shared-prod") is None
+        assert not catalog.contains("moz-fx-data-shared-prod.telemetry.main")
+        client.query.assert_called_once()
+        assert not (tmp_path / "moz-fx-data-shared-prod.json").exists()
@@ -1,6 +1,11 @@
+import os
+import time
+from unittest import mock
+
 import pytest
 
-from bigquery_etl.util.common import project_dirs, render
+from bigquery_etl.config import ConfigLoader
+from bigquery_etl.util.common import _evict_bytecode, project_dirs, render
 
 
 class TestUtilCommon:
@@ -107,3 +112,64 @@ class TestUtilCommon:
         )
         assert "SELECT" in rendered_sql
         assert "`project.dataset.table`" in rendered_sql
+
+    def test_render_reloads_changed_template(self, tmp_path):
+        file_path = tmp_path / "test_query.sql"
+        file_path.write_text("SELECT {{ 1 + 1 }}")
+        assert render(file_path.name, template_folder=file_path.parent) == "SELECT\n  2"
+
+        # ensure the modification time changes even on coarse-grained filesystems
+        file_path.write_text("SELECT {{ 2 + 2 }}")
+        mtime = file_path.stat().st_mtime + 10
+        os.utime(file_path, (mtime, mtime))
+        assert render(file_path.name, template_folder=file_path.parent) == "SELECT\n  4"
+
+    def test_render_memoizes_environment(self, tmp_path):
+        file_path = tmp_path / "test_query.sql"
+        file_path.write_text("SELECT {{ value }}")
+        with mock.patch("bigquery_etl.util.common.Environment") as environment:
+            environment.return_value.get_template.return_value.render.return_value = (
+                "SELECT 1"
+            )
+            for value in range(3):
+                render(file_path.name, template_folder=file_path.parent, value=value)
+        assert environment.call_count == 1
+
+    def test_render_skips_staged_copies(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        skipped = tmp_path / "sql" / "moz-fx-data-shared-prod" / "test" / "query_v1"
+        skipped.mkdir(parents=True)
+        (skipped / "query.sql").write_text("SELECT {{ skipped }}")
+        with mock.patch.object(
+            ConfigLoader,
+            "get",
+            side_effect=lambda *keys, fallback=None: {
+                ("render", "skip"): ["sql/moz-fx-data-shared-prod/test/*/query.sql"],
+                ("default", "test_project"): "bigquery-etl-integration-test",
+                ("default", "sql_dir"): "sql",
+            }.get(keys, fallback),
+        ):
+            staged_dir = "sql/bigquery-etl-integration-test/test_abc/query_v1"
+            assert render("query.sql", template_folder=skipped, format=False) == (
+                "SELECT {{ skipped }}"
+            )
+            # staged after the skipped files were first looked up
+            (tmp_path / staged_dir).mkdir(parents=True)
+            (tmp_path / staged_dir / "query.sql").write_text("SELECT {{ skipped }}")
+            assert render("query.sql", template_folder=staged_dir, format=False) == (
+                "SELECT {{ skipped }}"
+            )
+
+    def test_evict_bytecode(self, tmp_path):
+        old = tmp_path / "__jinja2_old.cache"
+        old.write_bytes(b"x" * 10)
+        os.utime(old, (0, 0))
+        large = tmp_path / "__jinja2_large.cache"
+        large.write_bytes(b"x" * 100)
+        os.utime(large, (time.time() - 10, time.time() - 10))
+        new = tmp_path / "__jinja2_new.cache"
+        new.write_bytes(b"x" * 10)
+        _evict_bytecode(tmp_path, ttl_seconds=60, max_size_bytes=50)
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "__jinja2_new.cache"
+        ]
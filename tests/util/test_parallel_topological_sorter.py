@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from graphlib import CycleError
+
+import pytest
+
+from bigquery_etl.util.parallel_topological_sorter import ParallelTopologicalSorter
+
+DEPENDENCIES = {"a": set(), "b": {"a"}, "c": {"a"}, "d": {"b", "c"}}
+
+
+def _record_process_item(item, follow_up_queue):
+    pass
+
+
+class TestParallelTopologicalSorter:
+    def test_map_respects_dependencies(self):
+        lock = threading.Lock()
+        order = []
+
+        def callback(item, follow_up_queue):
+            with lock:
+                order.append(item)
+
+        ParallelTopologicalSorter(DEPENDENCIES, parallelism=2).map(callback)
+        assert sorted(order) == ["a", "b", "c", "d"]
+        assert order[0] == "a" and order[-1] == "d"
+
+    def test_map_runs_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def callback(item, follow_up_queue):
+            if item in ("b", "c"):
+                # fails unless b and c are processed at the same time
+                barrier.wait()
+
+        ParallelTopologicalSorter(DEPENDENCIES, parallelism=2).map(callback)
+
+    def test_follow_up(self):
+        lock = threading.Lock()
+        order = []
+
+        def callback(item, follow_up_queue):
+            with lock:
+                order.append(item)
+            if item == "b":
+                # c may not have started yet, so it is not necessarily processed
+                # twice, but d has not started and a is done
+                follow_up_queue.put("a")
+                follow_up_queue.put("d")
+                follow_up_queue.put("e")
+
+        ParallelTopologicalSorter(DEPENDENCIES, parallelism=2, with_follow_up=True).map(
+            callback
+        )
+        assert order.count("a") == 2
+        assert order.count("d") == 1
+        assert order.count("e") == 1
+        assert order.index("e") > order.index("b")
+
+    def test_follow_up_of_running_item(self):
+        started = threading.Event()
+        lock = threading.Lock()
+        order = []
+
+        def callback(item, follow_up_queue):
+            with lock:
+                order.append(item)
+            if item == "b":
+                started.set()
+                time.sleep(0.1)
+            elif item == "c":
+                started.wait(5)
+                follow_up_queue.put("b")
+
+        ParallelTopologicalSorter(DEPENDENCIES, parallelism=2, with_follow_up=True).map(
+            callback
+        )
+        assert order.count("b") == 2
+
+    def test_timings(self):
+        def callback(item, follow_up_queue):
+            time.sleep(0.01)
+
+        sorter = ParallelTopologicalSorter(DEPENDENCIES)
+        sorter.map(callback)
+        assert set(sorter.timings) == {"a", "b", "c", "d"}
+        assert all(seconds >= 0.01 for seconds in sorter.timings.values())
+
+    def test_exception_is_raised(self):
+        def callback(item, follow_up_queue):
+            if item == "b":
+                raise ValueError(item)
+
+        with pytest.raises(ValueError):
+            ParallelTopologicalSorter(DEPENDENCIES).map(callback)
+
+    def test_cycle(self):
+        with pytest.raises(CycleError):
+            ParallelTopologicalSorter({"a": {"b"}, "b": {"a"}}).map(lambda *_: None)
+
+    def test_process_pool(self):
+        with ProcessPoolExecutor(2) as executor:
+            sorter = ParallelTopologicalSorter(DEPENDENCIES, executor=executor)
+            sorter.map(_record_process_item)
+        assert set(sorter.timings) == {"a", "b", "c", "d"}
+
+    def test_map_async(self):
+        order = []
+
+        async def callback(item, follow_up_queue):
+            await asyncio.sleep(0)
+            order.append(item)
+            if item == "d":
+                follow_up_queue.put("a")
+
+        sorter = ParallelTopologicalSorter(DEPENDENCIES, with_follow_up=True)
+        asyncio.run(sorter.map_async(callback))
+        assert order[0] == "a" and order[3] == "d" and order[4] == "a"
@@ -0,0 +1,117 @@
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from google.api_core.exceptions import NotFound
+
+from bigquery_etl.view import View
+from bigquery_etl.view.diff import ViewDiff, _parse_labels, _parse_string
+
+TEST_DIR = Path(__file__).parent.parent
+VIEW_DIR = TEST_DIR / "data" / "test_sql" / "moz-fx-data-test-project" / "test"
+
+LABELS = (
+    '[STRUCT("schedule", "daily"), STRUCT("public_json", ""), '
+    'STRUCT("incremental", ""), STRUCT("incremental_export", ""), '
+    'STRUCT("1232341234", "valid"), STRUCT("1234_abcd", "valid"), '
+    'STRUCT("number_value", "1234234"), STRUCT("number_string", "1234abcde"), '
+    'STRUCT("123-432", "valid"), STRUCT("owner1", "test1"), '
+    'STRUCT("owner2", "test2")]'
+)
+
+
+def _client(views, options):
+    client = MagicMock()
+
+    def query(sql):
+        if "INFORMATION_SCHEMA.VIEWS" in sql:
+            rows = [
+                SimpleNamespace(table_name=name, view_definition=definition)
+                for name, definition in views.items()
+            ]
+        else:
+            rows = [
+                SimpleNamespace(table_name=name, option_name=key, option_value=value)
+                for name, view_options in options.items()
+                for key, value in view_options.items()
+            ]
+        job = MagicMock()
+        job.result.return_value = rows
+        return job
+
+    client.query.side_effect = query
+    return client
+
+
+class TestViewDiff:
+    view = View.from_file(VIEW_DIR / "view_with_metadata" / "view.sql")
+    deployed_query = (
+        "-- deployed\nSELECT\n  1\nFROM\n"
+        '  "moz-fx-data-test-project.test.simple_table"'
+    )
+    deployed_options = {
+        "description": '"Test description"',
+        "friendly_name": '"Test metadata file"',
+        "labels": LABELS,
+    }
+
+    def test_parse_options(self):
+        assert (
+            _parse_string('"a \\"quoted\\"\\nvalue \\u00e9"') == 'a "quoted"\nvalue é'
+        )
+        assert _parse_labels("[]") == {}
+        assert _parse_labels('[STRUCT("a", "b"), STRUCT("c", "")]') == {
+            "a": "b",
+            "c": "",
+        }
+
+    def test_no_changes(self):
+        client = _client(
+            {"view_with_metadata": self.deployed_query},
+            {"view_with_metadata": self.deployed_options},
+        )
+        assert ViewDiff(client).changes([self.view]) == [False]
+        client.get_table.assert_not_called()
+
+    def test_query_changed(self):
+        client = _client(
+            {"view_with_metadata": "SELECT 2"},
+            {"view_with_metadata": self.deployed_options},
+        )
+        assert ViewDiff(client).changes([self.view]) == [True]
+
+    def test_labels_changed(self):
+        client = _client(
+            {"view_with_metadata": self.deployed_query},
+            {"view_with_metadata": {**self.deployed_options, "labels": "[]"}},
+        )
+        assert ViewDiff(client).changes([self.view]) == [True]
+
+    def test_view_does_not_exist(self):
+        client = _client({}, {})
+        assert ViewDiff(client).changes([self.view]) == [True]
+
+        client.query.side_effect = NotFound("dataset not found")
+        assert ViewDiff(client).changes([self.view]) == [True]
+
+    def test_unparsed_options_fall_back_to_get_table(self):
+        client = _client(
+            {"view_with_metadata": self.deployed_query},
+            {"view_with_metadata": {**self.deployed_options, "labels": "unexpected"}},
+        )
+        client.get_table.return_value = SimpleNamespace(
+            description="Test description",
+            friendly_name="Test metadata file",
+            labels=_parse_labels(LABELS),
+        )
+        assert ViewDiff(client).changes([self.view]) == [False]
+        client.get_table.assert_called_once_with(
+            "moz-fx-data-test-project.test.view_with_metadata"
+        )
+
+    def test_datasets_fetched_once(self):
+        simple_view = View.from_file(VIEW_DIR / "simple_view" / "view.sql")
+        client = _client({}, {})
+        ViewDiff(client).changes([self.view, simple_view])
+        # one query each for VIEWS and TABLE_OPTIONS
+        assert client.query.call_count == 2